@@ -1,92 +1,198 @@
-from collections import Counter
-from pyscripts.steam_data_downloader import download_all_apps
-from pyscripts.steam_data_retriever import SteamDataRetriever
+from pyscripts.steam_data_downloader import download_all_apps, refresh_apps
+from pyscripts.sharded_crawl import download_sharded
+from pyscripts.steam_data_retriever import SharedRetriever
 from pyscripts.steam_trending_data_downloader import download_trend
-from flask import Flask, render_template, jsonify, request
+from pyscripts.result_pages import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, SORT_FIELDS, parse_fields
+from pyscripts.app_cards import FragmentCache
+from pyscripts.price_table import DEFAULT_EDGES, PRICE_FIELDS, parse_edges
+from pyscripts.query_planner import FILTER_PARAMS, parse_query
+from pyscripts.response_cache import CachedResponse, ResponseCache, make_etag
+from pyscripts.job_queue import load_progress
+from pyscripts.metrics import DOWNLOAD_PROGRESS, HTTP_REQUEST_SECONDS, HTTP_REQUESTS, REGISTRY
+from flask import Flask, Response, g, render_template, jsonify, request
+from markupsafe import Markup
 from pathlib import Path
+import functools
 import threading
+import time
+import os
 app = Flask(__name__)
-@app.route('/')
-def index():
-    search_base = Path('checkpoints') / 'searchresults'
 
-    if search_base.exists():
-        search_dirs = sorted(search_base.glob('search_results_*'))
-    else:
-        search_dirs = []
+# STEAM_CHECKPOINT_FOLDER points the app at another catalog, e.g. a synthetic one for load tests
+CHECKPOINT_FOLDER = Path(os.environ.get('STEAM_CHECKPOINT_FOLDER', 'checkpoints'))
+
+# one retriever per worker process, reloaded only when the checkpoints change
+# STEAM_CATALOG_BACKEND=sqlite serves from checkpoints/apps_catalog-ckpt-fin.sqlite, shared by all workers
+RETRIEVER = SharedRetriever(checkpoint_folder=str(CHECKPOINT_FOLDER),
+                            backend=os.environ.get('STEAM_CATALOG_BACKEND', 'memory'))
+RETRIEVER.get()
+
+CATEGORY_TITLES = {
+    'globaltopsellers': 'Global Top Sellers',
+    'specials': 'Special Offers',
+    'popularcommingsoon': 'Popular: Coming Soon',
+    'topsellers': 'Top Sellers',
+    'popularnew': 'Popular: New'
+}
 
-    if search_dirs:
-        latest_folder = str(search_dirs[-1])
-        retriever = SteamDataRetriever(
-            checkpoint_folder='checkpoints',
-            search_data_folder=latest_folder
-        )
-        raw_categories = retriever.load_all_search_results()
-    else:
-        raw_categories = {}
+# rendered trending sections for the latest search results folder and catalog version
+HOME_FRAGMENTS = FragmentCache()
+
+
+# rendered analytics and search responses, keyed by route, query and checkpoint version
+RESPONSE_CACHE = ResponseCache()
+
+
+def cached_response(view):
+    """
+    Serve a GET view from RESPONSE_CACHE, with a strong ETag derived from the
+    checkpoint version so unchanged results cost browsers a 304.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        version = RETRIEVER.get().version
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        etag = make_etag(version, key)
+
+        if request.if_none_match.contains(etag):
+            not_modified = Response(status=304)
+            not_modified.set_etag(etag)
+            not_modified.headers['Cache-Control'] = 'no-cache'
+            return not_modified
+
+        entry = RESPONSE_CACHE.get((key, version))
+        if entry is None:
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            entry = CachedResponse(response.get_data(), response.status_code, response.mimetype, etag)
+            RESPONSE_CACHE.put((key, version), entry)
+
+        response = Response(entry.body, status=entry.status, mimetype=entry.mimetype)
+        response.set_etag(entry.etag)
+        # always revalidate; the ETag changes with every new checkpoint
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    return wrapper
+
+
+def parse_page_args():
+    """
+    Read the page, page_size, sort and order arguments of a paginated API.
 
+    Raises:
+        ValueError: If one of them is out of range
+    """
+    page = request.args.get('page', 1, type=int)
+    page_size = request.args.get('page_size', DEFAULT_PAGE_SIZE, type=int)
+    sort = request.args.get('sort', 'appid')
+    order = request.args.get('order', 'asc')
+
+    if page is None or page < 1:
+        raise ValueError('page must be a positive integer')
+    if page_size is None or not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise ValueError(f'page_size must be between 1 and {MAX_PAGE_SIZE}')
+    if sort not in SORT_FIELDS:
+        raise ValueError(f'sort must be one of {", ".join(SORT_FIELDS)}')
+    if order not in ('asc', 'desc'):
+        raise ValueError('order must be asc or desc')
+    return page, page_size, sort, order
+
+
+def render_section(title, cards):
+    return Markup(render_template('category_section.html', title=title, games=cards))
+
+
+def render_trending_sections(retriever, raw_categories):
     seen_ids = set()
-    categories = {}
+    sections = {}
 
-    q = request.args.get('q')
-    search_type = request.args.get('type', 'app-id')
+    for category, games in raw_categories.items():
 
-    retriever = SteamDataRetriever()
+        unique_games = []
+        for game in games:
 
-    if q:
-        if search_type == 'app-id' and q.isdigit():
-            result = retriever.get_app_details(int(q))
-            if result:
-                categories['search'] = [result]
-        elif search_type == 'name':
-            categories['search'] = retriever.search_apps_by_name(q)
-        elif search_type == 'developer':
-            categories['search'] = retriever.get_apps_by_developer(q)
-        elif search_type == 'genre':
-            categories['search'] = retriever.get_apps_with_genre(q)
-        elif search_type == 'tag':
-            categories['search'] = retriever.get_apps_with_tag(q)
-        else:
-            categories['search'] = []
+            if len(unique_games) > 6:
+                break
 
-        category_titles = {
-            'search': f'Search Results ({search_type})'
-        }
-    else:
-        for category, games in raw_categories.items():
+            app_id = game.get('appid')
+            card = retriever.get_app_card(app_id)
+
+            if card is None:
+                continue
+
+            if app_id and app_id not in seen_ids:
+                seen_ids.add(app_id)
+                unique_games.append(card)
+
+        sections[category] = render_section(CATEGORY_TITLES[category], unique_games)
 
-            unique_games = []
-            for game in games:
+    return sections
 
-                if len(unique_games) > 6:
-                    break
 
-                app_id = game.get('appid')
-                appdetails = retriever.get_app_details(app_id)
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
 
-                if appdetails == None:
-                    continue
 
-                if app_id and app_id not in seen_ids :
-                    seen_ids.add(app_id)
-                    unique_games.append(appdetails)
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        # the rule ('/api/search_app'), not the URL, so the label stays bounded
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, route=route, method=request.method)
+        HTTP_REQUESTS.inc(route=route, method=request.method, status=str(response.status_code))
+    return response
 
-            categories[category] = unique_games
 
-        category_titles = {
-            'globaltopsellers': 'Global Top Sellers',
-            'specials': 'Special Offers',
-            'popularcommingsoon': 'Popular: Coming Soon',
-            'topsellers': 'Top Sellers',
-            'popularnew': 'Popular: New'
-        }
+@app.route('/metrics')
+def metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
 
-    has_trending = bool(raw_categories) and not request.args.get('q')
+
+@app.route('/')
+def index():
+    search_base = CHECKPOINT_FOLDER / 'searchresults'
+
+    if search_base.exists():
+        search_dirs = sorted(search_base.glob('search_results_*'))
+    else:
+        search_dirs = []
+
+    retriever = RETRIEVER.get()
+    latest_folder = str(search_dirs[-1]) if search_dirs else None
+
+    q = request.args.get('q')
+    search_type = request.args.get('type', 'app-id')
+
+    if q:
+        cards = []
+        if search_type == 'app-id' and q.isdigit():
+            card = retriever.get_app_card(int(q))
+            if card:
+                cards = [card]
+        elif search_type in ('name', 'developer', 'genre', 'tag'):
+            # the section shows at most five apps
+            app_ids = retriever.search_app_ids(search_type, q)[:5]
+            cards = [retriever.get_app_card(app_id) for app_id in app_ids]
+
+        sections = {'search': render_section(f'Search Results ({search_type})', cards)}
+        has_trending = False
+    else:
+        # the folder's mtime changes when the trending downloader adds a category file
+        key = (latest_folder, os.stat(latest_folder).st_mtime_ns if latest_folder else None, retriever.version)
+        sections = HOME_FRAGMENTS.get(key)
+        if sections is None:
+            raw_categories = retriever.load_all_search_results(latest_folder) if latest_folder else {}
+            sections = render_trending_sections(retriever, raw_categories)
+            HOME_FRAGMENTS.put(key, sections)
+        has_trending = bool(sections)
 
     return render_template(
         'index.html',
-        categories=categories,
-        category_titles=category_titles,
+        sections=sections,
         has_trending=has_trending
     )
 
@@ -96,19 +202,17 @@ def search():
     return render_template('search.html', search_type=search_type)
 
 @app.route('/api/search_app', methods=['GET'])
+@cached_response
 def search_app():
     q = request.args.get('q')
     search_type = request.args.get('type', 'name')
 
-    retriever = SteamDataRetriever()
+    retriever = RETRIEVER.get()
 
     if not q:
         return jsonify({'error': 'No query provided'}), 400
 
-    if search_type == 'name':
-        return jsonify(retriever.get_apps_by_name(q))
-
-    elif search_type == 'app-id':
+    if search_type == 'app-id':
         if not q.isdigit():
             return jsonify({'error': 'App ID must be numeric'}), 400
         app_details = retriever.get_app_details(int(q))
@@ -117,30 +221,58 @@ def search_app():
         else:
             return jsonify({'error': f'App with ID {q} not found'}), 404
 
-    elif search_type == 'developer':
-        return jsonify(retriever.get_apps_by_developer(q))
+    try:
+        page, page_size, sort, order = parse_page_args()
+        app_ids = retriever.search_app_ids(search_type, q)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-    elif search_type == 'genre':
-        return jsonify(retriever.get_apps_with_genre(q))
+    result = retriever.get_results_page(app_ids, page, page_size, sort, order == 'desc',
+                                        parse_fields(request.args.get('fields')))
+    result.update(sort=sort, order=order)
+    return jsonify(result)
 
-    elif search_type == 'tag':
-        return jsonify(retriever.get_apps_with_tag(q))
 
-    return jsonify({'error': f'Unknown search type: {search_type}'}), 400
+@app.route('/api/query', methods=['GET'])
+@cached_response
+def query_apps():
+    retriever = RETRIEVER.get()
 
+    try:
+        predicates = parse_query(request.args)
+        page, page_size, sort, order = parse_page_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if not predicates:
+        return jsonify({'error': f'No filter provided; use any of {", ".join(FILTER_PARAMS)}'}), 400
+
+    app_ids, plan = retriever.query_app_ids(predicates)
+
+    result = retriever.get_results_page(app_ids, page, page_size, sort, order == 'desc',
+                                        parse_fields(request.args.get('fields')))
+    result.update(sort=sort, order=order)
+    if request.args.get('explain') in ('1', 'true'):
+        result['plan'] = plan
+    return jsonify(result)
 
-@app.route('/analytics/genre-breakdown')
-def genre_breakdown():
-    retriever = SteamDataRetriever(checkpoint_folder='checkpoints')
-    genres_counter = Counter()
 
-    for app in retriever.apps_dict.values():
-        genres = app.get('genres', [])
-        for genre in genres:
-            genre_name = genre.get('description', 'Unknown')
-            genres_counter[genre_name] += 1
+@app.route('/api/suggest', methods=['GET'])
+@cached_response
+def suggest_app():
+    q = request.args.get('q', '')
+    limit = request.args.get('limit', 10, type=int)
 
-    genres_sorted = genres_counter.most_common(30)
+    retriever = RETRIEVER.get()
+
+    return jsonify(retriever.suggest_apps_by_name(q, min(max(limit, 1), 50)))
+
+
+@app.route('/analytics/genre-breakdown')
+@cached_response
+def genre_breakdown():
+    retriever = RETRIEVER.get()
+    genres_sorted = retriever.aggregates.top_genres(30)
 
     top_10 = genres_sorted[:10]
     next_20 = genres_sorted[10:30]
@@ -152,17 +284,10 @@ def genre_breakdown():
     )
 
 @app.route('/analytics/tag-analysis')
+@cached_response
 def tag_analysis():
-    retriever = SteamDataRetriever(checkpoint_folder='checkpoints')
-    tags_counter = Counter()
-
-    for app in retriever.apps_dict.values():
-        tags = app.get('categories', [])
-        for tag in tags:
-            tag_name = tag.get('description', 'Unknown')
-            tags_counter[tag_name] += 1
-
-    tags_sorted = tags_counter.most_common(30)
+    retriever = RETRIEVER.get()
+    tags_sorted = retriever.aggregates.top_tags(30)
 
     top_10 = tags_sorted[:10]
     next_20 = tags_sorted[10:30]
@@ -174,43 +299,48 @@ def tag_analysis():
     )
 
 @app.route('/analytics/price-analysis')
+@cached_response
 def price_analysis():
-    retriever = SteamDataRetriever()
-    apps = retriever.apps_dict.values()
-
-    # Define price bins
-    bins = {
-        "Free": 0,
-        "$0–5": 0,
-        "$5–10": 0,
-        "$10–20": 0,
-        "$20–30": 0,
-        "$30–50": 0,
-        "$50–70": 0,
-        "$70+": 0
-    }
-
-    for app in apps:
-        if app.get("is_free"):
-            bins["Free"] += 1
-        elif "price_overview" in app:
-            price = app["price_overview"].get("initial", 0) / 100  # convert from cents
-            if price <= 5:
-                bins["$0–5"] += 1
-            elif price <= 10:
-                bins["$5–10"] += 1
-            elif price <= 20:
-                bins["$10–20"] += 1
-            elif price <= 30:
-                bins["$20–30"] += 1
-            elif price <= 50:
-                bins["$30–50"] += 1
-            elif price <= 70:
-                bins["$50–70"] += 1
-            else:
-                bins["$70+"] += 1
-
-    return render_template('price.html', price_buckets=bins)
+    retriever = RETRIEVER.get()
+
+    # ?bins=5,10,20 histograms over user-defined edges; the default buckets come from the aggregates.
+    # this is a page, so invalid edges fall back to the defaults with a message instead of a JSON 400
+    bins_error = None
+    try:
+        edges = parse_edges(request.args.get('bins'))
+    except ValueError as e:
+        edges = None
+        bins_error = str(e)
+
+    if edges:
+        bins = retriever.price_table.histogram(edges)
+    else:
+        bins = retriever.aggregates.price_buckets()
+
+    return render_template('price.html', price_buckets=bins, price_labels=list(bins), bins_error=bins_error)
+
+
+@app.route('/api/price_stats')
+@cached_response
+def price_stats():
+    retriever = RETRIEVER.get()
+    field = request.args.get('field', 'initial')
+
+    if field not in PRICE_FIELDS:
+        return jsonify({'error': f'field must be one of {", ".join(PRICE_FIELDS)}'}), 400
+    try:
+        edges = parse_edges(request.args.get('bins')) or DEFAULT_EDGES
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    table = retriever.price_table
+    return jsonify({
+        'field': field,
+        'edges': edges,
+        'histogram': [[label, count] for label, count in table.histogram(edges, field).items()],
+        'percentiles': table.percentiles(field=field),
+        'stats': table.stats(field),
+    })
 
 APP_EVENT = threading.Event()
 TREND_EVENT = threading.Event()
@@ -221,26 +351,47 @@ APP_PROGRESS = {
     "status":  "idle"
 }
 
+# a crawl interrupted by a restart shows up as paused where it stopped
+APP_PROGRESS.update(load_progress(CHECKPOINT_FOLDER) or {})
+
 TREND_PROGRESS = {
     "total":   0,
     "done":    0,
     "status":  "idle"
 }
 
+for _field in ('total', 'done'):
+    DOWNLOAD_PROGRESS.set_function(lambda field=_field: APP_PROGRESS[field], download='apps', field=_field)
+    DOWNLOAD_PROGRESS.set_function(lambda field=_field: TREND_PROGRESS[field], download='trend', field=_field)
+
 @app.route('/api/download_app_data', methods=['POST'])
 def trigger_app_download():
     # only start if not already running
     if APP_PROGRESS["status"] == "running" or (TREND_PROGRESS["status"] == "running"):
         return jsonify({"message": "Already running"}), 409
 
+    # mode=delta re-fetches new, delisted and stale apps instead of continuing the full crawl;
+    # mode=sharded continues it with `shards` processes
+    mode = request.args.get('mode')
+    try:
+        shards = max(1, int(request.args.get('shards', 4)))
+    except ValueError:
+        return jsonify({"message": "shards must be an integer"}), 400
+
     def _background():
         def progress_cb(total, done, status):
             APP_PROGRESS["total"]  = total
             APP_PROGRESS["done"]   = done
             APP_PROGRESS["status"] = status
 
-        download_all_apps(progress_callback=progress_cb, stop_event=APP_EVENT)
-        APP_PROGRESS["status"] = "completed"
+        if mode == 'delta':
+            refresh_apps(progress_callback=progress_cb, stop_event=APP_EVENT)
+        elif mode == 'sharded':
+            download_sharded(progress_callback=progress_cb, stop_event=APP_EVENT, shards=shards)
+        else:
+            download_all_apps(progress_callback=progress_cb, stop_event=APP_EVENT)
+        # a stopped crawl keeps its open jobs for the next run
+        APP_PROGRESS["status"] = "paused" if APP_EVENT.is_set() else "completed"
 
     # reset & start thread
     is_resume = (APP_PROGRESS["status"] == "paused")
@@ -0,0 +1,54 @@
+import threading
+from typing import Dict, Hashable, Optional
+
+
+class AppCard:
+    """
+    The few fields of an app the home page renders.
+
+    Kept instead of the full appdetails dict so a trending section only
+    touches a handful of small objects.
+    """
+
+    __slots__ = ('steam_appid', 'name', 'header_image', 'screenshot', 'short_description')
+
+    def __init__(self, steam_appid: int, name: str, header_image: Optional[str], screenshot: Optional[str],
+                 short_description: Optional[str]):
+        self.steam_appid = steam_appid
+        self.name = name
+        self.header_image = header_image
+        self.screenshot = screenshot
+        self.short_description = short_description
+
+    @classmethod
+    def from_app(cls, app_data: Dict) -> 'AppCard':
+        screenshots = app_data.get('screenshots') or []
+        return cls(
+            app_data.get('steam_appid', app_data.get('appid')),
+            app_data.get('name'),
+            app_data.get('header_image') or app_data.get('logo'),
+            screenshots[0].get('path_full') if screenshots else None,
+            app_data.get('short_description'),
+        )
+
+
+class FragmentCache:
+    """
+    Rendered HTML fragments for a single key, e.g. (search results folder,
+    catalog version). Storing fragments for a new key drops the old ones,
+    so the cache never outgrows one page's worth of HTML.
+    """
+
+    def __init__(self):
+        self._key = None
+        self._fragments: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Dict[str, str]]:
+        with self._lock:
+            return self._fragments if key == self._key else None
+
+    def put(self, key: Hashable, fragments: Dict[str, str]) -> None:
+        with self._lock:
+            self._key = key
+            self._fragments = fragments
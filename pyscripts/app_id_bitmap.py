@@ -0,0 +1,187 @@
+import os
+import zlib
+import pickle
+from array import array
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Sequence
+
+CRAWL_STATE_FILENAME = 'crawl_state-ckpt-fin.p'
+
+
+class AppIdBitmap:
+    """
+    Set of app ids stored as one bit per possible id.
+
+    Steam app ids are dense below a few million, so a bitmap of the whole
+    range is a few hundred KB where a set of the same ids costs tens of MB
+    of boxed ints. Membership, add and discard are O(1).
+    """
+
+    __slots__ = ('_bits', '_count')
+
+    def __init__(self, app_ids: Iterable[int] = ()):
+        self._bits = bytearray()
+        self._count = 0
+        self.update(app_ids)
+
+    def add(self, appid: int) -> bool:
+        """
+        Add an app id.
+
+        Returns:
+            True if it was not already present
+        """
+        byte_index, mask = appid >> 3, 1 << (appid & 7)
+        if byte_index >= len(self._bits):
+            # grow geometrically so a crawl in ascending id order stays linear
+            self._bits.extend(bytes(max(byte_index + 1 - len(self._bits), len(self._bits) // 2)))
+        if self._bits[byte_index] & mask:
+            return False
+        self._bits[byte_index] |= mask
+        self._count += 1
+        return True
+
+    def discard(self, appid: int) -> None:
+        byte_index, mask = appid >> 3, 1 << (appid & 7)
+        if byte_index < len(self._bits) and self._bits[byte_index] & mask:
+            self._bits[byte_index] &= ~mask & 0xFF
+            self._count -= 1
+
+    def update(self, app_ids: Iterable[int]) -> None:
+        for appid in app_ids:
+            self.add(int(appid))
+
+    def __contains__(self, appid) -> bool:
+        byte_index = appid >> 3
+        return byte_index < len(self._bits) and bool(self._bits[byte_index] & (1 << (appid & 7)))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[int]:
+        for byte_index, byte in enumerate(self._bits):
+            if byte:
+                base = byte_index << 3
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        yield base + bit
+
+    def missing(self, app_ids: Sequence[int]) -> array:
+        """
+        Get the app ids not in the bitmap, preserving their order.
+        """
+        bits = self._bits
+        size = len(bits)
+        return array('I', (appid for appid in app_ids
+                           if (appid >> 3) >= size or not bits[appid >> 3] & (1 << (appid & 7))))
+
+    def to_bytes(self) -> bytes:
+        # sparse ranges compress to almost nothing
+        return zlib.compress(bytes(self._bits.rstrip(b'\x00')))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'AppIdBitmap':
+        bitmap = cls()
+        bitmap._bits = bytearray(zlib.decompress(data))
+        bitmap._count = int.from_bytes(bitmap._bits, 'little').bit_count()
+        return bitmap
+
+
+class CrawlState:
+    """
+    Which app ids the crawl has fetched, excluded or failed on.
+
+    `fetched` mirrors the keys of apps_dict; `excluded` and `errors` are the
+    only in-memory copy of the excluded / error apps, which are written out
+    as the excluded_apps_list / error_apps_list checkpoints (see id_array).
+    """
+
+    def __init__(self, fetched: Optional[AppIdBitmap] = None, excluded: Optional[AppIdBitmap] = None,
+                 errors: Optional[AppIdBitmap] = None):
+        self.fetched = fetched if fetched is not None else AppIdBitmap()
+        self.excluded = excluded if excluded is not None else AppIdBitmap()
+        self.errors = errors if errors is not None else AppIdBitmap()
+
+    @classmethod
+    def build(cls, apps_dict, excluded_apps_list, error_apps_list) -> 'CrawlState':
+        return cls(AppIdBitmap(apps_dict.keys()), AppIdBitmap(excluded_apps_list), AppIdBitmap(error_apps_list))
+
+    def processed(self, appid: int) -> bool:
+        return appid in self.fetched or appid in self.excluded or appid in self.errors
+
+    def remaining(self, app_ids: Sequence[int]) -> array:
+        """
+        Get the app ids that are neither fetched, excluded nor errored.
+        """
+        remaining = self.fetched.missing(app_ids)
+        remaining = self.excluded.missing(remaining)
+        return self.errors.missing(remaining)
+
+
+def id_array(bitmap: AppIdBitmap) -> array:
+    """
+    Get the ids of a bitmap, ascending, in the form the excluded / error
+    list checkpoints are pickled in.
+    """
+    return array('I', bitmap)
+
+
+def load_id_list(path: Optional[Path]) -> AppIdBitmap:
+    """
+    Load an excluded / error list checkpoint (a pickled list or array of ids).
+    """
+    if path is None or not Path(path).exists():
+        return AppIdBitmap()
+    with open(path, 'rb') as handle:
+        return AppIdBitmap(pickle.load(handle))
+
+
+def _file_signature(path: Optional[Path]):
+    if path is None or not Path(path).exists():
+        return None
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def save_crawl_state(checkpoint_folder: Path, ckpt_paths: Sequence[Path], state: CrawlState) -> None:
+    """
+    Save the crawl state next to the checkpoints it mirrors.
+
+    Must be called after the apps_dict / excluded / error checkpoints have
+    been written, since the state records their sizes and mtimes.
+    """
+    save_path = Path(checkpoint_folder) / CRAWL_STATE_FILENAME
+    tmp_path = Path(str(save_path) + '.tmp')
+
+    with open(tmp_path, 'wb') as handle:
+        pickle.dump({
+            'checkpoints': [_file_signature(path) for path in ckpt_paths],
+            'fetched': state.fetched.to_bytes(),
+            'excluded': state.excluded.to_bytes(),
+            'errors': state.errors.to_bytes(),
+        }, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, save_path)
+
+
+def load_crawl_state(checkpoint_folder: Path, ckpt_paths: Sequence[Path]) -> Optional[CrawlState]:
+    """
+    Load the crawl state saved for a set of checkpoints.
+
+    Returns:
+        The state, or None if missing or saved for different checkpoints
+    """
+    load_path = Path(checkpoint_folder) / CRAWL_STATE_FILENAME
+    if not load_path.exists():
+        return None
+
+    try:
+        with open(load_path, 'rb') as handle:
+            saved = pickle.load(handle)
+    except Exception:
+        return None
+
+    if saved.get('checkpoints') != [_file_signature(path) for path in ckpt_paths]:
+        return None
+    return CrawlState(AppIdBitmap.from_bytes(saved['fetched']),
+                      AppIdBitmap.from_bytes(saved['excluded']),
+                      AppIdBitmap.from_bytes(saved['errors']))
@@ -1,37 +1,211 @@
+import os
+import re
+import json
+import codecs
 import traceback
-import requests
+from array import array
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+
 from pyscripts import steam_data_retriever
+from pyscripts.http_client import http_get
 from pyscripts.steam_data_retriever import print_log
 
+APP_LIST_URL = "https://api.steampowered.com/ISteamApps/GetAppList/v2/"
 
-def get_app_ids():
-    req = requests.get("https://api.steampowered.com/ISteamApps/GetAppList/v2/")
+# cached copy of the last full GetAppList body and its validators
+APP_LIST_CACHE_FILENAME = 'applist-cache.json'
+APP_LIST_META_FILENAME = 'applist-cache.meta.json'
 
-    if (req.status_code != 200):
-        print_log("Failed to get all games on steam.")
-        return
+CHUNK_SIZE = 64 * 1024
+
+_APPS_ARRAY_RE = re.compile(r'"apps"\s*:\s*\[')
+# fast path for the usual {"appid":N,"name":"..."} entry without escapes
+_APP_RE = re.compile(r'[\s,]*\{"appid":\s*(\d+),\s*"name":\s*"([^"\\]*)"\}')
+
+
+def iter_app_list(chunks: Iterable[bytes]) -> Iterator[Tuple[int, str]]:
+    """
+    Incrementally parse a GetAppList body.
+
+    Only the current chunk and at most one partial app object are held in
+    memory, so the ~10 MB response is never materialised as a list of dicts.
+
+    Args:
+        chunks: The response body as byte chunks
+
+    Returns:
+        Iterator of (appid, name) in response order
+
+    Raises:
+        ValueError: If the body ends before the apps array is closed
+    """
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    json_decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    in_apps = False
+
+    for chunk in chunks:
+        buffer = buffer[pos:] + text_decoder.decode(chunk)
+        pos = 0
+
+        if not in_apps:
+            match = _APPS_ARRAY_RE.search(buffer)
+            if match is None:
+                # keep a tail in case the key is split across chunks
+                pos = max(0, len(buffer) - 32)
+                continue
+            pos = match.end()
+            in_apps = True
+
+        while True:
+            match = _APP_RE.match(buffer, pos)
+            if match is not None:
+                pos = match.end()
+                yield int(match.group(1)), match.group(2)
+                continue
+
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == ']':
+                return
+            try:
+                app, pos_end = json_decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # object continues in the next chunk
+                break
+            pos = pos_end
+            yield int(app['appid']), app.get('name', '')
+
+    raise ValueError('GetAppList response ended before the apps array was closed')
+
+
+def collect_app_ids(app_list: Iterable[Tuple[int, str]]) -> array:
+    """
+    Get the sorted, de-duplicated ids of the named apps in a parsed app list.
+    """
+    app_ids = array('I')
+    for appid, name in app_list:
+        # skip apps that have empty name
+        if name:
+            app_ids.append(appid)
+    return array('I', sorted(set(app_ids)))
+
+
+def _read_chunks(path: Path) -> Iterator[bytes]:
+    with open(path, 'rb') as handle:
+        while True:
+            chunk = handle.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _tee(chunks: Iterable[bytes], handle) -> Iterator[bytes]:
+    for chunk in chunks:
+        handle.write(chunk)
+        yield chunk
 
+
+def _load_cache_meta(cache_folder: Path) -> dict:
+    meta_path = cache_folder / APP_LIST_META_FILENAME
+    if not (cache_folder / APP_LIST_CACHE_FILENAME).exists() or not meta_path.exists():
+        return {}
     try:
-        data = req.json()
-    except Exception as e:
-        traceback.print_exc(limit=5)
+        with open(meta_path) as handle:
+            return json.load(handle)
+    except Exception:
         return {}
 
-    apps_data = data['applist']['apps']
 
-    apps_ids = []
+def _load_cached_app_ids(cache_folder: Path) -> Optional[array]:
+    cache_path = cache_folder / APP_LIST_CACHE_FILENAME
+    if not cache_path.exists():
+        return None
+    try:
+        return collect_app_ids(iter_app_list(_read_chunks(cache_path)))
+    except Exception:
+        traceback.print_exc(limit=5)
+        return None
+
+
+def get_app_ids(cache_folder: Optional[Path] = None) -> Optional[array]:
+    """
+    Get the ids of all named apps on Steam.
 
-    for app in apps_data:
-        appid = app['appid']
-        name = app['name']
+    The response is parsed as it streams in. With a cache folder, the body
+    is also written there and later calls send If-None-Match /
+    If-Modified-Since, so an unchanged list is read back from disk; the
+    cached copy is also used when Steam cannot be reached.
 
-        # skip apps that have empty name
-        if not name:
-            continue
+    Args:
+        cache_folder: Folder for the cached app list, or None to disable caching
+
+    Returns:
+        Sorted array('I') of app ids, or None on failure
+    """
+    cache_folder = Path(cache_folder) if cache_folder is not None else None
+
+    headers = {}
+    if cache_folder is not None:
+        meta = _load_cache_meta(cache_folder)
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
 
-        apps_ids.append(appid)
+    try:
+        req = http_get(APP_LIST_URL, headers=headers, stream=True)
+    except Exception:
+        traceback.print_exc(limit=5)
+        req = None
+
+    if req is not None and req.status_code == 304 and cache_folder is not None:
+        req.close()
+        print_log('App list not modified, using cached copy.')
+        return _load_cached_app_ids(cache_folder)
+
+    if req is None or req.status_code != 200:
+        print_log("Failed to get all games on steam.")
+        if req is not None:
+            req.close()
+        if cache_folder is not None:
+            cached = _load_cached_app_ids(cache_folder)
+            if cached is not None:
+                print_log('Using cached app list.')
+            return cached
+        return None
+
+    try:
+        chunks = req.iter_content(chunk_size=CHUNK_SIZE)
+        if cache_folder is None:
+            return collect_app_ids(iter_app_list(chunks))
+
+        cache_folder.mkdir(parents=True, exist_ok=True)
+        cache_path = cache_folder / APP_LIST_CACHE_FILENAME
+        tmp_path = Path(str(cache_path) + '.tmp')
+        with open(tmp_path, 'wb') as handle:
+            app_ids = collect_app_ids(iter_app_list(_tee(chunks, handle)))
+            # the parser stops at the end of the apps array; keep the rest of the body
+            for chunk in chunks:
+                handle.write(chunk)
+        os.replace(tmp_path, cache_path)
+
+        with open(cache_folder / APP_LIST_META_FILENAME, 'w') as handle:
+            json.dump({
+                'etag': req.headers.get('ETag'),
+                'last_modified': req.headers.get('Last-Modified'),
+            }, handle)
+        return app_ids
+    except Exception:
+        traceback.print_exc(limit=5)
+        return _load_cached_app_ids(cache_folder) if cache_folder is not None else None
+    finally:
+        req.close()
 
-    return apps_ids
 
 if __name__ == "__main__":
 
@@ -39,4 +213,4 @@ if __name__ == "__main__":
     print_log(id in get_app_ids())
 
     retriever = steam_data_retriever.SteamDataRetriever()
-    print_log(id in retriever.get_all_app_ids())
\ No newline at end of file
+    print_log(id in retriever.get_all_app_ids())
@@ -0,0 +1,157 @@
+import sys
+import zlib
+from typing import Dict, Optional
+
+# long HTML fields stored zlib-compressed; requirement fields are {'minimum', 'recommended'} dicts
+PACKED_FIELDS = (
+    'detailed_description',
+    'about_the_game',
+    'legal_notice',
+    'drm_notice',
+    'ext_user_account_notice',
+    'reviews',
+)
+PACKED_REQUIREMENT_FIELDS = ('pc_requirements', 'mac_requirements', 'linux_requirements')
+
+# shorter texts compress poorly and are cheap to keep as they are
+PACK_MIN_LENGTH = 256
+PACK_LEVEL = 6
+
+# values repeated across many apps, stored once per process and once per pickled checkpoint
+INTERNED_FACET_FIELDS = ('genres', 'categories')
+INTERNED_LIST_FIELDS = ('developers', 'publishers')
+INTERNED_TEXT_FIELDS = ('type', 'supported_languages')
+INTERNED_DICT_FIELDS = ('platforms',)
+
+
+def pack_text(text: str) -> bytes:
+    """
+    Compress a text field. appdetails records come from JSON, so a bytes
+    value in a record is always a packed text; checkpoints stay plain data.
+    """
+    return zlib.compress(text.encode('utf-8'), PACK_LEVEL)
+
+
+def unpack_text(packed: bytes) -> str:
+    return zlib.decompress(packed).decode('utf-8')
+
+
+def _intern(interned: Dict, value):
+    """
+    Get the shared copy of a str or a flat dict of hashable values.
+    """
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        try:
+            key = tuple(sorted(value.items()))
+        except TypeError:
+            return value
+        return interned.setdefault(key, value)
+    return value
+
+
+def intern_fields(app_data: Dict, interned: Dict) -> Dict:
+    """
+    Replace the repeated values of an app record (genre and category dicts,
+    developer/publisher names, type, ...) by copies shared through `interned`.
+
+    Shared values are stored once in memory and, since pickle memoizes
+    objects, once per checkpoint. Callers must not mutate them in place.
+
+    Args:
+        app_data: App details dictionary, updated in place
+        interned: Table shared across the apps of a crawl or a catalog
+
+    Returns:
+        app_data
+    """
+    for key in INTERNED_FACET_FIELDS:
+        if isinstance(app_data.get(key), list):
+            app_data[key] = [_intern(interned, {k: _intern(interned, v) for k, v in facet.items()})
+                             if isinstance(facet, dict) else facet
+                             for facet in app_data[key]]
+    for key in INTERNED_LIST_FIELDS:
+        if isinstance(app_data.get(key), list):
+            app_data[key] = [_intern(interned, value) for value in app_data[key]]
+    for key in INTERNED_TEXT_FIELDS + INTERNED_DICT_FIELDS:
+        if key in app_data:
+            app_data[key] = _intern(interned, app_data[key])
+    return app_data
+
+
+def normalize_app(app_data: Dict, interned: Optional[Dict] = None) -> Dict:
+    """
+    Ingest stage for a fetched appdetails record: compress its long HTML
+    fields and share its repeated values. No data is dropped;
+    expand_app(normalize_app(data)) == data.
+
+    Args:
+        app_data: appdetails['data'], updated in place
+        interned: Optional table shared across the apps of a crawl
+
+    Returns:
+        The normalized record
+    """
+    for key in PACKED_FIELDS:
+        value = app_data.get(key)
+        if isinstance(value, str) and len(value) >= PACK_MIN_LENGTH:
+            app_data[key] = pack_text(value)
+
+    for key in PACKED_REQUIREMENT_FIELDS:
+        requirements = app_data.get(key)
+        if isinstance(requirements, dict):
+            app_data[key] = {
+                level: pack_text(value) if isinstance(value, str) and len(value) >= PACK_MIN_LENGTH else value
+                for level, value in requirements.items()
+            }
+
+    if interned is not None:
+        intern_fields(app_data, interned)
+    return app_data
+
+
+def normalize_apps(apps_dict: Dict, interned: Optional[Dict] = None) -> Dict:
+    """
+    Normalize every record of a loaded catalog, so apps from snapshots
+    written before the ingest stage are packed too and all records share
+    one intern table with the apps fetched after them. Records already
+    normalized keep their packed fields; only their values are re-shared.
+
+    Args:
+        apps_dict: appid -> app details, updated in place
+        interned: Optional table shared across the apps of a crawl
+
+    Returns:
+        apps_dict
+    """
+    for app_data in apps_dict.values():
+        if isinstance(app_data, dict):
+            normalize_app(app_data, interned)
+    return apps_dict
+
+
+def expand_app(app_data: Dict) -> Dict:
+    """
+    Get an app record with its packed fields decompressed.
+
+    Args:
+        app_data: A normalized (or plain) app details dictionary
+
+    Returns:
+        app_data itself if nothing is packed, otherwise an expanded copy
+    """
+    expanded = None
+    for key in PACKED_FIELDS:
+        if isinstance(app_data.get(key), bytes):
+            expanded = expanded if expanded is not None else dict(app_data)
+            expanded[key] = unpack_text(app_data[key])
+
+    for key in PACKED_REQUIREMENT_FIELDS:
+        requirements = app_data.get(key)
+        if isinstance(requirements, dict) and any(isinstance(v, bytes) for v in requirements.values()):
+            expanded = expanded if expanded is not None else dict(app_data)
+            expanded[key] = {level: unpack_text(value) if isinstance(value, bytes) else value
+                             for level, value in requirements.items()}
+
+    return expanded if expanded is not None else app_data
@@ -0,0 +1,352 @@
+"""
+Offline benchmark of the retriever, analytics and checkpoint hot paths.
+
+Generates a synthetic catalog, writes it as checkpoints and reports:
+checkpoint write throughput, retriever load time and peak RSS (pickle and
+columnar catalogs, each in a fresh process), per-query p50/p99 latency and
+the uncached cost of the analytics routes.
+
+    python -m pyscripts.benchmark --apps 50000 --queries 500 --json bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from pyscripts.app_id_bitmap import CrawlState
+from pyscripts.catalog_aggregates import CatalogAggregates
+from pyscripts.columnar_catalog import COLUMNAR_FILENAME
+from pyscripts.query_planner import FacetPredicate, PricePredicate, TypePredicate
+from pyscripts.steam_data_downloader import save_checkpoints, save_columnar_catalog
+from pyscripts.steam_data_retriever import SteamDataRetriever
+from pyscripts.synthetic_catalog import (CATEGORY_WEIGHTS, GENRE_WEIGHTS, generate_apps_dict, parse_weights,
+                                         write_synthetic_checkpoints)
+
+ANALYTICS_ROUTES = [
+    '/analytics/genre-breakdown',
+    '/analytics/tag-analysis',
+    '/analytics/price-analysis',
+    '/api/price_stats',
+]
+
+
+def percentile(sorted_values: Sequence[float], p: float) -> float:
+    """
+    Nearest-rank percentile of an ascending sequence.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(p / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def latency_summary(seconds: List[float]) -> Dict[str, float]:
+    values = sorted(seconds)
+    return {
+        'count': len(values),
+        'p50_ms': round(percentile(values, 50) * 1000, 3),
+        'p99_ms': round(percentile(values, 99) * 1000, 3),
+        'mean_ms': round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+    }
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Peak resident set size of this process in MB, or None where unsupported.
+    """
+    # Linux keeps ru_maxrss across exec, so a spawned child would report its
+    # parent's peak; VmHWM starts over with the new process image
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _load_in_child(checkpoint_folder: str, results) -> None:
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        retriever = SteamDataRetriever(checkpoint_folder)
+    seconds = time.perf_counter() - start
+    results.put({
+        'seconds': round(seconds, 3),
+        'apps': len(retriever.apps_dict),
+        'baseline_rss_mb': baseline,
+        'peak_rss_mb': peak_rss_mb(),
+    })
+
+
+def measure_load(checkpoint_folder: Path) -> Dict:
+    """
+    Time a retriever load in a fresh process so its peak RSS is the load's alone.
+    """
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_load_in_child, args=(str(checkpoint_folder), results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def measure_checkpoint_writes(checkpoint_folder: Path, apps_dict: Dict, repeat: int = 3) -> Dict:
+    """
+    Time save_checkpoints (pickles and aggregates) and the columnar catalog write.
+    """
+    aggregates = CatalogAggregates.build(apps_dict)
+    pickle_times = []
+    columnar_times = []
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            save_checkpoints(checkpoint_folder, 'apps_dict', 'excluded_apps_list', 'error_apps_list',
+                             apps_dict, CrawlState.build(apps_dict, [], []), aggregates=aggregates)
+            pickle_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            save_columnar_catalog(checkpoint_folder, 'apps_dict', apps_dict)
+            columnar_times.append(time.perf_counter() - start)
+
+    def throughput(times, size):
+        best = min(times)
+        return {
+            'best_seconds': round(best, 3),
+            'mb': round(size / 1e6, 1),
+            'mb_per_s': round(size / 1e6 / best, 1),
+            'apps_per_s': round(len(apps_dict) / best),
+        }
+
+    pickle_size = sum(path.stat().st_size for path in checkpoint_folder.glob('*-ckpt-fin.p'))
+    columnar_size = (checkpoint_folder / COLUMNAR_FILENAME).stat().st_size
+    return {
+        'pickle': throughput(pickle_times, pickle_size),
+        'columnar': throughput(columnar_times, columnar_size),
+    }
+
+
+def build_workload(apps_dict: Dict, count: int, seed: int = 0) -> Dict[str, List[Tuple[str, tuple]]]:
+    """
+    Sample `count` calls per query kind, with terms taken from the catalog so most of them match.
+    """
+    rng = random.Random(seed)
+    apps = list(apps_dict.values())
+
+    def name_term():
+        word = rng.choice(rng.choice(apps)['name'].split()).lower()
+        # mostly full words, sometimes the 1-2 letter prefixes typed into the search bar
+        return word if rng.random() < 0.8 else word[:rng.randint(1, 2)]
+
+    def value_term(key):
+        value = rng.choice(rng.choice(apps)[key]).lower()
+        return value[:rng.randint(3, len(value))]
+
+    genres = [description for _, description, _ in GENRE_WEIGHTS]
+    categories = [description for _, description, _ in CATEGORY_WEIGHTS]
+
+    def price_range():
+        low = rng.choice([0, 0, 5, 10, 20])
+        return low, low + rng.choice([5, 10, 20, 60])
+
+    def combined():
+        return [FacetPredicate('genre', rng.choice(genres)), FacetPredicate('tag', rng.choice(categories)),
+                PricePredicate(0, rng.choice([5, 10, 20])), TypePredicate('game')]
+
+    def calls(make_call):
+        return [make_call() for _ in range(count)]
+
+    return {
+        'get_apps_by_name': calls(lambda: ('get_apps_by_name', (name_term(),))),
+        'suggest_apps_by_name': calls(lambda: ('suggest_apps_by_name', (name_term()[:3],))),
+        'get_apps_by_developer': calls(lambda: ('get_apps_by_developer', (value_term('developers'),))),
+        'get_apps_by_publisher': calls(lambda: ('get_apps_by_publisher', (value_term('publishers'),))),
+        'get_apps_with_genre': calls(lambda: ('get_apps_with_genre', (rng.choice(genres),))),
+        'get_apps_with_tag': calls(lambda: ('get_apps_with_tag', (rng.choice(categories),))),
+        'filter_apps_by_price_range': calls(lambda: ('filter_apps_by_price_range', price_range())),
+        'filter_apps_by_type': calls(lambda: ('filter_apps_by_type', (rng.choice(['game', 'dlc', 'demo']),))),
+        'query_app_ids': calls(lambda: ('query_app_ids', (combined(),))),
+    }
+
+
+def measure_queries(retriever: SteamDataRetriever, workload: Dict[str, List]) -> Dict[str, Dict]:
+    report = {}
+    for kind, calls in workload.items():
+        # one untimed call fills any lazily built state
+        method_name, args = calls[0]
+        getattr(retriever, method_name)(*args)
+
+        seconds = []
+        for method_name, args in calls:
+            method = getattr(retriever, method_name)
+            start = time.perf_counter()
+            method(*args)
+            seconds.append(time.perf_counter() - start)
+        report[kind] = latency_summary(seconds)
+    return report
+
+
+def measure_analytics(checkpoint_folder: Path, repeat: int) -> Dict[str, Dict]:
+    """
+    Time the analytics routes through the Flask test client with the response cache cleared,
+    i.e. what a request costs the first time after each new checkpoint.
+    """
+    os.environ['STEAM_CHECKPOINT_FOLDER'] = str(checkpoint_folder)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as flask_app
+
+    client = flask_app.app.test_client()
+    report = {}
+    for route in ANALYTICS_ROUTES:
+        client.get(route)
+        seconds = []
+        for _ in range(repeat):
+            flask_app.RESPONSE_CACHE.clear()
+            start = time.perf_counter()
+            response = client.get(route)
+            seconds.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise RuntimeError(f'{route} returned {response.status_code}')
+        report[route] = latency_summary(seconds)
+    return report
+
+
+def run_benchmark(apps: int, queries: int = 200, seed: int = 0, text_scale: float = 1.0,
+                  genre_weights: Optional[Dict[str, float]] = None,
+                  category_weights: Optional[Dict[str, float]] = None,
+                  workdir: Optional[Path] = None, analytics: bool = True) -> Dict:
+    """
+    Run every benchmark against a synthetic catalog.
+
+    Args:
+        apps: Number of synthetic apps
+        queries: Timed calls per query kind (and per analytics route)
+        seed: Random seed for the catalog and the query terms
+        text_scale: Multiplier for description sizes
+        genre_weights: Genre frequency overrides for the generator
+        category_weights: Category frequency overrides for the generator
+        workdir: Where to write the checkpoints; a temporary folder by default
+        analytics: Also time the analytics routes through the Flask app
+
+    Returns:
+        Report dictionary, as printed by print_report
+    """
+    cleanup = workdir is None
+    workdir = Path(tempfile.mkdtemp(prefix='steam-bench-') if workdir is None else workdir)
+    checkpoint_folder = workdir / 'checkpoints'
+    if checkpoint_folder.exists():
+        shutil.rmtree(checkpoint_folder)
+
+    try:
+        start = time.perf_counter()
+        apps_dict = generate_apps_dict(apps, seed, genre_weights, category_weights, text_scale)
+        report = {
+            'apps': apps,
+            'seed': seed,
+            'text_scale': text_scale,
+            'generate_seconds': round(time.perf_counter() - start, 3),
+            'checkpoint_write': measure_checkpoint_writes(workdir / 'write', apps_dict),
+        }
+
+        workload = build_workload(apps_dict, queries, seed)
+        report['load'] = {}
+        report['queries'] = {}
+
+        # the retriever prefers the columnar catalog once it exists, so measure the pickle first
+        for catalog in ('pickle', 'columnar'):
+            with contextlib.redirect_stdout(io.StringIO()):
+                if catalog == 'pickle':
+                    write_synthetic_checkpoints(checkpoint_folder, apps_dict, seed=seed)
+                else:
+                    save_columnar_catalog(checkpoint_folder, 'apps_dict', apps_dict)
+                report['load'][catalog] = measure_load(checkpoint_folder)
+                retriever = SteamDataRetriever(checkpoint_folder)
+            report['queries'][catalog] = measure_queries(retriever, workload)
+            del retriever
+
+        if analytics:
+            report['analytics'] = measure_analytics(checkpoint_folder, queries)
+        return report
+    finally:
+        if cleanup:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_report(report: Dict) -> None:
+    print(f"Synthetic catalog: {report['apps']} apps (seed {report['seed']}, text scale {report['text_scale']}), "
+          f"generated in {report['generate_seconds']}s")
+
+    print('\nCheckpoint writes')
+    for kind, row in report['checkpoint_write'].items():
+        print(f"  {kind:<10} {row['best_seconds']:>8.3f}s  {row['mb']:>8.1f} MB  {row['mb_per_s']:>8.1f} MB/s  "
+              f"{row['apps_per_s']:>9} apps/s")
+
+    print('\nRetriever load (fresh process)')
+    for kind, row in report['load'].items():
+        print(f"  {kind:<10} {row['seconds']:>8.3f}s  peak RSS {row['peak_rss_mb']} MB "
+              f"(baseline {row['baseline_rss_mb']} MB)")
+
+    def print_latencies(title, rows):
+        print(f'\n{title:<34} {"p50 ms":>10} {"p99 ms":>10} {"mean ms":>10}')
+        for name, row in rows.items():
+            print(f"  {name:<32} {row['p50_ms']:>10.3f} {row['p99_ms']:>10.3f} {row['mean_ms']:>10.3f}")
+
+    for catalog, rows in report['queries'].items():
+        print_latencies(f'Queries ({catalog})', rows)
+    if 'analytics' in report:
+        print_latencies('Analytics (uncached)', report['analytics'])
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Benchmark the retriever, analytics and checkpoint I/O '
+                                                 'on a synthetic catalog.')
+    parser.add_argument('--apps', type=int, default=20000, help='number of synthetic apps (default 20000)')
+    parser.add_argument('--queries', type=int, default=200, help='timed calls per query kind (default 200)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--text-scale', type=float, default=1.0,
+                        help='multiplier for description sizes (1.0 is close to real appdetails)')
+    parser.add_argument('--genre-weights', help='override genre frequencies, e.g. "Indie=0.8,RPG=0.3"')
+    parser.add_argument('--category-weights', help='override category frequencies, e.g. "Co-op=0.2"')
+    parser.add_argument('--workdir', type=Path, help='keep the synthetic checkpoints in this folder')
+    parser.add_argument('--no-analytics', action='store_true', help='skip the Flask analytics routes')
+    parser.add_argument('--json', type=Path, help='also write the report as JSON to this file')
+    args = parser.parse_args(argv)
+
+    try:
+        genre_weights = parse_weights(args.genre_weights, GENRE_WEIGHTS)
+        category_weights = parse_weights(args.category_weights, CATEGORY_WEIGHTS)
+    except ValueError as e:
+        parser.error(str(e))
+
+    report = run_benchmark(args.apps, args.queries, args.seed, args.text_scale, genre_weights, category_weights,
+                           args.workdir, analytics=not args.no_analytics)
+    print_report(report)
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
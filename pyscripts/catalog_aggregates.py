@@ -0,0 +1,202 @@
+import os
+import pickle
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+AGGREGATES_FILENAME = 'aggregates-ckpt-fin.p'
+
+# (label, inclusive upper bound in dollars); None means unbounded
+PRICE_BINS = [
+    ("$0–5", 5),
+    ("$5–10", 10),
+    ("$10–20", 20),
+    ("$20–30", 30),
+    ("$30–50", 50),
+    ("$50–70", 70),
+    ("$70+", None),
+]
+
+
+def price_bin(app_data: Dict) -> Optional[str]:
+    """
+    Get the price analysis bucket an app falls into.
+
+    Args:
+        app_data: App details dictionary
+
+    Returns:
+        Bucket label, or None for paid apps without a price
+    """
+    if app_data.get("is_free"):
+        return "Free"
+    if "price_overview" not in app_data:
+        return None
+
+    price = app_data["price_overview"].get("initial", 0) / 100  # convert from cents
+    for label, upper in PRICE_BINS:
+        if upper is None or price <= upper:
+            return label
+
+
+class CatalogAggregates:
+    """
+    Genre, tag and price-bin counts for the analytics pages.
+
+    Built once per checkpoint and then kept current with add_app /
+    remove_app / replace_app as the downloaders change apps, so the
+    analytics routes never have to walk apps_dict.
+    """
+
+    def __init__(self):
+        self.genres = Counter()
+        self.tags = Counter()
+        self.price_bins = Counter({label: 0 for label in ["Free"] + [label for label, _ in PRICE_BINS]})
+
+    @classmethod
+    def build(cls, apps_dict: Dict[int, Any]) -> 'CatalogAggregates':
+        aggregates = cls()
+        for app_data in apps_dict.values():
+            aggregates.add_app(app_data)
+        return aggregates
+
+    @classmethod
+    def from_columnar(cls, catalog) -> 'CatalogAggregates':
+        """
+        Compute the aggregates from a ColumnarCatalog, reading only the
+        genre, category and price columns.
+        """
+        aggregates = cls()
+        for name, counter in (('genres', aggregates.genres), ('categories', aggregates.tags)):
+            descriptions = [description for _, description in catalog.dictionaries[name]]
+            for code, count in Counter(catalog.column(f'{name}_values')).items():
+                counter[descriptions[code]] += count
+
+        is_free = catalog.column('is_free')
+        for i, initial in enumerate(catalog.column('price_initial')):
+            if is_free[i]:
+                aggregates.price_bins["Free"] += 1
+            elif initial >= 0:
+                price = initial / 100
+                for label, upper in PRICE_BINS:
+                    if upper is None or price <= upper:
+                        aggregates.price_bins[label] += 1
+                        break
+        return aggregates
+
+    @classmethod
+    def from_sqlite(cls, catalog) -> 'CatalogAggregates':
+        """
+        Compute the aggregates from a SqliteCatalog with a few grouped queries.
+        """
+        aggregates = cls()
+        aggregates.genres.update(catalog.facet_counts('genres'))
+        aggregates.tags.update(catalog.facet_counts('categories'))
+
+        for _, is_free, _, initial, _, _ in catalog.price_rows():
+            if is_free:
+                aggregates.price_bins["Free"] += 1
+            elif initial is not None:
+                price = initial / 100
+                for label, upper in PRICE_BINS:
+                    if upper is None or price <= upper:
+                        aggregates.price_bins[label] += 1
+                        break
+        return aggregates
+
+    def _apply(self, app_data: Optional[Dict], delta: int) -> None:
+        if not isinstance(app_data, dict):
+            return
+
+        for genre in app_data.get('genres', []):
+            self.genres[genre.get('description', 'Unknown')] += delta
+        for tag in app_data.get('categories', []):
+            self.tags[tag.get('description', 'Unknown')] += delta
+
+        label = price_bin(app_data)
+        if label:
+            self.price_bins[label] += delta
+
+    def add_app(self, app_data: Optional[Dict]) -> None:
+        self._apply(app_data, 1)
+
+    def remove_app(self, app_data: Optional[Dict]) -> None:
+        self._apply(app_data, -1)
+
+    def replace_app(self, old_data: Optional[Dict], new_data: Optional[Dict]) -> None:
+        """
+        Account for an app being added (old_data is None) or re-fetched.
+        """
+        self._apply(old_data, -1)
+        self._apply(new_data, 1)
+
+    def top_genres(self, n: int = 30):
+        return [(name, count) for name, count in self.genres.most_common(n) if count > 0]
+
+    def top_tags(self, n: int = 30):
+        return [(name, count) for name, count in self.tags.most_common(n) if count > 0]
+
+    def price_buckets(self) -> Dict[str, int]:
+        return dict(self.price_bins)
+
+    def to_dict(self) -> Dict[str, Dict[str, int]]:
+        return {
+            'genres': dict(self.genres),
+            'tags': dict(self.tags),
+            'price_bins': dict(self.price_bins),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Dict[str, int]]) -> 'CatalogAggregates':
+        aggregates = cls()
+        aggregates.genres.update(data['genres'])
+        aggregates.tags.update(data['tags'])
+        aggregates.price_bins.update(data['price_bins'])
+        return aggregates
+
+
+def _file_signature(path: Path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def save_aggregates(apps_dict_path: Path, aggregates: CatalogAggregates) -> None:
+    """
+    Save aggregates next to the apps_dict checkpoint they were computed for.
+
+    Must be called after the apps_dict checkpoint has been written, since the
+    sidecar records that file's size and mtime.
+    """
+    apps_dict_path = Path(apps_dict_path)
+    save_path = apps_dict_path.parent / AGGREGATES_FILENAME
+    tmp_path = Path(str(save_path) + '.tmp')
+
+    with open(tmp_path, 'wb') as handle:
+        pickle.dump({
+            'apps_dict': _file_signature(apps_dict_path),
+            'aggregates': aggregates.to_dict(),
+        }, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, save_path)
+
+
+def load_aggregates(apps_dict_path: Path) -> Optional[CatalogAggregates]:
+    """
+    Load the aggregates saved for an apps_dict checkpoint.
+
+    Returns:
+        The aggregates, or None if missing or saved for a different version of the checkpoint
+    """
+    apps_dict_path = Path(apps_dict_path)
+    load_path = apps_dict_path.parent / AGGREGATES_FILENAME
+    if not load_path.exists() or not apps_dict_path.exists():
+        return None
+
+    try:
+        with open(load_path, 'rb') as handle:
+            saved = pickle.load(handle)
+    except Exception:
+        return None
+
+    if saved.get('apps_dict') != _file_signature(apps_dict_path):
+        return None
+    return CatalogAggregates.from_dict(saved['aggregates'])
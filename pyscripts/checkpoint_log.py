@@ -0,0 +1,147 @@
+import os
+import time
+import pickle
+from pathlib import Path
+from typing import Optional
+
+from pyscripts.delta_refresh import record_fetch
+
+LOG_FILENAME = 'apps_log-ckpt.wal'
+
+# record kinds
+APP = 'app'
+EXCLUDED = 'excluded'
+ERROR = 'error'
+REMOVED = 'removed'
+
+
+class CheckpointLog:
+    """
+    Append-only log of crawl results since the last checkpoint snapshot.
+
+    Each fetched, excluded, errored or removed app is one pickled
+    (kind, appid, data, logged_at) record. Records are flushed immediately and fsync'ed every
+    `fsync_every` appends, so checkpointing costs O(batch) instead of
+    re-pickling the whole catalog; compact() folds the log into a snapshot
+    once it has grown large enough.
+    """
+
+    def __init__(self, path: Path, fsync_every: int = 50, records: int = 0):
+        """
+        Args:
+            path: Log file, opened for appending
+            fsync_every: Appends between fsyncs
+            records: Records already in the log (as counted by replay_log), so
+                should_compact still triggers after a restart
+        """
+        self.path = Path(path)
+        self.fsync_every = fsync_every
+        self.records = records
+
+        self._pending = 0
+        self._handle = open(self.path, 'ab')
+
+    def append(self, kind: str, appid: int, data: Optional[dict] = None) -> None:
+        pickle.dump((kind, appid, data, time.time()), self._handle, protocol=pickle.HIGHEST_PROTOCOL)
+        self._handle.flush()
+        self.records += 1
+        self._pending += 1
+        if self._pending >= self.fsync_every:
+            self.sync()
+
+    def sync(self) -> None:
+        if self._handle.closed:
+            return
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+        self._pending = 0
+
+    def should_compact(self, catalog_size: int, min_records: int = 500, ratio: float = 0.25) -> bool:
+        """
+        Compact once the log holds `ratio` of the catalog (at least `min_records`),
+        so the total snapshot cost over a crawl stays linear in its length.
+        """
+        return self.records >= max(min_records, int(catalog_size * ratio))
+
+    def truncate(self) -> None:
+        """
+        Drop all records; call only after they are safely in a snapshot.
+        """
+        self._handle.close()
+        self._handle = open(self.path, 'wb')
+        self.sync()
+        self.records = 0
+
+    def close(self) -> None:
+        if not self._handle.closed:
+            self.sync()
+            self._handle.close()
+
+
+def replay_log(path: Path, apps_dict: dict, crawl_state, aggregates=None, repair: bool = True,
+               app_meta: Optional[dict] = None) -> int:
+    """
+    Apply the records of a checkpoint log on top of a loaded snapshot.
+
+    Replaying is idempotent, so records that already made it into the
+    snapshot are harmless. A torn record at the end of the log (crash
+    mid-write) is cut off so later appends start from a clean offset. A
+    damaged record with more data after it is not a torn tail: the error is
+    raised and the file is left alone, so valid later records are not lost.
+
+    Args:
+        path: Log file
+        apps_dict: Snapshot apps_dict, updated in place
+        crawl_state: Snapshot CrawlState (fetched / excluded / error app ids), updated in place
+        aggregates: Optional CatalogAggregates kept in step with apps_dict
+        repair: Cut off a torn trailing record; readers that must not write pass False
+        app_meta: Optional per-app fetch metadata (see delta_refresh), updated in place
+
+    Returns:
+        Number of records replayed
+    """
+    path = Path(path)
+    if not path.exists():
+        return 0
+
+    replayed = 0
+
+    size = os.path.getsize(path)
+    with open(path, 'rb') as handle:
+        good_offset = 0
+        while True:
+            try:
+                kind, appid, data, logged_at = pickle.load(handle)
+            except (EOFError, pickle.UnpicklingError):
+                # clean EOF, or a record torn by a crash mid-write: the unpickler ran out of input
+                if handle.tell() < size:
+                    raise
+                break
+            good_offset = handle.tell()
+            replayed += 1
+
+            if kind == APP:
+                if aggregates is not None:
+                    aggregates.replace_app(apps_dict.get(appid), data)
+                apps_dict[appid] = data
+                if app_meta is not None:
+                    record_fetch(app_meta, appid, data, logged_at)
+                crawl_state.fetched.add(appid)
+            elif kind == REMOVED:
+                if aggregates is not None:
+                    aggregates.remove_app(apps_dict.get(appid))
+                apps_dict.pop(appid, None)
+                if app_meta is not None:
+                    app_meta.pop(appid, None)
+                crawl_state.fetched.discard(appid)
+            elif kind == EXCLUDED:
+                crawl_state.excluded.add(appid)
+            elif kind == ERROR:
+                crawl_state.errors.add(appid)
+
+        torn = good_offset < size
+
+    if torn and repair:
+        os.truncate(path, good_offset)
+
+    return replayed
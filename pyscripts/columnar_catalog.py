@@ -0,0 +1,411 @@
+import os
+import re
+import sys
+import json
+import mmap
+import struct
+import pickle
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from pyscripts.app_records import expand_app
+from pyscripts.record_cache import RECORD_CACHE_BYTES, RecordCache
+from pyscripts.result_pages import summarize_app
+
+COLUMNAR_FILENAME = 'apps_catalog-ckpt-fin.col'
+
+MAGIC = b'SDECOL01'
+ALIGN = 8
+LIST_SEP = '\x1f'
+
+# fixed-width numeric columns: name -> array typecode
+NUMERIC_COLUMNS = {
+    'appid': 'I',
+    'price_initial': 'i',   # cents, -1 when the app has no price_overview
+    'price_final': 'i',
+    'discount_percent': 'B',
+    'currency': 'B',        # code into the 'currency' dictionary
+    'is_free': 'B',
+    'type': 'B',            # code into the 'type' dictionary
+    'release_year': 'H',    # 0 when unknown
+}
+
+# dictionary-encoded multi-valued columns: name -> app dict key
+FACET_COLUMNS = {
+    'genres': 'genres',
+    'categories': 'categories',
+}
+
+# offset-indexed utf-8 blobs; 'summary' is the JSON of summarize_app, 'record' the full app dict
+BLOB_COLUMNS = ['name', 'developers', 'publishers', 'summary', 'record']
+
+_YEAR_RE = re.compile(r'(\d{4})')
+
+
+def _release_year(app_data: Dict) -> int:
+    date = (app_data.get('release_date') or {}).get('date') or ''
+    m = _YEAR_RE.search(date)
+    return int(m.group(1)) if m else 0
+
+
+def _code(dictionary: Dict, value) -> int:
+    if value not in dictionary:
+        dictionary[value] = len(dictionary)
+    return dictionary[value]
+
+
+def write_columnar_catalog(path: Path, apps_dict: Dict[int, Any], source_path: Optional[Path] = None) -> int:
+    """
+    Write apps_dict in the columnar catalog format.
+
+    Args:
+        path: Where to write the catalog
+        apps_dict: App id -> app details dictionary
+        source_path: apps_dict checkpoint this catalog mirrors; its size and
+            mtime are recorded so readers can tell when the catalog is stale
+
+    Returns:
+        Number of apps written
+    """
+    path = Path(path)
+    apps = sorted(
+        (int(app_id), app_data) for app_id, app_data in apps_dict.items()
+        if isinstance(app_data, dict)
+    )
+
+    numeric = {name: array(code) for name, code in NUMERIC_COLUMNS.items()}
+    dictionaries = {'type': {}, 'currency': {}}
+    facet_dicts = {name: {} for name in FACET_COLUMNS}
+    facet_offsets = {name: array('Q', [0]) for name in FACET_COLUMNS}
+    facet_values = {name: array('H') for name in FACET_COLUMNS}
+    blob_offsets = {name: array('Q', [0]) for name in BLOB_COLUMNS}
+    blob_data = {name: bytearray() for name in BLOB_COLUMNS}
+
+    for app_id, app_data in apps:
+        has_price = 'price_overview' in app_data
+        price = app_data.get('price_overview') or {}
+
+        numeric['appid'].append(app_id)
+        numeric['price_initial'].append(int(price.get('initial', 0)) if has_price else -1)
+        numeric['price_final'].append(int(price.get('final', 0)) if has_price else -1)
+        numeric['discount_percent'].append(min(int(price.get('discount_percent', 0) or 0), 255))
+        numeric['currency'].append(_code(dictionaries['currency'], price.get('currency', '')))
+        numeric['is_free'].append(1 if app_data.get('is_free') else 0)
+        numeric['type'].append(_code(dictionaries['type'], app_data.get('type', '')))
+        numeric['release_year'].append(_release_year(app_data))
+
+        for name, key in FACET_COLUMNS.items():
+            for facet in app_data.get(key) or []:
+                if isinstance(facet, dict):
+                    facet_key = (str(facet.get('id')), facet.get('description', 'Unknown'))
+                    facet_values[name].append(_code(facet_dicts[name], facet_key))
+            facet_offsets[name].append(len(facet_values[name]))
+
+        texts = {
+            'name': app_data.get('name') or '',
+            'developers': LIST_SEP.join(app_data.get('developers') or []),
+            'publishers': LIST_SEP.join(app_data.get('publishers') or []),
+            'summary': json.dumps(summarize_app(app_data), separators=(',', ':')),
+            'record': json.dumps(expand_app(app_data), separators=(',', ':')),
+        }
+        for name, text in texts.items():
+            blob_data[name] += text.encode('utf-8')
+            blob_offsets[name].append(len(blob_data[name]))
+
+    sections = dict(numeric)
+    for name in FACET_COLUMNS:
+        sections[f'{name}_offsets'] = facet_offsets[name]
+        sections[f'{name}_values'] = facet_values[name]
+    for name in BLOB_COLUMNS:
+        sections[f'{name}_offsets'] = blob_offsets[name]
+        sections[f'{name}_data'] = blob_data[name]
+
+    source = None
+    if source_path is not None and Path(source_path).exists():
+        st = os.stat(source_path)
+        source = [st.st_size, st.st_mtime_ns]
+
+    columns = {}
+    offset = 0
+    for name, data in sections.items():
+        nbytes = len(data) * data.itemsize if isinstance(data, array) else len(data)
+        columns[name] = {
+            'offset': offset,
+            'length': nbytes,
+            'typecode': data.typecode if isinstance(data, array) else 'B',
+        }
+        offset += nbytes + (-nbytes % ALIGN)
+
+    header = json.dumps({
+        'count': len(apps),
+        'byteorder': sys.byteorder,
+        'source': source,
+        'columns': columns,
+        'dictionaries': {
+            'type': list(dictionaries['type']),
+            'currency': list(dictionaries['currency']),
+            **{name: [list(key) for key in facet_dicts[name]] for name in FACET_COLUMNS},
+        },
+    }).encode('utf-8')
+    header += b' ' * (-(len(MAGIC) + 8 + len(header)) % ALIGN)
+
+    tmp_path = Path(str(path) + '.tmp')
+    with open(tmp_path, 'wb') as handle:
+        handle.write(MAGIC)
+        handle.write(struct.pack('<Q', len(header)))
+        handle.write(header)
+        for name, data in sections.items():
+            raw = data.tobytes() if isinstance(data, array) else bytes(data)
+            handle.write(raw)
+            handle.write(b'\0' * (-len(raw) % ALIGN))
+    os.replace(tmp_path, path)
+
+    return len(apps)
+
+
+class ColumnarCatalog:
+    """
+    Read-only, memory-mapped view of a columnar catalog file.
+
+    Opening only parses the small JSON header; columns are zero-copy
+    memoryviews into the mapping, so callers pay only for the pages of the
+    columns they actually touch.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._handle = open(self.path, 'rb')
+        self._mmap = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"Not a columnar catalog: {self.path}")
+
+        (header_len,) = struct.unpack_from('<Q', self._mmap, len(MAGIC))
+        header_start = len(MAGIC) + 8
+        header = json.loads(self._mmap[header_start:header_start + header_len])
+
+        if header['byteorder'] != sys.byteorder:
+            self.close()
+            raise ValueError(f"Columnar catalog written on a {header['byteorder']}-endian machine: {self.path}")
+
+        self.count: int = header['count']
+        self.source = tuple(header['source']) if header['source'] else None
+        self.dictionaries: Dict[str, list] = header['dictionaries']
+        self._columns_meta = header['columns']
+        self._data_start = header_start + header_len
+        self._columns: Dict[str, memoryview] = {}
+
+    def close(self) -> None:
+        self._columns = {}
+        if not self._mmap.closed:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # column views are still referenced somewhere; the mapping goes with them
+                pass
+        self._handle.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def column(self, name: str) -> memoryview:
+        """
+        Get a column as a typed memoryview (one element per app for numeric columns).
+        """
+        view = self._columns.get(name)
+        if view is None:
+            meta = self._columns_meta[name]
+            start = self._data_start + meta['offset']
+            view = memoryview(self._mmap)[start:start + meta['length']].cast(meta['typecode'])
+            self._columns[name] = view
+        return view
+
+    def position(self, app_id: int) -> Optional[int]:
+        """
+        Get the row of an app id, or None if it is not in the catalog.
+        """
+        appids = self.column('appid')
+        i = bisect_left(appids, app_id)
+        if i < len(appids) and appids[i] == app_id:
+            return i
+        return None
+
+    def _blob(self, name: str, i: int) -> bytes:
+        offsets = self.column(f'{name}_offsets')
+        return self.column(f'{name}_data')[offsets[i]:offsets[i + 1]].tobytes()
+
+    def text(self, name: str, i: int) -> str:
+        return self._blob(name, i).decode('utf-8')
+
+    def text_list(self, name: str, i: int) -> List[str]:
+        text = self.text(name, i)
+        return text.split(LIST_SEP) if text else []
+
+    def facet_codes(self, name: str, i: int) -> memoryview:
+        offsets = self.column(f'{name}_offsets')
+        return self.column(f'{name}_values')[offsets[i]:offsets[i + 1]]
+
+    def facets(self, name: str) -> List[Dict[str, str]]:
+        """
+        Get the dictionary of a facet column as Steam-style {'id', 'description'} dicts.
+        """
+        return [{'id': facet_id, 'description': description} for facet_id, description in self.dictionaries[name]]
+
+    def record(self, i: int) -> Dict:
+        """
+        Decode the full app details dictionary stored for row `i`.
+        """
+        return json.loads(self._blob('record', i))
+
+    def record_size(self, i: int) -> int:
+        offsets = self.column('record_offsets')
+        return offsets[i + 1] - offsets[i]
+
+    def summaries(self) -> Dict[int, Dict]:
+        """
+        Decode the summary of every app, sharing identical facet dicts and
+        names between apps. Catalogs written before the summary column
+        existed are summarized from their full records.
+
+        Returns:
+            Dictionary mapping app ids to summarize_app dicts, in appid order
+        """
+        interned: Dict = {}
+        appids = self.column('appid')
+        if 'summary_offsets' in self._columns_meta:
+            return {appid: summarize_app(json.loads(self._blob('summary', i)), interned)
+                    for i, appid in enumerate(appids)}
+        return {appid: summarize_app(self.record(i), interned) for i, appid in enumerate(appids)}
+
+
+class ColumnarAppsDict(MutableMapping):
+    """
+    apps_dict stand-in backed by a ColumnarCatalog that keeps only a compact
+    summary of each app in memory.
+
+    `summaries` holds summarize_app dicts for every app, enough for cards,
+    sorting and the query planner. Full app dicts are decoded on demand and
+    kept in a RecordCache bounded to `cache_bytes`. Apps written after the
+    catalog (e.g. replayed from the checkpoint log) are spilled to an
+    anonymous temporary file and read back by offset the same way, so the
+    catalog itself is never modified.
+    """
+
+    def __init__(self, catalog: ColumnarCatalog, cache_bytes: int = RECORD_CACHE_BYTES):
+        self.catalog = catalog
+        self.cache = RecordCache(cache_bytes)
+        self.summaries: Dict[int, Dict] = catalog.summaries()
+
+        # apps changed since the catalog was written: app id -> (offset, length) in the spill file
+        self._overlay: Dict[int, tuple] = {}
+        self._removed = set()
+        self._spill = None
+        self._spill_lock = threading.Lock()
+        self._interned: Dict = {}
+
+    @property
+    def changed(self) -> bool:
+        """
+        True if apps were written or removed since the catalog was loaded.
+        """
+        return bool(self._overlay or self._removed)
+
+    def _read_spilled(self, offset: int, length: int) -> Dict:
+        with self._spill_lock:
+            self._spill.seek(offset)
+            return pickle.loads(self._spill.read(length))
+
+    def __getitem__(self, app_id) -> Dict:
+        record = self.cache.get(app_id)
+        if record is not None:
+            return record
+
+        if app_id in self._overlay:
+            offset, length = self._overlay[app_id]
+            record = self._read_spilled(offset, length)
+            self.cache.put(app_id, record, length)
+            return record
+
+        i = self.catalog.position(app_id) if isinstance(app_id, int) and app_id not in self._removed else None
+        if i is None:
+            raise KeyError(app_id)
+        record = self.catalog.record(i)
+        self.cache.put(app_id, record, self.catalog.record_size(i))
+        return record
+
+    def __setitem__(self, app_id, app_data: Dict) -> None:
+        raw = pickle.dumps(app_data, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._spill_lock:
+            if self._spill is None:
+                self._spill = tempfile.TemporaryFile(prefix='apps_overlay-')
+            offset = self._spill.seek(0, os.SEEK_END)
+            self._spill.write(raw)
+        self._overlay[app_id] = (offset, len(raw))
+        self._removed.discard(app_id)
+        self.summaries[app_id] = summarize_app(app_data, self._interned)
+        self.cache.discard(app_id)
+
+    def __delitem__(self, app_id) -> None:
+        if app_id not in self:
+            raise KeyError(app_id)
+        self._overlay.pop(app_id, None)
+        if isinstance(app_id, int) and self.catalog.position(app_id) is not None:
+            self._removed.add(app_id)
+        del self.summaries[app_id]
+        self.cache.discard(app_id)
+
+    def __contains__(self, app_id) -> bool:
+        return app_id in self.summaries
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.summaries)
+
+    def __len__(self) -> int:
+        return len(self.summaries)
+
+    def close(self) -> None:
+        with self._spill_lock:
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+
+
+def load_columnar_catalog(path: Path, source_path: Optional[Path] = None) -> Optional[ColumnarCatalog]:
+    """
+    Open a columnar catalog if it exists and mirrors `source_path`.
+
+    Returns:
+        The catalog, or None if missing, unreadable or written for a different
+        version of the apps_dict checkpoint
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+
+    try:
+        catalog = ColumnarCatalog(path)
+    except (OSError, ValueError, KeyError):
+        return None
+
+    if source_path is not None:
+        st = os.stat(source_path)
+        if catalog.source != (st.st_size, st.st_mtime_ns):
+            catalog.close()
+            return None
+    return catalog
+
+
+if __name__ == '__main__':
+    # convert an existing apps_dict checkpoint, e.g.
+    # python -m pyscripts.columnar_catalog checkpoints/apps_dict-ckpt-fin.p
+    source = Path(sys.argv[1]).resolve()
+    with open(source, 'rb') as f:
+        apps = pickle.load(f)
+    target = source.parent / COLUMNAR_FILENAME
+    print(f"Wrote {write_columnar_catalog(target, apps, source)} apps to {target}")
@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import pickle
+import hashlib
+from pathlib import Path
+from typing import Container, Dict, Iterable, List, Optional, Tuple
+
+from pyscripts.app_records import expand_app
+
+APP_META_FILENAME = 'app_meta-ckpt-fin.p'
+
+DEFAULT_TTL_DAYS = 30
+
+# lower runs first
+PRIORITY_NEW = 0
+PRIORITY_REMOVED = 1
+PRIORITY_STALE = 2
+
+
+def content_hash(app_data: Dict) -> str:
+    """
+    Stable hash of an app's details, used to tell whether a refresh changed anything.
+    """
+    encoded = json.dumps(expand_app(app_data), sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+def record_fetch(app_meta: Dict[int, Tuple[float, str]], appid: int, app_data: Dict,
+                 fetched_at: Optional[float] = None) -> bool:
+    """
+    Record that an app was fetched.
+
+    Args:
+        app_meta: appid -> (fetched_at, content hash), updated in place
+        appid: The fetched app
+        app_data: Its details
+        fetched_at: Fetch time (epoch seconds), defaults to now
+
+    Returns:
+        True if the content differs from the previous fetch
+    """
+    digest = content_hash(app_data)
+    previous = app_meta.get(appid)
+    app_meta[appid] = (fetched_at if fetched_at is not None else time.time(), digest)
+    return previous is None or previous[1] != digest
+
+
+def seed_app_meta(app_meta: Dict[int, Tuple[float, Optional[str]]], apps_dict: Dict, fetched_at: float) -> int:
+    """
+    Give the apps fetched before per-app metadata was kept a fetch time,
+    typically the mtime of the snapshot they were loaded from. Their content
+    hash stays None until their next fetch.
+
+    Args:
+        app_meta: appid -> (fetched_at, content hash), updated in place
+        apps_dict: The stored catalog
+        fetched_at: Fetch time (epoch seconds) assumed for the apps without metadata
+
+    Returns:
+        Number of apps seeded
+    """
+    seeded = 0
+    for appid in apps_dict.keys():
+        if appid not in app_meta:
+            app_meta[appid] = (fetched_at, None)
+            seeded += 1
+    return seeded
+
+
+def load_app_meta(checkpoint_folder: Path) -> Dict[int, Tuple[float, str]]:
+    path = Path(checkpoint_folder) / APP_META_FILENAME
+    if not path.exists():
+        return {}
+    with open(path, 'rb') as handle:
+        return pickle.load(handle)
+
+
+def save_app_meta(checkpoint_folder: Path, app_meta: Dict[int, Tuple[float, str]]) -> None:
+    path = Path(checkpoint_folder) / APP_META_FILENAME
+    tmp_path = Path(str(path) + '.tmp')
+    with open(tmp_path, 'wb') as handle:
+        pickle.dump(app_meta, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+class RefreshPlan:
+    """
+    Apps to re-fetch, grouped by why.
+
+    new:     listed by GetAppList but never fetched
+    removed: in the catalog but no longer listed; re-fetched to confirm
+             before they are dropped
+    stale:   fetched longer than the TTL ago, oldest first; apps without a
+             fetch time are left out (see seed_app_meta)
+    """
+
+    def __init__(self, new: List[int], removed: List[int], stale: List[int]):
+        self.new = new
+        self.removed = removed
+        self.stale = stale
+
+    def __len__(self) -> int:
+        return len(self.new) + len(self.removed) + len(self.stale)
+
+    def ordered(self) -> List[Tuple[int, int]]:
+        """
+        Get (priority, appid) pairs in the order they should be fetched.
+        """
+        return [(PRIORITY_NEW, appid) for appid in self.new] \
+            + [(PRIORITY_REMOVED, appid) for appid in self.removed] \
+            + [(PRIORITY_STALE, appid) for appid in self.stale]
+
+    def app_ids(self) -> List[int]:
+        return [appid for _, appid in self.ordered()]
+
+
+def plan_refresh(current_app_ids: Iterable[int], apps_dict: Dict, excluded_apps: Container[int],
+                 app_meta: Dict[int, Tuple[float, str]], ttl_seconds: float,
+                 now: Optional[float] = None, max_apps: Optional[int] = None) -> RefreshPlan:
+    """
+    Diff the current GetAppList against the stored catalog.
+
+    Args:
+        current_app_ids: App ids Steam currently lists
+        apps_dict: The stored catalog
+        excluded_apps: App ids known not to have store pages, e.g. CrawlState.excluded
+        app_meta: appid -> (fetched_at, content hash)
+        ttl_seconds: Age after which a fetched app is considered stale
+        now: Current epoch time, defaults to time.time()
+        max_apps: Cap on the number of apps in the plan, highest priority kept
+
+    Returns:
+        The RefreshPlan
+    """
+    now = time.time() if now is None else now
+    current = set(map(int, current_app_ids))
+    stored = set(map(int, apps_dict.keys()))
+
+    new = sorted(appid for appid in current - stored if appid not in excluded_apps)
+    removed = sorted(stored - current)
+
+    cutoff = now - ttl_seconds
+    ages = []
+    for appid in stored & current:
+        meta = app_meta.get(appid)
+        if meta is not None and meta[0] <= cutoff:
+            ages.append((meta[0], appid))
+    stale = [appid for _, appid in sorted(ages)]
+
+    plan = RefreshPlan(new, removed, stale)
+    if max_apps is not None and len(plan) > max_apps:
+        budget = max_apps
+        plan.new, budget = plan.new[:budget], max(0, budget - len(plan.new))
+        plan.removed, budget = plan.removed[:budget], max(0, budget - len(plan.removed))
+        plan.stale = plan.stale[:budget]
+    return plan
@@ -0,0 +1,150 @@
+from array import array
+from typing import Dict, Iterable, Tuple
+
+
+def intersect_postings(*postings) -> array:
+    """
+    Intersect sorted app id posting lists.
+
+    Args:
+        postings: Sorted sequences of app ids
+
+    Returns:
+        Sorted array('I') of the app ids present in every posting list
+    """
+    if not postings:
+        return array('I')
+
+    ordered = sorted(postings, key=len)
+    result = set(ordered[0])
+    for posting in ordered[1:]:
+        if not result:
+            break
+        result.intersection_update(posting)
+    return array('I', sorted(result))
+
+
+def union_postings(*postings) -> array:
+    """
+    Union sorted app id posting lists.
+
+    Args:
+        postings: Sorted sequences of app ids
+
+    Returns:
+        Sorted array('I') of the app ids present in any posting list
+    """
+    if len(postings) == 1:
+        return array('I', postings[0])
+
+    result = set()
+    for posting in postings:
+        result.update(posting)
+    return array('I', sorted(result))
+
+
+class FacetIndex:
+    """
+    Posting lists for one facet of the catalog (genres or categories).
+
+    Every facet id and every lowercased description maps to a sorted
+    array('I') of the app ids carrying it, so lookups never touch the
+    app dicts.
+    """
+
+    def __init__(self):
+        self.by_id: Dict[str, array] = {}
+        self.by_description: Dict[str, array] = {}
+
+        # facet id -> description as Steam spells it
+        self.descriptions: Dict[str, str] = {}
+
+    @classmethod
+    def build(cls, entries: Iterable[Tuple[int, Iterable[dict]]]) -> 'FacetIndex':
+        """
+        Build an index from (app_id, facet dicts) pairs, where each facet dict
+        looks like Steam's {'id': ..., 'description': ...}.
+
+        Args:
+            entries: Iterable of (app_id, list of facet dicts)
+
+        Returns:
+            The populated FacetIndex
+        """
+        index = cls()
+        by_id: Dict[str, set] = {}
+        by_description: Dict[str, set] = {}
+
+        for app_id, facets in entries:
+            for facet in facets:
+                if not isinstance(facet, dict):
+                    continue
+
+                if facet.get('id') is not None:
+                    facet_id = str(facet['id'])
+                    by_id.setdefault(facet_id, set()).add(app_id)
+                    if facet.get('description'):
+                        index.descriptions.setdefault(facet_id, facet['description'])
+
+                if facet.get('description'):
+                    by_description.setdefault(facet['description'].lower(), set()).add(app_id)
+
+        index.by_id = {key: array('I', sorted(ids)) for key, ids in by_id.items()}
+        index.by_description = {key: array('I', sorted(ids)) for key, ids in by_description.items()}
+        return index
+
+    def lookup(self, term: str) -> array:
+        """
+        Get the apps with a facet whose description contains `term`
+        (case-insensitive), matching the old per-app substring scan.
+
+        Args:
+            term: Description substring, e.g. 'rpg' or 'co-op'
+
+        Returns:
+            Sorted array('I') of app ids
+        """
+        term = term.lower()
+        postings = [
+            posting for description, posting in self.by_description.items()
+            if term in description
+        ]
+        return union_postings(*postings) if postings else array('I')
+
+    def estimate(self, term: str) -> int:
+        """
+        Upper bound on the number of apps lookup(term) returns, without
+        merging the postings; exact when one description matches.
+        """
+        term = term.lower()
+        return sum(len(posting) for description, posting in self.by_description.items() if term in description)
+
+    def lookup_id(self, facet_id) -> array:
+        """
+        Get the apps carrying a facet id, e.g. genre '23' (Indie).
+
+        Args:
+            facet_id: Steam's id for the genre or category
+
+        Returns:
+            Sorted array('I') of app ids
+        """
+        return self.by_id.get(str(facet_id), array('I'))
+
+    def query(self, terms: Iterable[str], match: str = 'all') -> array:
+        """
+        Combine several facet lookups.
+
+        Args:
+            terms: Description substrings to look up
+            match: 'all' to intersect the lookups, 'any' to union them
+
+        Returns:
+            Sorted array('I') of app ids
+        """
+        postings = [self.lookup(term) for term in terms]
+        if not postings:
+            return array('I')
+        if match == 'any':
+            return union_postings(*postings)
+        return intersect_postings(*postings)
@@ -0,0 +1,273 @@
+import time
+import queue
+import threading
+from collections import deque
+from typing import Callable, Iterable, Iterator, Optional
+
+import requests
+
+from pyscripts.http_client import http_get
+from pyscripts.metrics import FETCH_RATE, QUEUE_DEPTH, RATE_BUDGET, RATE_LIMIT
+
+APPDETAILS_URL = "https://store.steampowered.com/api/appdetails"
+
+# Steam allows roughly 200 successful appdetails calls per 5 minutes
+STEAM_RATE_LIMIT = 200 / (5 * 60)
+
+# seconds of request history behind the reported fetch rate
+RATE_WINDOW = 60
+
+
+class RateLimiter:
+    """
+    Token bucket that adapts to the throttling Steam reports.
+
+    Tokens refill at `rate` per second up to `capacity`. A 429 halves the
+    rate and pauses all callers with an exponential backoff; a 403 pauses
+    for `forbidden_pause` seconds. Every success moves the rate back
+    towards `ceiling` additively, so the crawl settles just under the
+    allowed budget instead of sleeping a fixed time per response.
+    """
+
+    def __init__(self, ceiling: float = STEAM_RATE_LIMIT, capacity: float = 10,
+                 min_rate: float = STEAM_RATE_LIMIT / 8, throttle_pause: float = 10,
+                 forbidden_pause: float = 5 * 60, max_pause: float = 5 * 60, name: str = 'appdetails'):
+        self.name = name
+        self.ceiling = ceiling
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.throttle_pause = throttle_pause
+        self.forbidden_pause = forbidden_pause
+        self.max_pause = max_pause
+
+        self.rate = ceiling
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._consecutive_throttles = 0
+        self._lock = threading.Lock()
+
+        # monotonic times of the requests let through in the last RATE_WINDOW seconds
+        self._sent = deque()
+
+        FETCH_RATE.set_function(self.fetch_rate, crawl=name)
+        RATE_LIMIT.set_function(lambda: self.rate, crawl=name)
+        RATE_BUDGET.set(ceiling, crawl=name)
+
+    def fetch_rate(self) -> float:
+        """
+        Requests let through per second, averaged over the last RATE_WINDOW seconds.
+        """
+        with self._lock:
+            self._expire(time.monotonic())
+            return len(self._sent) / RATE_WINDOW
+
+    def _expire(self, now: float) -> None:
+        while self._sent and self._sent[0] <= now - RATE_WINDOW:
+            self._sent.popleft()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, stop_event: Optional[threading.Event] = None) -> bool:
+        """
+        Block until a request may be sent.
+
+        Returns:
+            False if stop_event was set while waiting, True otherwise
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self._sent.append(now)
+                        self._expire(now)
+                        return True
+                    wait = (1 - self._tokens) / self.rate
+
+            if stop_event is not None:
+                if stop_event.wait(min(wait, 1.0)):
+                    return False
+            else:
+                time.sleep(min(wait, 1.0))
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 0
+            self._updated = max(now, self._paused_until)
+
+    def on_success(self) -> None:
+        with self._lock:
+            self._consecutive_throttles = 0
+            self.rate = min(self.ceiling, self.rate + self.ceiling * 0.05)
+
+    def on_throttled(self) -> float:
+        """
+        Record a 429; returns the pause applied in seconds.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                # another worker already backed off for this burst
+                return self._paused_until - now
+            self._consecutive_throttles += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            seconds = min(self.max_pause, self.throttle_pause * 2 ** (self._consecutive_throttles - 1))
+        self.pause(seconds)
+        return seconds
+
+    def on_forbidden(self) -> float:
+        """
+        Record a 403; returns the pause applied in seconds.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self.rate = max(self.min_rate, self.rate / 2)
+        self.pause(self.forbidden_pause)
+        return self.forbidden_pause
+
+
+class FetchResult:
+    __slots__ = ('appid', 'status', 'payload', 'error')
+
+    def __init__(self, appid: int, status: Optional[int] = None, payload=None, error: Optional[BaseException] = None):
+        self.appid = appid
+        self.status = status
+        self.payload = payload
+        self.error = error
+
+
+class AppDetailsFetcher:
+    """
+    Fetch appdetails for many apps with a pool of worker threads sharing
+    one RateLimiter.
+
+    429 and 403 responses are retried after the limiter's backoff and never
+    reach the caller; every other outcome is yielded exactly once as a
+    FetchResult, in completion order.
+    """
+
+    def __init__(self, workers: int = 4, limiter: Optional[RateLimiter] = None,
+                 url: str = APPDETAILS_URL, params: Optional[dict] = None, timeout: float = 30,
+                 name: str = 'appdetails'):
+        self.name = name
+        self.workers = workers
+        self.limiter = limiter or RateLimiter(name=name)
+        self.url = url
+        self.params = params or {}
+        self.timeout = timeout
+
+    def _get(self, appid: int) -> requests.Response:
+        params = dict(self.params)
+        params['appids'] = appid
+        return http_get(self.url, params=params, timeout=self.timeout)
+
+    def fetch_all(self, appids: Iterable[int], stop_event: Optional[threading.Event] = None,
+                  on_throttle: Optional[Callable[[int, int, float], None]] = None) -> Iterator[FetchResult]:
+        """
+        Fetch every app id, yielding results as they complete.
+
+        Args:
+            appids: App ids to fetch
+            stop_event: When set, workers stop taking new app ids; results
+                already in flight are still yielded
+            on_throttle: Called with (appid, status, pause seconds) on 429/403
+
+        Returns:
+            Iterator of FetchResult
+        """
+        pending = deque(appids)
+        remaining = [len(pending)]
+        QUEUE_DEPTH.set(remaining[0], crawl=self.name)
+        pending_lock = threading.Lock()
+        results: queue.Queue = queue.Queue()
+
+        # set when the caller stops us or abandons the iterator
+        halt = threading.Event()
+
+        def worker():
+            while not halt.is_set():
+                with pending_lock:
+                    if remaining[0] == 0:
+                        return
+                    appid = pending.popleft() if pending else None
+
+                if appid is None:
+                    # everything is in flight; a throttled app may still come back
+                    time.sleep(0.05)
+                    continue
+
+                if not self.limiter.acquire(halt):
+                    with pending_lock:
+                        pending.appendleft(appid)
+                    return
+
+                try:
+                    resp = self._get(appid)
+                except Exception as e:
+                    results.put(FetchResult(appid, error=e))
+                    continue
+
+                if resp.status_code in (429, 403):
+                    if resp.status_code == 429:
+                        pause = self.limiter.on_throttled()
+                    else:
+                        pause = self.limiter.on_forbidden()
+                    if on_throttle:
+                        on_throttle(appid, resp.status_code, pause)
+                    with pending_lock:
+                        pending.appendleft(appid)
+                    continue
+
+                if resp.status_code == 200:
+                    self.limiter.on_success()
+                    try:
+                        results.put(FetchResult(appid, 200, payload=resp.json()))
+                    except Exception as e:
+                        results.put(FetchResult(appid, 200, error=e))
+                else:
+                    results.put(FetchResult(appid, resp.status_code))
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, self.workers))]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                if stop_event is not None and stop_event.is_set():
+                    halt.set()
+                with pending_lock:
+                    if remaining[0] == 0:
+                        break
+                try:
+                    result = results.get(timeout=0.5)
+                except queue.Empty:
+                    if not any(thread.is_alive() for thread in threads):
+                        break
+                    continue
+
+                with pending_lock:
+                    remaining[0] -= 1
+                QUEUE_DEPTH.set(remaining[0], crawl=self.name)
+                yield result
+
+            for thread in threads:
+                thread.join()
+
+            # results that landed while stopping
+            while not results.empty():
+                yield results.get()
+        finally:
+            halt.set()
+            # nothing is queued once the crawl has finished or stopped
+            QUEUE_DEPTH.set(0, crawl=self.name)
@@ -0,0 +1,147 @@
+import time
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from pyscripts.metrics import STEAM_API_RESPONSES, STEAM_API_SECONDS, status_class
+
+# (connect, read) seconds
+DEFAULT_TIMEOUT = (10, 30)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_config = {
+    'pool_size': 16,
+    'retries': 3,
+    'backoff_factor': 1.0,
+    'timeout': DEFAULT_TIMEOUT,
+}
+
+
+def _build_session() -> requests.Session:
+    # 429/403 are left to the callers, which have their own rate-limit handling; urllib3 would
+    # otherwise retry a 429 carrying Retry-After itself, hiding it from the RateLimiter
+    retry = Retry(
+        total=_config['retries'],
+        connect=_config['retries'],
+        read=_config['retries'],
+        status=_config['retries'],
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        backoff_factor=_config['backoff_factor'],
+        raise_on_status=False,
+        respect_retry_after_header=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=_config['pool_size'],
+        pool_maxsize=_config['pool_size'],
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive',
+    })
+    return session
+
+
+def configure(pool_size: Optional[int] = None, retries: Optional[int] = None,
+              backoff_factor: Optional[float] = None, timeout=None) -> None:
+    """
+    Change the shared client's settings; the session is rebuilt on next use.
+
+    Args:
+        pool_size: Keep-alive connections kept per host
+        retries: Retries on connection errors and 5xx responses
+        backoff_factor: urllib3 retry backoff factor
+        timeout: Default timeout, seconds or (connect, read)
+    """
+    global _session
+    with _session_lock:
+        for key, value in (('pool_size', pool_size), ('retries', retries),
+                           ('backoff_factor', backoff_factor), ('timeout', timeout)):
+            if value is not None:
+                _config[key] = value
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def get_session() -> requests.Session:
+    """
+    Get the process-wide pooled session, creating it on first use.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+class RequestStats:
+    """
+    Per-host request counters: count, latency totals and status codes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, dict] = {}
+
+    def record(self, host: str, seconds: float, status) -> None:
+        with self._lock:
+            stats = self._hosts.setdefault(host, {
+                'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0, 'statuses': {},
+            })
+            stats['count'] += 1
+            stats['total_seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+            stats['statuses'][status] = stats['statuses'].get(status, 0) + 1
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            result = {}
+            for host, stats in self._hosts.items():
+                result[host] = dict(stats, statuses=dict(stats['statuses']))
+                result[host]['mean_seconds'] = stats['total_seconds'] / stats['count']
+            return result
+
+
+REQUEST_STATS = RequestStats()
+
+
+def http_get(url: str, params: Optional[dict] = None, **kwargs) -> requests.Response:
+    """
+    GET through the shared session, recording latency and status per host.
+
+    Accepts the same keyword arguments as requests.get; the configured
+    timeout applies unless one is passed.
+    """
+    kwargs.setdefault('timeout', _config['timeout'])
+    parts = urlsplit(url)
+    host = parts.netloc
+    # e.g. 'appdetails', 'search' or 'GetAppList'
+    endpoint = parts.path.rstrip('/').rsplit('/', 1)[-1] or host
+
+    start = time.perf_counter()
+    try:
+        resp = get_session().get(url, params=params, **kwargs)
+    except Exception as e:
+        seconds = time.perf_counter() - start
+        REQUEST_STATS.record(host, seconds, type(e).__name__)
+        STEAM_API_SECONDS.observe(seconds, endpoint=endpoint)
+        STEAM_API_RESPONSES.inc(endpoint=endpoint, status='error')
+        raise
+
+    seconds = time.perf_counter() - start
+    REQUEST_STATS.record(host, seconds, resp.status_code)
+    STEAM_API_SECONDS.observe(seconds, endpoint=endpoint)
+    STEAM_API_RESPONSES.inc(endpoint=endpoint, status=status_class(resp.status_code))
+    return resp
@@ -0,0 +1,238 @@
+import os
+import time
+import socket
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from pyscripts.checkpoint_log import ERROR, EXCLUDED
+
+JOB_QUEUE_FILENAME = 'crawl_jobs.sqlite'
+
+# job states; closed jobs that were not fetched keep the checkpoint log's EXCLUDED / ERROR
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+
+OPEN_STATES = (PENDING, LEASED)
+
+# lower runs first, as in delta_refresh
+PRIORITY_DEFAULT = 0
+
+# seconds a worker may hold a job before another worker can take it over
+LEASE_SECONDS = 10 * 60
+
+# jobs a crawl leases at a time; small enough that a crashed worker strands few of them
+LEASE_BATCH = 32
+
+# failed fetches are retried after RETRY_DELAY * 2 ** (attempts - 1) seconds, up to MAX_RETRY_DELAY
+RETRY_DELAY = 60
+MAX_RETRY_DELAY = 6 * 60 * 60
+MAX_ATTEMPTS = 5
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    appid         INTEGER PRIMARY KEY,
+    state         TEXT    NOT NULL,
+    priority      INTEGER NOT NULL DEFAULT 0,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    next_eligible REAL    NOT NULL DEFAULT 0,
+    lease_owner   TEXT,
+    lease_expires REAL,
+    last_status   TEXT,
+    updated_at    REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_eligible ON jobs (state, priority, next_eligible, appid);
+'''
+
+
+def default_owner() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def retry_delay(attempts: int) -> float:
+    return min(MAX_RETRY_DELAY, RETRY_DELAY * 2 ** max(0, attempts - 1))
+
+
+class JobQueue:
+    """
+    Durable appdetails crawl queue in SQLite.
+
+    One row per app id with its state, failed attempts, the time it may
+    next be fetched and a priority. Workers lease eligible jobs for
+    LEASE_SECONDS and then complete, fail or release them, so a crawl
+    killed at any point resumes from the queue as it was: jobs it had
+    leased become eligible again once their lease expires, and failed
+    fetches keep their retry schedule instead of being rediscovered.
+
+    The queue only schedules work; fetched data still goes to the
+    checkpoint log, and a job is completed after its record is logged.
+    """
+
+    def __init__(self, path: Path, owner: Optional[str] = None):
+        self.path = Path(path)
+        self.owner = owner or default_owner()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+
+    def _write(self, sql: str, params=()) -> int:
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    def sync(self, app_ids: Iterable[int], crawl_state=None, priority: int = PRIORITY_DEFAULT) -> int:
+        """
+        Add jobs for app ids the queue has not seen and close pending jobs
+        for apps that were processed outside the queue (e.g. by a sharded crawl).
+
+        Args:
+            app_ids: All app ids the crawl should cover
+            crawl_state: Optional CrawlState; processed apps are added as done/excluded/error
+            priority: Priority of the new jobs
+
+        Returns:
+            Number of jobs still open
+        """
+        def state_of(appid):
+            if crawl_state is None:
+                return PENDING
+            if appid in crawl_state.fetched:
+                return DONE
+            if appid in crawl_state.excluded:
+                return EXCLUDED
+            if appid in crawl_state.errors:
+                return ERROR
+            return PENDING
+
+        now = time.time()
+        rows = ((int(appid), state_of(appid), priority, now) for appid in app_ids)
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.executemany(
+                    'INSERT INTO jobs (appid, state, priority, updated_at) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (appid) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at '
+                    "WHERE jobs.state = 'pending' AND excluded.state != 'pending'",
+                    rows)
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        return self.open_count()
+
+    def lease(self, limit: int, lease_seconds: float = LEASE_SECONDS) -> List[int]:
+        """
+        Take up to `limit` eligible jobs: pending jobs whose next_eligible
+        time has passed and jobs whose lease expired, lowest priority first.
+
+        Returns:
+            The leased app ids
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                app_ids = [row[0] for row in self._conn.execute(
+                    "SELECT appid FROM jobs WHERE (state = 'pending' AND next_eligible <= ?) "
+                    "OR (state = 'leased' AND lease_expires <= ?) "
+                    'ORDER BY priority, next_eligible, appid LIMIT ?', (now, now, limit))]
+                self._conn.executemany(
+                    "UPDATE jobs SET state = 'leased', lease_owner = ?, lease_expires = ?, updated_at = ? "
+                    'WHERE appid = ?',
+                    ((self.owner, now + lease_seconds, now, appid) for appid in app_ids))
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        return app_ids
+
+    def complete(self, appid: int, state: str = DONE, status=None) -> None:
+        """
+        Close a job as done, excluded or error.
+        """
+        self._write('UPDATE jobs SET state = ?, last_status = ?, lease_owner = NULL, lease_expires = NULL, '
+                    'updated_at = ? WHERE appid = ?', (state, None if status is None else str(status), time.time(), appid))
+
+    def fail(self, appid: int, status=None, max_attempts: int = MAX_ATTEMPTS) -> bool:
+        """
+        Record a failed fetch and schedule the retry with exponential backoff.
+
+        Returns:
+            True if the job will be retried, False if it used up its attempts;
+            the caller then records the final outcome with complete()
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT attempts FROM jobs WHERE appid = ?', (appid,)).fetchone()
+        attempts = (row[0] if row else 0) + 1
+        if attempts >= max_attempts:
+            self._write('UPDATE jobs SET attempts = ? WHERE appid = ?', (attempts, appid))
+            return False
+
+        now = time.time()
+        self._write("UPDATE jobs SET state = 'pending', attempts = ?, next_eligible = ?, last_status = ?, "
+                    'lease_owner = NULL, lease_expires = NULL, updated_at = ? WHERE appid = ?',
+                    (attempts, now + retry_delay(attempts), None if status is None else str(status), now, appid))
+        return True
+
+    def release(self) -> int:
+        """
+        Return the jobs this owner still holds to the queue, e.g. when a crawl is stopped.
+        """
+        return self._write("UPDATE jobs SET state = 'pending', lease_owner = NULL, lease_expires = NULL, "
+                           "updated_at = ? WHERE state = 'leased' AND lease_owner = ?", (time.time(), self.owner))
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state').fetchall()
+        counts = {state: 0 for state in (PENDING, LEASED, DONE, EXCLUDED, ERROR)}
+        counts.update(rows)
+        return counts
+
+    def open_count(self) -> int:
+        counts = self.counts()
+        return sum(counts[state] for state in OPEN_STATES)
+
+    def next_eligible_in(self) -> Optional[float]:
+        """
+        Seconds until lease() can return another job: the next scheduled retry
+        or the next lease held elsewhere to expire. None if no job is open.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(CASE state WHEN 'pending' THEN next_eligible ELSE lease_expires END) "
+                "FROM jobs WHERE state IN ('pending', 'leased')").fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def load_progress(checkpoint_folder: Path) -> Optional[Dict]:
+    """
+    Progress of the full crawl as recorded in its job queue, for showing
+    it after a restart without loading the checkpoints.
+
+    Returns:
+        {'total', 'done', 'status'} or None if no crawl has used the queue yet
+    """
+    path = Path(checkpoint_folder) / JOB_QUEUE_FILENAME
+    if not path.exists():
+        return None
+
+    jobs = JobQueue(path)
+    try:
+        counts = jobs.counts()
+    finally:
+        jobs.close()
+
+    total = sum(counts.values())
+    remaining = sum(counts[state] for state in OPEN_STATES)
+    if total == 0:
+        return None
+    return {'total': total, 'done': total - remaining, 'status': 'paused' if remaining else 'idle'}
@@ -0,0 +1,347 @@
+"""
+Load test of the Flask app with concurrent clients.
+
+Starts the app in several worker processes (each a threaded server on its
+own port) against a synthetic or existing checkpoint folder, drives a
+weighted mix of home, search and analytics requests from concurrent
+clients, and reports throughput, latency percentiles per request kind and
+memory per worker.
+
+    python -m pyscripts.load_test --apps 50000 --workers 4 --clients 32 --duration 30
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+
+from pyscripts.benchmark import latency_summary
+from pyscripts.steam_data_retriever import SteamDataRetriever
+from pyscripts.synthetic_catalog import generate_apps_dict, write_synthetic_checkpoints
+
+# request kind -> relative weight
+DEFAULT_MIX = {
+    'home': 2,
+    'search_name': 4,
+    'search_developer': 1,
+    'search_genre': 1,
+    'search_tag': 1,
+    'search_app_id': 2,
+    'suggest': 4,
+    'genre_breakdown': 1,
+    'tag_analysis': 1,
+    'price_analysis': 1,
+}
+
+# distinct URLs sampled per request kind
+URLS_PER_KIND = 200
+
+
+def parse_mix(value: Optional[str]) -> Dict[str, float]:
+    """
+    Parse a request mix like "home=1,search_name=5,price_analysis=1"; kinds left out are not requested.
+
+    Raises:
+        ValueError: If a kind is unknown or a weight is not a positive number
+    """
+    if not value:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for entry in value.split(','):
+        kind, sep, weight = entry.partition('=')
+        kind = kind.strip()
+        if kind not in DEFAULT_MIX:
+            raise ValueError(f'Unknown request kind {kind!r}; expected one of {", ".join(DEFAULT_MIX)}')
+        mix[kind] = float(weight) if sep else 1.0
+        if mix[kind] <= 0:
+            raise ValueError(f'Weight of {kind} must be positive')
+    return mix
+
+
+def build_urls(apps: List[Dict], seed: int = 0) -> Dict[str, List[str]]:
+    """
+    Sample request URLs per kind, with search terms taken from the catalog.
+    """
+    rng = random.Random(seed)
+
+    def app():
+        return rng.choice(apps)
+
+    def word():
+        return rng.choice(app()['name'].split()).lower()
+
+    def facet_term(key):
+        values = app().get(key) or [{'description': 'indie'}]
+        value = rng.choice(values)
+        return value['description'] if isinstance(value, dict) else value
+
+    builders = {
+        'home': lambda: '/',
+        'search_name': lambda: f'/api/search_app?type=name&q={word()}',
+        'search_developer': lambda: f'/api/search_app?type=developer&q={facet_term("developers")}',
+        'search_genre': lambda: f'/api/search_app?type=genre&q={facet_term("genres")}',
+        'search_tag': lambda: f'/api/search_app?type=tag&q={facet_term("categories")}',
+        'search_app_id': lambda: f'/api/search_app?type=app-id&q={app()["steam_appid"]}',
+        'suggest': lambda: f'/api/suggest?q={word()[:rng.randint(2, 4)]}',
+        'genre_breakdown': lambda: '/analytics/genre-breakdown',
+        'tag_analysis': lambda: '/analytics/tag-analysis',
+        'price_analysis': lambda: '/analytics/price-analysis',
+    }
+    return {kind: [build() for _ in range(URLS_PER_KIND)] for kind, build in builders.items()}
+
+
+def process_memory_mb(pid: int) -> Dict[str, Optional[float]]:
+    """
+    Current and peak RSS of a process in MB, from /proc; None where unavailable.
+    """
+    memory = {'rss_mb': None, 'peak_rss_mb': None}
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    memory['rss_mb'] = round(int(line.split()[1]) / 1024, 1)
+                elif line.startswith('VmHWM:'):
+                    memory['peak_rss_mb'] = round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return memory
+
+
+def _serve(checkpoint_folder: str, host: str, started) -> None:
+    os.environ['STEAM_CHECKPOINT_FOLDER'] = checkpoint_folder
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    from werkzeug.serving import make_server
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as flask_app
+
+    server = make_server(host, 0, flask_app.app, threaded=True)
+    started.put((os.getpid(), server.server_port))
+    server.serve_forever()
+
+
+class Worker:
+    def __init__(self, process, pid: int, port: int):
+        self.process = process
+        self.pid = pid
+        self.port = port
+        self.memory_at_start = process_memory_mb(pid)
+
+
+def start_workers(checkpoint_folder: Path, count: int, host: str = '127.0.0.1') -> List[Worker]:
+    """
+    Start `count` app processes on free ports and wait until each has loaded the catalog.
+    """
+    context = multiprocessing.get_context('spawn')
+    started = context.Queue()
+    processes = [context.Process(target=_serve, args=(str(checkpoint_folder), host, started), daemon=True)
+                 for _ in range(count)]
+    for process in processes:
+        process.start()
+
+    by_pid = {process.pid: process for process in processes}
+    workers = []
+    for _ in processes:
+        pid, port = started.get(timeout=600)
+        workers.append(Worker(by_pid[pid], pid, port))
+    return workers
+
+
+def stop_workers(workers: List[Worker]) -> None:
+    for worker in workers:
+        worker.process.terminate()
+    for worker in workers:
+        worker.process.join()
+
+
+def run_clients(base_urls: List[str], urls: Dict[str, List[str]], mix: Dict[str, float], clients: int,
+                duration: float, seed: int = 0) -> List[tuple]:
+    """
+    Send requests from `clients` threads for `duration` seconds.
+
+    Each client keeps one connection to one worker, as behind a sticky load
+    balancer, and picks request kinds by weight. The clients share this
+    process's GIL, so past a few dozen of them the client side can become
+    the bottleneck; run several load tests side by side to go further.
+
+    Returns:
+        (kind, worker index, seconds, status) per request; status 0 means a connection error
+    """
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    deadline = time.perf_counter() + duration
+    results = []
+    lock = threading.Lock()
+
+    def client(index):
+        rng = random.Random(seed * 1000 + index)
+        worker = index % len(base_urls)
+        local = []
+        with requests.Session() as session:
+            while time.perf_counter() < deadline:
+                kind = rng.choices(kinds, weights)[0]
+                url = base_urls[worker] + rng.choice(urls[kind])
+                start = time.perf_counter()
+                try:
+                    status = session.get(url, timeout=60).status_code
+                except requests.RequestException:
+                    status = 0
+                local.append((kind, worker, time.perf_counter() - start, status))
+        with lock:
+            results.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def summarize(results: List[tuple], workers: List[Worker], duration: float) -> Dict:
+    report = {
+        'requests': len(results),
+        'errors': sum(1 for _, _, _, status in results if status != 200),
+        'seconds': duration,
+        'throughput_rps': round(len(results) / duration, 1),
+        'latency': latency_summary([seconds for _, _, seconds, _ in results]),
+        'kinds': {},
+        'workers': [],
+    }
+
+    by_kind: Dict[str, List[tuple]] = {}
+    for result in results:
+        by_kind.setdefault(result[0], []).append(result)
+    for kind, kind_results in sorted(by_kind.items()):
+        summary = latency_summary([seconds for _, _, seconds, _ in kind_results])
+        summary['errors'] = sum(1 for _, _, _, status in kind_results if status != 200)
+        report['kinds'][kind] = summary
+
+    for index, worker in enumerate(workers):
+        memory = process_memory_mb(worker.pid)
+        report['workers'].append({
+            'pid': worker.pid,
+            'port': worker.port,
+            'requests': sum(1 for _, w, _, _ in results if w == index),
+            'rss_at_start_mb': worker.memory_at_start['rss_mb'],
+            'rss_mb': memory['rss_mb'],
+            'peak_rss_mb': memory['peak_rss_mb'],
+        })
+    return report
+
+
+def run_load_test(checkpoint_folder: Optional[Path] = None, apps: int = 20000, workers: int = 2, clients: int = 16,
+                  duration: float = 20.0, mix: Optional[Dict[str, float]] = None, seed: int = 0,
+                  host: str = '127.0.0.1') -> Dict:
+    """
+    Run a load test.
+
+    Args:
+        checkpoint_folder: Existing checkpoints to serve; a synthetic catalog of `apps` apps when None
+        apps: Size of the synthetic catalog
+        workers: App processes
+        clients: Concurrent client threads, spread evenly over the workers
+        duration: Seconds to send requests for
+        mix: Request kind -> weight, DEFAULT_MIX when None
+        seed: Random seed for the catalog, the URLs and the clients
+        host: Interface the workers listen on
+
+    Returns:
+        Report dictionary, as printed by print_report
+    """
+    mix = mix or dict(DEFAULT_MIX)
+    workdir = None
+
+    if checkpoint_folder is None:
+        workdir = Path(tempfile.mkdtemp(prefix='steam-load-'))
+        checkpoint_folder = workdir / 'checkpoints'
+        apps_dict = generate_apps_dict(apps, seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            write_synthetic_checkpoints(checkpoint_folder, apps_dict, seed=seed)
+        app_list = list(apps_dict.values())
+        del apps_dict
+    else:
+        with contextlib.redirect_stdout(io.StringIO()):
+            retriever = SteamDataRetriever(checkpoint_folder)
+        app_ids = retriever.get_all_app_ids()
+        app_list = [retriever.get_app_details(app_id)
+                    for app_id in random.Random(seed).sample(app_ids, min(len(app_ids), 5000))]
+        del retriever
+
+    try:
+        urls = build_urls(app_list, seed)
+
+        started = start_workers(checkpoint_folder, workers, host)
+        try:
+            base_urls = [f'http://{host}:{worker.port}' for worker in started]
+            results = run_clients(base_urls, urls, mix, clients, duration, seed)
+            report = summarize(results, started, duration)
+        finally:
+            stop_workers(started)
+
+        report.update(workers_count=workers, clients=clients, mix=mix, checkpoint_folder=str(checkpoint_folder))
+        return report
+    finally:
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_report(report: Dict) -> None:
+    print(f"{report['clients']} clients on {report['workers_count']} workers for {report['seconds']:g}s: "
+          f"{report['requests']} requests, {report['errors']} errors, {report['throughput_rps']} req/s")
+
+    print(f'\n{"Request":<20} {"count":>8} {"errors":>7} {"p50 ms":>10} {"p99 ms":>10} {"mean ms":>10}')
+    rows = dict(report['kinds'])
+    rows['all'] = dict(report['latency'], errors=report['errors'])
+    for kind, row in rows.items():
+        print(f"  {kind:<18} {row['count']:>8} {row['errors']:>7} {row['p50_ms']:>10.3f} {row['p99_ms']:>10.3f} "
+              f"{row['mean_ms']:>10.3f}")
+
+    print(f'\n{"Worker":<10} {"requests":>9} {"RSS start":>10} {"RSS end":>10} {"peak RSS":>10}  (MB)')
+    for worker in report['workers']:
+        print(f"  {worker['pid']:<8} {worker['requests']:>9} {worker['rss_at_start_mb']!s:>10} "
+              f"{worker['rss_mb']!s:>10} {worker['peak_rss_mb']!s:>10}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Load test the Flask app with concurrent clients.')
+    parser.add_argument('--checkpoint-folder', type=Path,
+                        help='serve these checkpoints instead of a synthetic catalog')
+    parser.add_argument('--apps', type=int, default=20000, help='synthetic catalog size (default 20000)')
+    parser.add_argument('--workers', type=int, default=2, help='app processes (default 2)')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent clients (default 16)')
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds to run (default 20)')
+    parser.add_argument('--mix', help=f'request weights, e.g. "home=1,search_name=5"; kinds: {", ".join(DEFAULT_MIX)}')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--json', type=Path, help='also write the report as JSON to this file')
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.workers < 1 or args.clients < 1:
+        parser.error('--workers and --clients must be at least 1')
+
+    report = run_load_test(args.checkpoint_folder, args.apps, args.workers, args.clients, args.duration, mix,
+                           args.seed, args.host)
+    print_report(report)
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# seconds; web requests and index queries
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# seconds; checkpoint loads and saves of a full catalog
+SLOW_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    """
+    A named metric with a fixed set of label names, one value per label combination.
+    """
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {} if labelnames else {(): 0}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}' for key, value in values]
+
+
+class Gauge(Metric):
+    """
+    A value that goes up and down; either set directly or read from a
+    callback at scrape time with set_function.
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._functions.pop(key, None)
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_function(self, function: Callable[[], float], **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values.pop(key, None)
+            self._functions[key] = function
+
+    def value(self, **labels) -> Optional[float]:
+        key = self._key(labels)
+        if key in self._functions:
+            return self._functions[key]()
+        return self._values.get(key)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, function in functions.items():
+            values[key] = function()
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in sorted(values.items())]
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, upper in enumerate(self.buckets):
+                if value <= upper:
+                    state[i] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return int(sum(state[:-1])) if state else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, list(state)) for key, state in self._values.items())
+
+        lines = []
+        for key, state in values:
+            cumulative = 0
+            for upper, count in zip(self.buckets + (math.inf,), state[:-1]):
+                cumulative += count
+                bound = '+Inf' if upper == math.inf else repr(float(upper))
+                labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(state[-1])}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    """
+    The metrics of one process, rendered in the Prometheus text format.
+
+    Each web worker process has its own registry; Prometheus scrapes every
+    worker and sums them.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'Metric already registered: {metric.name}')
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+REGISTRY = Registry()
+
+# web tier
+HTTP_REQUESTS = REGISTRY.counter(
+    'steam_explorer_http_requests_total', 'HTTP requests served, by route, method and status.',
+    ('route', 'method', 'status'))
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'steam_explorer_http_request_duration_seconds', 'Time to serve an HTTP request, by route.',
+    ('route', 'method'))
+RETRIEVER_QUERY_SECONDS = REGISTRY.histogram(
+    'steam_explorer_retriever_query_duration_seconds', 'Time to find matching apps, by search type.',
+    ('search_type',))
+
+# checkpoints
+CHECKPOINT_LOAD_SECONDS = REGISTRY.histogram(
+    'steam_explorer_checkpoint_load_duration_seconds', 'Time to load the catalog and build its indexes.',
+    ('format',), SLOW_BUCKETS)
+CHECKPOINT_LOAD_BYTES = REGISTRY.gauge(
+    'steam_explorer_checkpoint_load_bytes', 'Size of the catalog file last loaded.', ('format',))
+CHECKPOINT_APPS = REGISTRY.gauge(
+    'steam_explorer_checkpoint_apps', 'Apps in the catalog last loaded.')
+CHECKPOINT_SAVE_SECONDS = REGISTRY.histogram(
+    'steam_explorer_checkpoint_save_duration_seconds', 'Time to write a checkpoint.', ('format',), SLOW_BUCKETS)
+CHECKPOINT_SAVE_BYTES = REGISTRY.gauge(
+    'steam_explorer_checkpoint_save_bytes', 'Size of the checkpoint last written.', ('format',))
+
+# Steam API and crawl
+STEAM_API_SECONDS = REGISTRY.histogram(
+    'steam_explorer_steam_api_request_duration_seconds', 'Latency of Steam API calls, by endpoint.',
+    ('endpoint',))
+STEAM_API_RESPONSES = REGISTRY.counter(
+    'steam_explorer_steam_api_responses_total',
+    'Steam API responses by endpoint and status (200, 429, 403, other, or error for failed requests).',
+    ('endpoint', 'status'))
+FETCH_RATE = REGISTRY.gauge(
+    'steam_explorer_fetch_rate_per_second', 'appdetails requests sent per second over the last minute, by crawl.',
+    ('crawl',))
+RATE_LIMIT = REGISTRY.gauge(
+    'steam_explorer_rate_limit_per_second', 'Request rate the adaptive rate limiter currently allows, by crawl.',
+    ('crawl',))
+RATE_BUDGET = REGISTRY.gauge(
+    'steam_explorer_rate_budget_per_second', "Steam's rate-limit budget the limiter never exceeds, by crawl.",
+    ('crawl',))
+QUEUE_DEPTH = REGISTRY.gauge(
+    'steam_explorer_crawl_queue_depth', 'App ids not yet fetched by the running crawl, by crawl.', ('crawl',))
+DOWNLOAD_PROGRESS = REGISTRY.gauge(
+    'steam_explorer_download_progress', 'Progress of the downloads started from the web UI.', ('download', 'field'))
+
+
+def status_class(status) -> str:
+    """
+    Collapse an HTTP status (or exception name) into the steam_api_responses_total status label.
+    """
+    if status in (200, 429, 403):
+        return str(status)
+    return 'other' if isinstance(status, int) else 'error'
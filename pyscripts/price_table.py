@@ -0,0 +1,214 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from pyscripts.catalog_aggregates import PRICE_BINS
+
+# upper bin edges in dollars of the default price analysis buckets
+DEFAULT_EDGES = [upper for _, upper in PRICE_BINS if upper is not None]
+
+PRICE_FIELDS = ('initial', 'final')
+
+DEFAULT_PERCENTILES = (10, 25, 50, 75, 90, 99)
+
+
+def bin_labels(edges: Sequence[float]) -> List[str]:
+    """
+    Get "$0–5"-style labels for the bins bounded by `edges`, plus the open-ended last bin.
+    """
+    labels = []
+    lower = 0
+    for upper in edges:
+        labels.append(f"${lower:g}–{upper:g}")
+        lower = upper
+    labels.append(f"${lower:g}+")
+    return labels
+
+
+def parse_edges(value: Optional[str]) -> Optional[List[float]]:
+    """
+    Parse comma separated bin edges in dollars, e.g. "5,10,20".
+
+    Returns:
+        Sorted, de-duplicated positive edges, or None if value is empty
+
+    Raises:
+        ValueError: If an edge is not a positive number
+    """
+    if not value:
+        return None
+    edges = sorted({float(edge) for edge in value.split(',') if edge.strip()})
+    if not edges or edges[0] <= 0:
+        raise ValueError('bin edges must be positive numbers')
+    return edges
+
+
+class PriceTable:
+    """
+    Price columns of the whole catalog as NumPy arrays, one row per app.
+
+    Prices are in cents; apps without a price_overview have -1 in both
+    price columns. Built once per catalog load so histograms, percentiles
+    and range filters are single vectorized passes.
+    """
+
+    def __init__(self, appid: np.ndarray, initial: np.ndarray, final: np.ndarray, discount_percent: np.ndarray,
+                 currency: np.ndarray, is_free: np.ndarray, currencies: List[str]):
+        self.appid = appid
+        self.initial = initial
+        self.final = final
+        self.discount_percent = discount_percent
+        self.currency = currency
+        self.is_free = is_free
+        self.currencies = currencies
+
+    @classmethod
+    def build(cls, apps_dict: Dict[int, Any]) -> 'PriceTable':
+        apps = sorted(
+            (int(app_id), app_data) for app_id, app_data in apps_dict.items()
+            if isinstance(app_data, dict)
+        )
+        count = len(apps)
+        appid = np.empty(count, dtype=np.uint32)
+        initial = np.full(count, -1, dtype=np.int32)
+        final = np.full(count, -1, dtype=np.int32)
+        discount_percent = np.zeros(count, dtype=np.uint8)
+        currency = np.zeros(count, dtype=np.uint8)
+        is_free = np.zeros(count, dtype=bool)
+        currencies = {'': 0}
+
+        for i, (app_id, app_data) in enumerate(apps):
+            appid[i] = app_id
+            is_free[i] = bool(app_data.get('is_free'))
+            if 'price_overview' not in app_data:
+                continue
+            price = app_data['price_overview'] or {}
+            initial[i] = int(price.get('initial', 0))
+            final[i] = int(price.get('final', 0))
+            discount_percent[i] = min(int(price.get('discount_percent', 0) or 0), 255)
+            currency[i] = currencies.setdefault(price.get('currency', ''), len(currencies))
+
+        return cls(appid, initial, final, discount_percent, currency, is_free, list(currencies))
+
+    @classmethod
+    def from_columnar(cls, catalog) -> 'PriceTable':
+        """
+        Copy the price columns out of a ColumnarCatalog, without decoding any app records.
+        """
+        def column(name, dtype):
+            return np.array(catalog.column(name), dtype=dtype)
+
+        return cls(
+            column('appid', np.uint32),
+            column('price_initial', np.int32),
+            column('price_final', np.int32),
+            column('discount_percent', np.uint8),
+            column('currency', np.uint8),
+            column('is_free', np.uint8).astype(bool),
+            list(catalog.dictionaries['currency']),
+        )
+
+    @classmethod
+    def from_sqlite(cls, catalog) -> 'PriceTable':
+        """
+        Read the price columns out of a SqliteCatalog's prices table, or out
+        of a SqliteAppsDict, which applies the apps changed since.
+        """
+        rows = catalog.price_rows()
+        count = len(rows)
+        appid = np.empty(count, dtype=np.uint32)
+        initial = np.full(count, -1, dtype=np.int32)
+        final = np.full(count, -1, dtype=np.int32)
+        discount_percent = np.zeros(count, dtype=np.uint8)
+        currency = np.zeros(count, dtype=np.uint8)
+        is_free = np.zeros(count, dtype=bool)
+        currencies = {'': 0}
+
+        for i, (app_id, free, currency_name, price_initial, price_final, discount) in enumerate(rows):
+            appid[i] = app_id
+            is_free[i] = bool(free)
+            if price_initial is None:
+                continue
+            initial[i] = price_initial
+            final[i] = price_final
+            discount_percent[i] = min(discount, 255)
+            currency[i] = currencies.setdefault(currency_name, len(currencies))
+
+        return cls(appid, initial, final, discount_percent, currency, is_free, list(currencies))
+
+    def __len__(self) -> int:
+        return len(self.appid)
+
+    def _prices(self, field: str) -> np.ndarray:
+        if field not in PRICE_FIELDS:
+            raise ValueError(f'Unknown price field: {field}')
+        return self.initial if field == 'initial' else self.final
+
+    def priced(self, field: str = 'initial') -> np.ndarray:
+        """
+        Get a mask of the paid apps that have a price.
+        """
+        return ~self.is_free & (self._prices(field) >= 0)
+
+    def histogram(self, edges: Sequence[float] = DEFAULT_EDGES, field: str = 'initial') -> Dict[str, int]:
+        """
+        Count apps per price bin.
+
+        Bins are closed on the right, like the analytics buckets: with edges
+        [5, 10] the bins are $0–5, $5–10 and $10+, and a $5.00 app falls
+        in $0–5. Free apps are counted under "Free".
+
+        Args:
+            edges: Upper bin edges in dollars, ascending
+            field: 'initial' or 'final' price
+
+        Returns:
+            Label -> count, in bin order starting with "Free"
+        """
+        prices = self._prices(field)[self.priced(field)]
+        edges_cents = np.asarray(edges, dtype=np.float64) * 100
+        counts = np.bincount(np.searchsorted(edges_cents, prices, side='left'), minlength=len(edges_cents) + 1)
+
+        result = {'Free': int(np.count_nonzero(self.is_free))}
+        for label, count in zip(bin_labels(edges), counts):
+            result[label] = int(count)
+        return result
+
+    def percentiles(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES, field: str = 'initial') -> Dict[str, float]:
+        """
+        Get price percentiles of the paid apps, in dollars.
+        """
+        prices = self._prices(field)[self.priced(field)]
+        if not len(prices):
+            return {}
+        values = np.percentile(prices, percentiles) / 100
+        return {f'p{p:g}': round(float(value), 2) for p, value in zip(percentiles, values)}
+
+    def stats(self, field: str = 'initial') -> Dict[str, float]:
+        """
+        Get count, mean, min and max of the paid apps' prices in dollars, and the number of discounted apps.
+        """
+        mask = self.priced(field)
+        prices = self._prices(field)[mask]
+        if not len(prices):
+            return {'count': 0}
+        return {
+            'count': int(len(prices)),
+            'mean': round(float(prices.mean()) / 100, 2),
+            'min': round(float(prices.min()) / 100, 2),
+            'max': round(float(prices.max()) / 100, 2),
+            'discounted': int(np.count_nonzero(self.discount_percent[mask])),
+        }
+
+    def filter_range(self, min_price: float = 0.0, max_price: float = float('inf'),
+                     field: str = 'initial') -> np.ndarray:
+        """
+        Get the ids of apps with a price_overview whose price lies in [min_price, max_price] dollars.
+
+        Returns:
+            Sorted uint32 array of app ids
+        """
+        prices = self._prices(field)
+        mask = (prices >= 0) & (prices >= min_price * 100) & (prices <= max_price * 100)
+        return self.appid[mask]
+
@@ -0,0 +1,254 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pyscripts.facet_index import intersect_postings
+
+# filters accepted by parse_query; repeated genre/tag/name/... filters must all match
+FILTER_PARAMS = ('type', 'genre', 'tag', 'name', 'developer', 'publisher', 'price_min', 'price_max', 'is_free')
+
+# probing one candidate app costs roughly this many posting entries of an index scan
+PROBE_COST = 4
+
+
+class Predicate:
+    """
+    One filter of a query.
+
+    Every predicate can produce its matching app ids from an index
+    (evaluate), cheaply bound how many that will be (estimate), and check
+    a single app (test) so small candidate sets need not touch the index.
+    """
+
+    def estimate(self, retriever) -> int:
+        raise NotImplementedError
+
+    def evaluate(self, retriever) -> Sequence[int]:
+        raise NotImplementedError
+
+    def test(self, retriever, app_id: int) -> bool:
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        raise NotImplementedError
+
+
+class TypePredicate(Predicate):
+    def __init__(self, app_type: str):
+        self.app_type = app_type.lower()
+
+    def estimate(self, retriever) -> int:
+        return len(self.evaluate(retriever))
+
+    def evaluate(self, retriever) -> Sequence[int]:
+        return retriever.type_index.get(self.app_type, ())
+
+    def test(self, retriever, app_id: int) -> bool:
+        return (retriever.summaries[app_id].get('type') or '').lower() == self.app_type
+
+    def describe(self) -> str:
+        return f'type = {self.app_type}'
+
+
+class FacetPredicate(Predicate):
+    """
+    Genre or tag (Steam category) whose description contains a term.
+    """
+
+    # filter name -> (retriever index attribute, app dict key)
+    FACETS = {
+        'genre': ('genre_index', 'genres'),
+        'tag': ('tag_index', 'categories'),
+    }
+
+    def __init__(self, facet: str, term: str):
+        self.facet = facet
+        self.term = term.lower()
+        self.index_name, self.key = self.FACETS[facet]
+
+    def estimate(self, retriever) -> int:
+        return getattr(retriever, self.index_name).estimate(self.term)
+
+    def evaluate(self, retriever) -> Sequence[int]:
+        return getattr(retriever, self.index_name).lookup(self.term)
+
+    def test(self, retriever, app_id: int) -> bool:
+        return any(
+            isinstance(facet, dict) and self.term in (facet.get('description') or '').lower()
+            for facet in retriever.summaries[app_id].get(self.key) or []
+        )
+
+    def describe(self) -> str:
+        return f'{self.facet} contains "{self.term}"'
+
+
+class TextPredicate(Predicate):
+    """
+    Name, developer or publisher containing a term.
+    """
+
+    # filter name -> (retriever index attribute, app dict key)
+    FIELDS = {
+        'name': ('name_index', 'name'),
+        'developer': ('developer_index', 'developers'),
+        'publisher': ('publisher_index', 'publishers'),
+    }
+
+    def __init__(self, field: str, term: str):
+        self.field = field
+        self.term = term.lower()
+        self.index_name, self.key = self.FIELDS[field]
+
+    def estimate(self, retriever) -> int:
+        return getattr(retriever, self.index_name).estimate(self.term)
+
+    def evaluate(self, retriever) -> Sequence[int]:
+        return getattr(retriever, self.index_name).search(self.term)
+
+    def test(self, retriever, app_id: int) -> bool:
+        values = retriever.summaries[app_id].get(self.key)
+        if isinstance(values, str):
+            values = [values]
+        return any(isinstance(value, str) and self.term in value.lower() for value in values or [])
+
+    def describe(self) -> str:
+        return f'{self.field} contains "{self.term}"'
+
+
+class PricePredicate(Predicate):
+    """
+    Initial price within [min_price, max_price] dollars; apps without a price never match.
+    """
+
+    def __init__(self, min_price: float = 0.0, max_price: float = float('inf')):
+        self.min_price = min_price
+        self.max_price = max_price
+
+    def estimate(self, retriever) -> int:
+        return len(self.evaluate(retriever))
+
+    def evaluate(self, retriever) -> Sequence[int]:
+        return retriever.price_table.filter_range(self.min_price, self.max_price).tolist()
+
+    def test(self, retriever, app_id: int) -> bool:
+        app_data = retriever.summaries[app_id]
+        if 'price_overview' not in app_data:
+            return False
+        return self.min_price <= app_data['price_overview'].get('initial', 0) / 100 <= self.max_price
+
+    def describe(self) -> str:
+        return f'price in [{self.min_price:g}, {self.max_price:g}]'
+
+
+class FreePredicate(Predicate):
+    def __init__(self, is_free: bool):
+        self.is_free = is_free
+
+    def estimate(self, retriever) -> int:
+        return len(self.evaluate(retriever))
+
+    def evaluate(self, retriever) -> Sequence[int]:
+        table = retriever.price_table
+        mask = table.is_free if self.is_free else ~table.is_free
+        return table.appid[mask].tolist()
+
+    def test(self, retriever, app_id: int) -> bool:
+        return bool(retriever.summaries[app_id].get('is_free')) == self.is_free
+
+    def describe(self) -> str:
+        return f'is_free = {str(self.is_free).lower()}'
+
+
+def _parse_bool(value: str) -> bool:
+    if value.lower() in ('1', 'true', 'yes'):
+        return True
+    if value.lower() in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f'Expected true or false, got {value!r}')
+
+
+def parse_query(args) -> List[Predicate]:
+    """
+    Build predicates from request arguments.
+
+    Args:
+        args: A MultiDict-like object with getlist(), e.g. flask's request.args
+
+    Returns:
+        List of predicates, all of which must match
+
+    Raises:
+        ValueError: If a filter value is malformed
+    """
+    predicates: List[Predicate] = []
+
+    for app_type in args.getlist('type'):
+        predicates.append(TypePredicate(app_type))
+    for facet in FacetPredicate.FACETS:
+        for term in args.getlist(facet):
+            predicates.append(FacetPredicate(facet, term))
+    for field in TextPredicate.FIELDS:
+        for term in args.getlist(field):
+            predicates.append(TextPredicate(field, term))
+
+    price_min = args.get('price_min')
+    price_max = args.get('price_max')
+    if price_min is not None or price_max is not None:
+        try:
+            low = float(price_min) if price_min is not None else 0.0
+            high = float(price_max) if price_max is not None else float('inf')
+        except ValueError:
+            raise ValueError('price_min and price_max must be numbers')
+        predicates.append(PricePredicate(low, high))
+
+    if args.get('is_free') is not None:
+        predicates.append(FreePredicate(_parse_bool(args.get('is_free'))))
+
+    return predicates
+
+
+def execute_query(retriever, predicates: List[Predicate]) -> Tuple[List[int], List[Dict]]:
+    """
+    Find the apps matching every predicate.
+
+    Predicates run from the most selective estimate to the least. The
+    first one is read from its index; each later one is either intersected
+    from its index or, when the surviving candidates are few compared to
+    what the index would return, checked app by app.
+
+    Args:
+        retriever: A loaded SteamDataRetriever
+        predicates: Filters that must all match
+
+    Returns:
+        (sorted matching app ids, plan steps describing how each predicate ran)
+    """
+    if not predicates:
+        return [], []
+
+    estimated = sorted(((predicate.estimate(retriever), i, predicate) for i, predicate in enumerate(predicates)),
+                       key=lambda entry: (entry[0], entry[1]))
+
+    steps = []
+    candidates: Optional[Sequence[int]] = None
+
+    for estimate, _, predicate in estimated:
+        if candidates is None:
+            candidates = predicate.evaluate(retriever)
+            strategy = 'index'
+        elif len(candidates) * PROBE_COST < estimate:
+            candidates = [app_id for app_id in candidates if predicate.test(retriever, app_id)]
+            strategy = 'probe'
+        else:
+            candidates = intersect_postings(candidates, predicate.evaluate(retriever))
+            strategy = 'intersect'
+
+        steps.append({
+            'filter': predicate.describe(),
+            'estimate': int(estimate),
+            'strategy': strategy,
+            'matches': len(candidates),
+        })
+
+        if not len(candidates):
+            break
+
+    return sorted(int(app_id) for app_id in candidates if app_id in retriever.apps_dict), steps
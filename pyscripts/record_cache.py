@@ -0,0 +1,57 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+# decoded app records kept per retriever; sized by their encoded length
+RECORD_CACHE_BYTES = 32 * 1024 * 1024
+
+
+class RecordCache:
+    """
+    Thread-safe LRU of decoded app records, bounded by the total encoded
+    size of the records it holds.
+
+    The encoded length (JSON or pickle bytes) stands in for the in-memory
+    size; decoded dicts are a few times larger, but in proportion.
+    """
+
+    def __init__(self, max_bytes: int = RECORD_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, record: Dict, size: int) -> None:
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (record, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,77 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class CachedResponse:
+    __slots__ = ('body', 'status', 'mimetype', 'etag')
+
+    def __init__(self, body: bytes, status: int, mimetype: str, etag: str):
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+        self.etag = etag
+
+
+def make_etag(version, key: Hashable) -> str:
+    """
+    Strong ETag for a response: identical for the same request against the
+    same checkpoint version, in every worker process.
+    """
+    return hashlib.sha1(repr((version, key)).encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    LRU cache of rendered responses, bounded by entry count and total body size.
+
+    Keys include the catalog version, so entries for an older checkpoint are
+    never served; they simply age out.
+    """
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: 'OrderedDict[Hashable, CachedResponse]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, entry: CachedResponse) -> None:
+        if len(entry.body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous.body)
+            self._entries[key] = entry
+            self._bytes += len(entry.body)
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
@@ -0,0 +1,168 @@
+import re
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from pyscripts.app_records import intern_fields
+
+SORT_FIELDS = ('appid', 'name', 'release_date', 'price')
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# what a search result card renders; screenshots are cut to the first one
+CARD_FIELDS = (
+    'appid',
+    'steam_appid',
+    'name',
+    'header_image',
+    'short_description',
+    'release_date',
+    'is_free',
+    'price_overview',
+    'categories',
+    'genres',
+)
+
+# what stays resident per app when full records are loaded on demand: enough
+# for cards, sorting and the query planner's per-app checks
+SUMMARY_FIELDS = CARD_FIELDS + ('logo', 'type', 'developers', 'publishers')
+
+_RELEASE_DATE_FORMATS = ('%d %b, %Y', '%b %d, %Y', '%d %B, %Y', '%B %d, %Y', '%b %Y', '%B %Y')
+_YEAR_RE = re.compile(r'(\d{4})')
+
+
+def release_date_key(app_data: Dict) -> Optional[Tuple[int, int, int]]:
+    """
+    Get a sortable (year, month, day) from Steam's free-form release date.
+
+    Dates with only a year (e.g. "Q3 2025") sort before the dated releases of
+    that year; apps without any year get None.
+    """
+    date = ((app_data.get('release_date') or {}).get('date') or '').strip()
+    for date_format in _RELEASE_DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(date, date_format)
+        except ValueError:
+            continue
+        return parsed.year, parsed.month, parsed.day if '%d' in date_format else 0
+
+    m = _YEAR_RE.search(date)
+    return (int(m.group(1)), 0, 0) if m else None
+
+
+def price_key(app_data: Dict) -> Optional[int]:
+    """
+    Get the current price in cents, 0 for free apps and None when unpriced.
+    """
+    if app_data.get('is_free'):
+        return 0
+    if 'price_overview' not in app_data:
+        return None
+    return app_data['price_overview'].get('final', app_data['price_overview'].get('initial', 0))
+
+
+def name_key(app_data: Dict) -> Optional[str]:
+    name = app_data.get('name')
+    return name.casefold() if name else None
+
+
+SORT_KEY_FUNCTIONS: Dict[str, Callable[[Dict], object]] = {
+    'name': name_key,
+    'release_date': release_date_key,
+    'price': price_key,
+}
+
+
+def sort_app_ids(app_ids: Iterable[int], sort_key: Callable[[int], object], descending: bool = False) -> List[int]:
+    """
+    Sort app ids by a key, breaking ties by app id so pages are stable.
+
+    Apps whose key is None come last in either direction.
+
+    Args:
+        app_ids: App ids to sort
+        sort_key: Maps an app id to its sort value or None
+        descending: Largest values first
+
+    Returns:
+        Sorted list of app ids
+    """
+    known = []
+    unknown = []
+    for app_id in app_ids:
+        value = sort_key(app_id)
+        if value is None:
+            unknown.append(app_id)
+        else:
+            known.append((value, app_id))
+
+    if descending:
+        # keep ties in ascending app id order
+        known.sort(key=lambda pair: pair[1])
+        known.sort(key=lambda pair: pair[0], reverse=True)
+    else:
+        known.sort()
+    unknown.sort()
+    return [app_id for _, app_id in known] + unknown
+
+
+def parse_fields(value: Optional[str]) -> Union[str, None, Tuple[str, ...]]:
+    """
+    Parse a `fields` query parameter: 'card' (default), 'all', or a comma separated list.
+    """
+    if not value or value == 'card':
+        return 'card'
+    if value == 'all':
+        return None
+    return tuple(field.strip() for field in value.split(',') if field.strip())
+
+
+def project_app(app_data: Dict, fields: Union[str, None, Sequence[str]] = 'card') -> Dict:
+    """
+    Keep only the requested fields of an app.
+
+    Args:
+        app_data: App details dictionary
+        fields: 'card', None for everything, or the field names to keep
+
+    Returns:
+        The projected dictionary (app_data itself when fields is None)
+    """
+    if fields is None:
+        return app_data
+    if fields == 'card':
+        projected = {field: app_data[field] for field in CARD_FIELDS if field in app_data}
+        if app_data.get('screenshots'):
+            projected['screenshots'] = app_data['screenshots'][:1]
+        return projected
+    return {field: app_data[field] for field in fields if field in app_data}
+
+
+def summarize_app(app_data: Dict, interned: Optional[Dict] = None) -> Dict:
+    """
+    Get the compact summary of an app: its SUMMARY_FIELDS plus the first screenshot.
+
+    Args:
+        app_data: App details dictionary (or an already summarized one)
+        interned: Optional table shared across apps so identical genre and
+            category dicts and developer/publisher/type strings are stored once
+
+    Returns:
+        Summary dictionary; project_app(summary, 'card') equals project_app(app_data, 'card')
+    """
+    summary = {field: app_data[field] for field in SUMMARY_FIELDS if field in app_data}
+    if app_data.get('screenshots'):
+        summary['screenshots'] = app_data['screenshots'][:1]
+
+    if interned is not None:
+        intern_fields(summary, interned)
+    return summary
+
+
+def page_bounds(total: int, page: int, page_size: int) -> Tuple[int, int, int]:
+    """
+    Get (start, end, number of pages) for a 1-based page; pages past the end are empty.
+    """
+    pages = (total + page_size - 1) // page_size
+    start = min((page - 1) * page_size, total)
+    return start, min(start + page_size, total), pages
@@ -0,0 +1,172 @@
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+GRAM_SIZE = 3
+
+
+def _grams(text: str) -> set:
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+class SearchIndex:
+    """
+    Trigram inverted index answering case-insensitive substring queries.
+
+    The index is built over the distinct lowercased values of one field
+    (e.g. every developer name), each value pointing at the app ids that
+    carry it. Queries of three or more characters intersect trigram postings
+    and verify the few surviving values; shorter ones scan the distinct
+    values, which is still far smaller than the catalog.
+    """
+
+    def __init__(self):
+        self._values: List[str] = []
+        self._value_apps: List[array] = []
+        self._grams: Dict[str, array] = {}
+
+        # (value, value id) and (word, value id), sorted, for prefix lookups
+        self._sorted_values: List[Tuple[str, int]] = []
+        self._sorted_words: List[Tuple[str, int]] = []
+
+    @classmethod
+    def build(cls, entries: Iterable[Tuple[int, Iterable[str]]]) -> 'SearchIndex':
+        """
+        Build an index from (app_id, values) pairs.
+
+        Args:
+            entries: Iterable of (app_id, iterable of field values)
+
+        Returns:
+            The populated SearchIndex
+        """
+        index = cls()
+        value_ids: Dict[str, int] = {}
+        value_apps: List[List[int]] = []
+
+        for app_id, values in entries:
+            for value in values:
+                if not isinstance(value, str) or not value:
+                    continue
+                value = value.lower()
+                vid = value_ids.get(value)
+                if vid is None:
+                    vid = value_ids[value] = len(index._values)
+                    index._values.append(value)
+                    value_apps.append([])
+                apps = value_apps[vid]
+                if not apps or apps[-1] != app_id:
+                    apps.append(app_id)
+
+        grams: Dict[str, List[int]] = {}
+        for vid, value in enumerate(index._values):
+            for gram in _grams(value):
+                grams.setdefault(gram, []).append(vid)
+
+        index._value_apps = [array('I', sorted(set(apps))) for apps in value_apps]
+        index._grams = {gram: array('I', vids) for gram, vids in grams.items()}
+
+        index._sorted_values = sorted((value, vid) for vid, value in enumerate(index._values))
+        index._sorted_words = sorted(
+            {(word, vid) for vid, value in enumerate(index._values) for word in value.split()}
+        )
+        return index
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def _matching_values(self, term: str) -> List[int]:
+        if len(term) < GRAM_SIZE:
+            return [vid for vid, value in enumerate(self._values) if term in value]
+
+        postings = []
+        for gram in _grams(term):
+            posting = self._grams.get(gram)
+            if posting is None:
+                return []
+            postings.append(posting)
+
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+
+        return [vid for vid in candidates if term in self._values[vid]]
+
+    def estimate(self, term: str) -> int:
+        """
+        Cheap upper bound on the number of apps search(term) returns, from
+        the rarest trigram of the term; used for query planning.
+        """
+        term = term.lower()
+        if len(term) < GRAM_SIZE:
+            return sum(len(apps) for apps in self._value_apps)
+
+        rarest = None
+        for gram in _grams(term):
+            posting = self._grams.get(gram)
+            if posting is None:
+                return 0
+            if rarest is None or len(posting) < len(rarest):
+                rarest = posting
+        return sum(len(self._value_apps[vid]) for vid in rarest)
+
+    def search(self, term: str) -> List[int]:
+        """
+        Find the apps whose field contains `term` (case-insensitive).
+
+        Args:
+            term: Substring to look for
+
+        Returns:
+            Sorted list of matching app ids
+        """
+        term = term.lower()
+        app_ids = set()
+        for vid in self._matching_values(term):
+            app_ids.update(self._value_apps[vid])
+        return sorted(app_ids)
+
+    def _prefix_range(self, sorted_pairs: List[Tuple[str, int]], prefix: str):
+        i = bisect_left(sorted_pairs, (prefix,))
+        while i < len(sorted_pairs) and sorted_pairs[i][0].startswith(prefix):
+            yield sorted_pairs[i][1]
+            i += 1
+
+    def prefix_search(self, prefix: str, limit: int = 10) -> List[int]:
+        """
+        Rank apps for type-ahead: exact matches first, then values starting
+        with `prefix`, then values with a word starting with `prefix`; ties
+        go to the shorter value.
+
+        Args:
+            prefix: Typed prefix (case-insensitive)
+            limit: Maximum number of app ids to return
+
+        Returns:
+            List of app ids, best match first
+        """
+        prefix = prefix.lower().strip()
+        if not prefix or limit <= 0:
+            return []
+
+        ranked = {}
+        for vid in self._prefix_range(self._sorted_values, prefix):
+            ranked[vid] = 0 if self._values[vid] == prefix else 1
+        for vid in self._prefix_range(self._sorted_words, prefix):
+            ranked.setdefault(vid, 2)
+
+        best = sorted(ranked, key=lambda vid: (ranked[vid], len(self._values[vid]), self._values[vid]))
+
+        results = []
+        seen = set()
+        for vid in best:
+            for app_id in self._value_apps[vid]:
+                if app_id not in seen:
+                    seen.add(app_id)
+                    results.append(app_id)
+                    if len(results) >= limit:
+                        return results
+        return results
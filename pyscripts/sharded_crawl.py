@@ -0,0 +1,389 @@
+"""
+Sharded crawl: split the remaining app ids into N shards, crawl each in its
+own process (or on its own host), then merge the shard results into the
+canonical checkpoints.
+
+Each shard lives in checkpoints/shards/shard-<i>-of-<n>/ with the app ids
+it owns (app_ids.bin) and an append-only results log in the checkpoint log
+format (results.wal), so a shard can be stopped and resumed on its own and
+merging is a replay. The retriever looks for checkpoints recursively
+(os.walk) under the checkpoint folder, including shards/, but only
+considers *.p files; shard files deliberately use other suffixes, so
+they are never mistaken for checkpoints before the merge.
+
+    python -m pyscripts.sharded_crawl crawl --shards 4 --proxy http://a:3128 --proxy http://b:3128
+
+or across hosts: `plan` on one host, copy a shard folder to each host and
+`run --shard i` there, copy the folders back and `merge`.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import shutil
+import traceback
+from array import array
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence
+
+from pyscripts.app_id_bitmap import CrawlState
+from pyscripts.app_id_retriever import get_app_ids
+from pyscripts.app_records import normalize_app, normalize_apps
+from pyscripts.checkpoint_log import APP, ERROR, EXCLUDED, LOG_FILENAME, CheckpointLog, replay_log
+from pyscripts.fetch_engine import STEAM_RATE_LIMIT, AppDetailsFetcher, FetchResult, RateLimiter
+from pyscripts.steam_data_downloader import (load_latest_checkpoints, print_log, save_checkpoints,
+                                             save_columnar_catalog, save_sqlite_catalog, throttle_message)
+
+CHECKPOINT_FOLDER = Path(__file__).resolve().parents[1] / 'checkpoints'
+
+SHARDS_FOLDERNAME = 'shards'
+# none of these may end in .p: the retriever's checkpoint scan walks into shards/
+SHARD_IDS_FILENAME = 'app_ids.bin'
+SHARD_LOG_FILENAME = 'results.wal'
+SHARD_INFO_FILENAME = 'shard.json'
+
+APPS_DICT_PREFIX = 'apps_dict'
+EXCLUDED_PREFIX = 'excluded_apps_list'
+ERROR_PREFIX = 'error_apps_list'
+
+
+def shard_folder(checkpoint_folder: Path, index: int, count: int) -> Path:
+    return Path(checkpoint_folder) / SHARDS_FOLDERNAME / f'shard-{index:02d}-of-{count:02d}'
+
+
+def list_shards(checkpoint_folder: Path) -> List[Path]:
+    shards_root = Path(checkpoint_folder) / SHARDS_FOLDERNAME
+    if not shards_root.exists():
+        return []
+    return sorted(path for path in shards_root.iterdir() if (path / SHARD_INFO_FILENAME).exists())
+
+
+def partition(app_ids: Sequence[int], count: int) -> List[array]:
+    """
+    Split app ids into `count` shards by striding, so every shard gets the
+    same mix of dense (old, mostly valid) and sparse (new) id ranges.
+    """
+    return [array('I', app_ids[index::count]) for index in range(count)]
+
+
+def shard_ceiling(index: int, count: int, egress_count: int) -> float:
+    """
+    Rate budget of one shard: shards that share an egress IP share its budget.
+
+    Shard `index` uses egress `index % egress_count`.
+    """
+    sharing = len(range(index % egress_count, count, egress_count))
+    return STEAM_RATE_LIMIT / sharing
+
+
+def classify_result(result: FetchResult):
+    """
+    Turn an appdetails FetchResult into a checkpoint log record, with the
+    same outcomes as download_all_apps: a non-200 status is an error,
+    an unusable or unsuccessful response excludes the app.
+
+    Returns:
+        (kind, data) with data the appdetails for APP records and None otherwise
+    """
+    if result.error is None and result.status != 200:
+        return ERROR, None
+
+    try:
+        if result.error is not None:
+            raise result.error
+        appdetails = result.payload[str(result.appid)]
+    except Exception:
+        print_log(f"Error in decoding app details request. App id: {result.appid}")
+        traceback.print_exc(limit=5)
+        return EXCLUDED, None
+
+    if not appdetails.get('success'):
+        return EXCLUDED, None
+
+    data = appdetails['data']
+    data['appid'] = result.appid
+    return APP, normalize_app(data)
+
+
+def plan_shards(count: int, checkpoint_folder: Path = CHECKPOINT_FOLDER) -> Optional[List[Path]]:
+    """
+    Partition the app ids the crawl has not processed yet into `count` shard folders.
+
+    Returns:
+        The shard folders, or None if the app list could not be fetched
+
+    Raises:
+        RuntimeError: If shards of an earlier plan have not been merged yet
+    """
+    checkpoint_folder = Path(checkpoint_folder)
+    if list_shards(checkpoint_folder):
+        raise RuntimeError(f'Unmerged shards in {checkpoint_folder / SHARDS_FOLDERNAME}; merge them first')
+
+    all_app_ids = get_app_ids(checkpoint_folder)
+    if all_app_ids is None:
+        print_log('Failed to get the app list. Nothing planned.')
+        return None
+
+    _, _, _, crawl_state, _ = load_latest_checkpoints(checkpoint_folder, APPS_DICT_PREFIX, EXCLUDED_PREFIX,
+                                                      ERROR_PREFIX)
+    remaining = crawl_state.remaining(all_app_ids)
+
+    folders = []
+    for index, app_ids in enumerate(partition(remaining, count)):
+        folder = shard_folder(checkpoint_folder, index, count)
+        folder.mkdir(parents=True, exist_ok=True)
+        with open(folder / SHARD_IDS_FILENAME, 'wb') as handle:
+            app_ids.tofile(handle)
+        (folder / SHARD_INFO_FILENAME).write_text(json.dumps({'index': index, 'count': count, 'apps': len(app_ids),
+                                                             'catalog': len(all_app_ids)}))
+        folders.append(folder)
+
+    print_log(f'Planned {len(remaining)} of {len(all_app_ids)} apps into {count} shards')
+    return folders
+
+
+def load_shard_ids(folder: Path) -> array:
+    app_ids = array('I')
+    with open(Path(folder) / SHARD_IDS_FILENAME, 'rb') as handle:
+        app_ids.frombytes(handle.read())
+    return app_ids
+
+
+def run_shard(folder: Path, workers: int = 2, ceiling: float = STEAM_RATE_LIMIT, stop_event=None,
+              progress_callback: Optional[Callable[[int, int, str], None]] = None) -> int:
+    """
+    Crawl one shard, appending every result to its log. Apps already in
+    the log are skipped, so a stopped shard resumes where it left off.
+
+    Args:
+        folder: Shard folder from plan_shards
+        workers: Fetch threads of this shard
+        ceiling: Requests per second this shard may send (see shard_ceiling)
+        stop_event: threading or multiprocessing Event that stops the shard
+        progress_callback: Called with (shard apps, processed, status)
+
+    Returns:
+        Number of apps processed in this run
+    """
+    folder = Path(folder)
+    name = folder.name
+    app_ids = load_shard_ids(folder)
+    log_path = folder / SHARD_LOG_FILENAME
+
+    # which apps an earlier run of this shard already logged; also cuts off a torn last record
+    logged = CrawlState()
+    replay_log(log_path, {}, logged)
+    todo = logged.remaining(app_ids)
+
+    total = len(app_ids)
+    done = total - len(todo)
+    print_log(f'{name}: {len(todo)} of {total} apps to fetch')
+
+    if progress_callback:
+        progress_callback(total, done, 'starting')
+
+    def on_throttle(appid, status, pause):
+        message = throttle_message(appid, status, pause)
+        print_log(f'{name}: {message}')
+        if progress_callback:
+            progress_callback(total, done, message)
+
+    limiter = RateLimiter(ceiling=ceiling, min_rate=ceiling / 8, name=name)
+    fetcher = AppDetailsFetcher(workers=workers, limiter=limiter, name=name)
+    log = CheckpointLog(log_path)
+    processed = 0
+
+    try:
+        for result in fetcher.fetch_all(todo, stop_event, on_throttle):
+            kind, data = classify_result(result)
+            if kind == ERROR:
+                print_log(f'{name}: error in App Id: {result.appid} (status {result.status})')
+            log.append(kind, result.appid, data)
+            done += 1
+            processed += 1
+            if progress_callback:
+                progress_callback(total, done, f'fetched {result.appid}')
+    finally:
+        log.close()
+
+    print_log(f'{name}: processed {processed} apps, {total - done} left')
+    return processed
+
+
+def merge_shards(checkpoint_folder: Path = CHECKPOINT_FOLDER, remove: bool = True) -> int:
+    """
+    Fold every shard's results into the canonical checkpoints and columnar catalog.
+
+    Args:
+        checkpoint_folder: Folder with the canonical checkpoints and the shards folder
+        remove: Delete the shard folders once merged
+
+    Returns:
+        Number of shard records merged
+    """
+    checkpoint_folder = Path(checkpoint_folder)
+    shards = list_shards(checkpoint_folder)
+    if not shards:
+        return 0
+
+    interned = {}
+    apps_dict, aggregates, app_meta, crawl_state, _ = load_latest_checkpoints(
+        checkpoint_folder, APPS_DICT_PREFIX, EXCLUDED_PREFIX, ERROR_PREFIX, interned)
+
+    merged = 0
+    for folder in shards:
+        records = replay_log(folder / SHARD_LOG_FILENAME, apps_dict, crawl_state, aggregates, app_meta=app_meta)
+        print_log(f'Merged {records} records from {folder.name}')
+        merged += records
+
+    # each shard process packed its own records; share their values with the rest of the catalog
+    normalize_apps(apps_dict, interned)
+
+    save_checkpoints(checkpoint_folder, APPS_DICT_PREFIX, EXCLUDED_PREFIX, ERROR_PREFIX, apps_dict, crawl_state,
+                     aggregates, app_meta)
+
+    # load_latest_checkpoints replayed the crawl log too; it is in the snapshot now
+    log = CheckpointLog(checkpoint_folder / LOG_FILENAME)
+    log.truncate()
+    log.close()
+
+    save_columnar_catalog(checkpoint_folder, APPS_DICT_PREFIX, apps_dict)
+    save_sqlite_catalog(checkpoint_folder, APPS_DICT_PREFIX, apps_dict)
+
+    if remove:
+        for folder in shards:
+            shutil.rmtree(folder)
+
+    print_log(f'Merged {merged} records from {len(shards)} shards. Catalog size: {len(apps_dict)}')
+    return merged
+
+
+def _shard_process(folder: str, workers: int, ceiling: float, proxy: Optional[str], stop_event, progress,
+                   index: int) -> None:
+    if proxy:
+        # requests reads these for every call made through the shared session
+        os.environ['HTTPS_PROXY'] = proxy
+        os.environ['HTTP_PROXY'] = proxy
+
+    def progress_callback(total, done, status):
+        progress.put((index, total, done, status))
+
+    run_shard(Path(folder), workers, ceiling, stop_event, progress_callback)
+
+
+def download_sharded(progress_callback=None, stop_event=None, shards: int = 4, workers: int = 2,
+                     proxies: Optional[Sequence[str]] = None, checkpoint_folder: Path = CHECKPOINT_FOLDER) -> None:
+    """
+    Crawl the remaining apps with `shards` processes and merge the results.
+
+    Shards left over from an interrupted run are merged first. Without
+    proxies all shards share one IP and split its rate budget; with
+    proxies, shard i sends through proxies[i % len(proxies)] and the
+    shards on each proxy share that proxy's budget.
+
+    Args:
+        progress_callback: Called with (total apps, processed apps, status), totals over all shards
+        stop_event: threading.Event; when set, shards stop and what they fetched is merged
+        shards: Number of shard processes
+        workers: Fetch threads per shard
+        proxies: Egress proxy URLs
+        checkpoint_folder: Canonical checkpoint folder
+    """
+    print_log('Started sharded Steam crawl', os.getpid())
+    checkpoint_folder = Path(checkpoint_folder)
+    checkpoint_folder.mkdir(parents=True, exist_ok=True)
+
+    if list_shards(checkpoint_folder):
+        print_log('Merging shards of an interrupted run')
+        merge_shards(checkpoint_folder)
+
+    folders = plan_shards(shards, checkpoint_folder)
+    if folders is None:
+        return
+
+    egress = list(proxies or [None])
+    context = multiprocessing.get_context('spawn')
+    shard_stop = context.Event()
+    progress = context.Queue()
+
+    processes = [
+        context.Process(
+            target=_shard_process,
+            args=(str(folder), workers, shard_ceiling(index, shards, len(egress)), egress[index % len(egress)],
+                  shard_stop, progress, index),
+            daemon=True,
+        )
+        for index, folder in enumerate(folders)
+    ]
+    for process in processes:
+        process.start()
+
+    # the shards only report their own counts; apps processed before this run count as done
+    infos = [json.loads((folder / SHARD_INFO_FILENAME).read_text()) for folder in folders]
+    total = infos[0]['catalog']
+    planned = sum(info['apps'] for info in infos)
+    shard_done = [0] * shards
+
+    def report(status):
+        if progress_callback:
+            progress_callback(total, total - planned + sum(shard_done), status)
+
+    report('starting')
+    while any(process.is_alive() for process in processes) or not progress.empty():
+        if stop_event is not None and stop_event.is_set():
+            shard_stop.set()
+        try:
+            index, _, done, status = progress.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        shard_done[index] = done
+        report(f'shard {index}: {status}')
+
+    for process in processes:
+        process.join()
+
+    report('merging shards')
+    merge_shards(checkpoint_folder)
+    report('finalizing')
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Sharded Steam appdetails crawl.')
+    parser.add_argument('--checkpoint-folder', type=Path, default=CHECKPOINT_FOLDER)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    crawl = commands.add_parser('crawl', help='plan, run every shard locally and merge')
+    crawl.add_argument('--shards', type=int, default=4)
+    crawl.add_argument('--workers', type=int, default=2, help='fetch threads per shard')
+    crawl.add_argument('--proxy', action='append', help='egress proxy URL; repeat for several')
+
+    plan = commands.add_parser('plan', help='partition the remaining apps into shard folders')
+    plan.add_argument('--shards', type=int, default=4)
+
+    run = commands.add_parser('run', help='crawl one planned shard (resumable)')
+    run.add_argument('--shard', type=int, required=True, help='shard index')
+    run.add_argument('--workers', type=int, default=2)
+    run.add_argument('--rate', type=float, default=STEAM_RATE_LIMIT,
+                     help='requests per second for this shard (default: one IP\'s budget)')
+
+    commands.add_parser('merge', help='merge shard results into the checkpoints')
+    args = parser.parse_args(argv)
+
+    if args.command == 'crawl':
+        download_sharded(shards=args.shards, workers=args.workers, proxies=args.proxy,
+                         checkpoint_folder=args.checkpoint_folder)
+    elif args.command == 'plan':
+        plan_shards(args.shards, args.checkpoint_folder)
+    elif args.command == 'run':
+        folders = [folder for folder in list_shards(args.checkpoint_folder)
+                   if json.loads((folder / SHARD_INFO_FILENAME).read_text())['index'] == args.shard]
+        if not folders:
+            parser.error(f'No planned shard {args.shard} in {args.checkpoint_folder / SHARDS_FOLDERNAME}')
+        run_shard(folders[0], args.workers, args.rate)
+    else:
+        merge_shards(args.checkpoint_folder)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,693 @@
+import os
+import sys
+import json
+import pickle
+import sqlite3
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from pyscripts.app_records import expand_app
+from pyscripts.facet_index import intersect_postings, union_postings
+from pyscripts.result_pages import name_key, price_key, release_date_key
+
+SQLITE_FILENAME = 'apps_catalog-ckpt-fin.sqlite'
+
+# bump when the schema changes; older files are then treated as missing
+SCHEMA_VERSION = 1
+
+# SQLite limits the number of bound parameters per statement
+_CHUNK = 500
+
+_SCHEMA = '''
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+
+CREATE TABLE apps (
+    appid       INTEGER PRIMARY KEY,
+    type        TEXT    NOT NULL,
+    name        TEXT,
+    name_lower  TEXT    NOT NULL,
+    is_free     INTEGER NOT NULL,
+    name_key    TEXT,
+    release_key INTEGER,
+    price_key   INTEGER,
+    record      TEXT    NOT NULL
+);
+
+CREATE TABLE name_words (
+    word  TEXT    NOT NULL,
+    appid INTEGER NOT NULL,
+    PRIMARY KEY (word, appid)
+) WITHOUT ROWID;
+
+CREATE TABLE developers (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE app_developers (
+    appid        INTEGER NOT NULL,
+    developer_id INTEGER NOT NULL,
+    PRIMARY KEY (appid, developer_id)
+) WITHOUT ROWID;
+
+CREATE TABLE publishers (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE app_publishers (
+    appid        INTEGER NOT NULL,
+    publisher_id INTEGER NOT NULL,
+    PRIMARY KEY (appid, publisher_id)
+) WITHOUT ROWID;
+
+CREATE TABLE genres (id INTEGER PRIMARY KEY, steam_id TEXT, description TEXT NOT NULL);
+CREATE TABLE app_genres (
+    appid    INTEGER NOT NULL,
+    genre_id INTEGER NOT NULL,
+    PRIMARY KEY (appid, genre_id)
+) WITHOUT ROWID;
+
+CREATE TABLE categories (id INTEGER PRIMARY KEY, steam_id TEXT, description TEXT NOT NULL);
+CREATE TABLE app_categories (
+    appid       INTEGER NOT NULL,
+    category_id INTEGER NOT NULL,
+    PRIMARY KEY (appid, category_id)
+) WITHOUT ROWID;
+
+CREATE TABLE prices (
+    appid            INTEGER PRIMARY KEY,
+    currency         TEXT    NOT NULL,
+    initial          INTEGER NOT NULL,
+    final            INTEGER NOT NULL,
+    discount_percent INTEGER NOT NULL
+);
+
+-- trigram tokenizers answer case-insensitive substring queries from the index
+CREATE VIRTUAL TABLE apps_fts USING fts5(name, short_description, tokenize='trigram');
+CREATE VIRTUAL TABLE developers_fts USING fts5(name, tokenize='trigram');
+CREATE VIRTUAL TABLE publishers_fts USING fts5(name, tokenize='trigram');
+'''
+
+# created after the bulk insert, which is faster than maintaining them row by row
+_INDEXES = '''
+CREATE INDEX apps_type ON apps (type);
+CREATE INDEX apps_name_lower ON apps (name_lower);
+CREATE INDEX app_developers_developer ON app_developers (developer_id, appid);
+CREATE INDEX app_publishers_publisher ON app_publishers (publisher_id, appid);
+CREATE INDEX app_genres_genre ON app_genres (genre_id, appid);
+CREATE INDEX app_categories_category ON app_categories (category_id, appid);
+CREATE INDEX prices_initial ON prices (initial);
+'''
+
+# facet name -> (facet table, link table, link column, app dict key)
+FACETS = {
+    'genres': ('genres', 'app_genres', 'genre_id', 'genres'),
+    'categories': ('categories', 'app_categories', 'category_id', 'categories'),
+}
+
+# search field -> (value table, link table, link column, fts table, app dict key)
+TEXT_FIELDS = {
+    'developers': ('developers', 'app_developers', 'developer_id', 'developers_fts', 'developers'),
+    'publishers': ('publishers', 'app_publishers', 'publisher_id', 'publishers_fts', 'publishers'),
+}
+
+# sort field -> apps column holding result_pages' sort key
+SORT_COLUMNS = {
+    'name': 'name_key',
+    'release_date': 'release_key',
+    'price': 'price_key',
+}
+
+
+def _release_key(app_data: Dict) -> Optional[int]:
+    key = release_date_key(app_data)
+    if key is None:
+        return None
+    year, month, day = key
+    return year * 10000 + month * 100 + day
+
+
+# sort field -> the function computing its SORT_COLUMNS value, for apps not in the catalog
+_SORT_VALUES = {
+    'name': name_key,
+    'release_date': _release_key,
+    'price': price_key,
+}
+
+
+def _price_row(app_id: int, app_data: Dict) -> Tuple:
+    if 'price_overview' not in app_data:
+        return app_id, int(bool(app_data.get('is_free'))), None, None, None, None
+    price = app_data['price_overview'] or {}
+    return (app_id, int(bool(app_data.get('is_free'))), price.get('currency', ''), int(price.get('initial', 0)),
+            int(price.get('final', 0)), int(price.get('discount_percent', 0) or 0))
+
+
+def _values(value) -> List[str]:
+    if isinstance(value, str):
+        value = [value]
+    return [v for v in value or [] if isinstance(v, str) and v]
+
+
+def _source_signature(source_path: Optional[Path]) -> Optional[str]:
+    if source_path is None:
+        return None
+    st = os.stat(source_path)
+    return f'{st.st_size}:{st.st_mtime_ns}'
+
+
+def write_sqlite_catalog(path: Path, apps_dict: Dict[int, Any], source_path: Optional[Path] = None) -> int:
+    """
+    Write apps_dict as a normalized SQLite catalog.
+
+    The file is written next to `path` and renamed into place, so readers
+    never see a partial catalog and connections opened before the rename
+    keep reading the previous one.
+
+    Args:
+        path: Destination file
+        apps_dict: App ID -> appdetails dictionary
+        source_path: apps_dict checkpoint this catalog mirrors; its size and
+            mtime are recorded so stale catalogs can be detected
+
+    Returns:
+        Number of apps written
+    """
+    path = Path(path)
+    tmp_path = Path(str(path) + '.tmp')
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    apps = sorted((int(app_id), app_data) for app_id, app_data in apps_dict.items() if isinstance(app_data, dict))
+
+    conn = sqlite3.connect(str(tmp_path))
+    try:
+        conn.execute('PRAGMA journal_mode=OFF')
+        conn.execute('PRAGMA synchronous=OFF')
+        conn.executescript(_SCHEMA)
+
+        value_ids = {field: {} for field in TEXT_FIELDS}
+        facet_ids = {facet: {} for facet in FACETS}
+
+        with conn:
+            for app_id, app_data in apps:
+                name = app_data.get('name') if isinstance(app_data.get('name'), str) else None
+                name_lower = (name or '').lower()
+                conn.execute(
+                    'INSERT INTO apps VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (app_id, (app_data.get('type') or '').lower(), name, name_lower,
+                     int(bool(app_data.get('is_free'))), name_key(app_data), _release_key(app_data),
+                     price_key(app_data), json.dumps(expand_app(app_data), separators=(',', ':'))))
+                conn.execute('INSERT INTO apps_fts (rowid, name, short_description) VALUES (?, ?, ?)',
+                             (app_id, name_lower, app_data.get('short_description') or ''))
+                conn.executemany('INSERT OR IGNORE INTO name_words VALUES (?, ?)',
+                                 ((word, app_id) for word in set(name_lower.split())))
+
+                for field, (table, link_table, _, fts_table, key) in TEXT_FIELDS.items():
+                    ids = value_ids[field]
+                    for value in {v.lower() for v in _values(app_data.get(key))}:
+                        if value not in ids:
+                            ids[value] = len(ids) + 1
+                            conn.execute(f'INSERT INTO {table} VALUES (?, ?)', (ids[value], value))
+                            conn.execute(f'INSERT INTO {fts_table} (rowid, name) VALUES (?, ?)', (ids[value], value))
+                        conn.execute(f'INSERT OR IGNORE INTO {link_table} VALUES (?, ?)', (app_id, ids[value]))
+
+                for facet, (table, link_table, _, key) in FACETS.items():
+                    ids = facet_ids[facet]
+                    for entry in app_data.get(key) or []:
+                        if not isinstance(entry, dict) or not entry.get('description'):
+                            continue
+                        steam_id = str(entry['id']) if entry.get('id') is not None else None
+                        facet_key = (steam_id, entry['description'])
+                        if facet_key not in ids:
+                            ids[facet_key] = len(ids) + 1
+                            conn.execute(f'INSERT INTO {table} VALUES (?, ?, ?)',
+                                         (ids[facet_key], steam_id, entry['description']))
+                        conn.execute(f'INSERT OR IGNORE INTO {link_table} VALUES (?, ?)', (app_id, ids[facet_key]))
+
+                if 'price_overview' in app_data:
+                    price = app_data['price_overview'] or {}
+                    conn.execute('INSERT INTO prices VALUES (?, ?, ?, ?, ?)',
+                                 (app_id, price.get('currency', ''), int(price.get('initial', 0)),
+                                  int(price.get('final', 0)), int(price.get('discount_percent', 0) or 0)))
+
+            conn.executescript(_INDEXES)
+            conn.executemany('INSERT INTO meta VALUES (?, ?)', [
+                ('schema_version', str(SCHEMA_VERSION)),
+                ('source', _source_signature(source_path) or ''),
+                ('count', str(len(apps))),
+            ])
+        conn.execute('ANALYZE')
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, path)
+    return len(apps)
+
+
+def _fts_phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _like_pattern(term: str) -> str:
+    return '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def _prefix_bounds(prefix: str) -> Tuple[str, str]:
+    # BINARY collation compares utf-8 bytes, which sort like code points
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class SqliteCatalog:
+    """
+    Read-only view of a SQLite catalog shared by every thread and worker process.
+
+    The file is opened immutable (it is only ever replaced, never modified
+    in place), so readers take no locks. Each thread gets its own
+    connection. Only the sorted app ids are held in memory; app details
+    are decoded from disk when read.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+
+        conn = self.connection()
+        meta = dict(conn.execute('SELECT key, value FROM meta'))
+        if int(meta.get('schema_version', 0)) != SCHEMA_VERSION:
+            raise ValueError(f'Unsupported SQLite catalog schema: {self.path}')
+        self.source = meta.get('source') or None
+        self.appids = array('I', (row[0] for row in conn.execute('SELECT appid FROM apps ORDER BY appid')))
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(f'{self.path.resolve().as_uri()}?mode=ro&immutable=1', uri=True,
+                                   check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+    def execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        return self.connection().execute(sql, params)
+
+    def __len__(self) -> int:
+        return len(self.appids)
+
+    def __contains__(self, app_id) -> bool:
+        i = bisect_left(self.appids, app_id)
+        return i < len(self.appids) and self.appids[i] == app_id
+
+    def record(self, app_id: int) -> Optional[Dict]:
+        row = self.execute('SELECT record FROM apps WHERE appid = ?', (app_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def ids(self, sql: str, params=()) -> array:
+        """
+        Run a query returning app ids and collect them into a sorted array('I').
+        """
+        return array('I', sorted({row[0] for row in self.execute(sql, params)}))
+
+    def type_ids(self) -> Dict[str, array]:
+        type_ids = {}
+        for app_type, app_id in self.execute('SELECT type, appid FROM apps ORDER BY type, appid'):
+            type_ids.setdefault(app_type, array('I')).append(app_id)
+        return type_ids
+
+    def price_rows(self) -> List[Tuple]:
+        """
+        (appid, is_free, currency, initial, final, discount_percent) for every
+        app ordered by app id; the price columns are None for unpriced apps.
+        """
+        return self.execute(
+            'SELECT a.appid, a.is_free, p.currency, p.initial, p.final, p.discount_percent '
+            'FROM apps a LEFT JOIN prices p ON p.appid = a.appid ORDER BY a.appid').fetchall()
+
+    def facet_counts(self, facet: str) -> Dict[str, int]:
+        """
+        Apps per facet description, e.g. {'Indie': 1200, ...}.
+        """
+        table, link_table, link_column, _ = FACETS[facet]
+        counts = {}
+        for description, count in self.execute(
+                f'SELECT f.description, COUNT(*) FROM {link_table} l JOIN {table} f ON f.id = l.{link_column} '
+                'GROUP BY f.id'):
+            counts[description] = counts.get(description, 0) + count
+        return counts
+
+    def sort_keys(self, sort: str, app_ids: Iterable[int]) -> Dict[int, Any]:
+        """
+        Get result_pages' sort key of each app (release dates as yyyymmdd integers).
+        """
+        column = SORT_COLUMNS[sort]
+        app_ids = list(app_ids)
+        keys = {}
+        for start in range(0, len(app_ids), _CHUNK):
+            chunk = app_ids[start:start + _CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            keys.update(self.execute(f'SELECT appid, {column} FROM apps WHERE appid IN ({placeholders})', chunk))
+        return keys
+
+
+class SqliteAppsDict(MutableMapping):
+    """
+    apps_dict stand-in backed by a SqliteCatalog.
+
+    Membership and iteration use the in-memory app id array; full app
+    dicts are only decoded when an entry is actually read. Apps written
+    after the catalog (e.g. replayed from the checkpoint log) are spilled
+    to an anonymous temporary file and read back by offset, as in
+    ColumnarAppsDict, so the catalog file is never modified.
+    """
+
+    def __init__(self, catalog: SqliteCatalog):
+        self.catalog = catalog
+
+        # apps changed since the catalog was written: app id -> (offset, length) in the spill file
+        self._overlay: Dict[int, tuple] = {}
+        self._removed = set()
+        self._spill = None
+        self._spill_lock = threading.Lock()
+
+    @property
+    def changed(self) -> bool:
+        """
+        True if apps were written or removed since the catalog was loaded.
+        """
+        return bool(self._overlay or self._removed)
+
+    def changed_ids(self) -> Set[int]:
+        """
+        Ids of the apps the catalog no longer answers for: written or removed since it was loaded.
+        """
+        return set(self._overlay) | self._removed
+
+    def overlay_items(self) -> Iterator[Tuple[int, Dict]]:
+        """
+        (app id, app dict) of the apps written since the catalog was loaded, by app id.
+        """
+        for app_id in sorted(self._overlay):
+            yield app_id, self[app_id]
+
+    def _read_spilled(self, offset: int, length: int) -> Dict:
+        with self._spill_lock:
+            self._spill.seek(offset)
+            return pickle.loads(self._spill.read(length))
+
+    def __getitem__(self, app_id) -> Dict:
+        if app_id in self._overlay:
+            return self._read_spilled(*self._overlay[app_id])
+        record = self.catalog.record(app_id) if app_id in self else None
+        if record is None:
+            raise KeyError(app_id)
+        return record
+
+    def __setitem__(self, app_id, app_data: Dict) -> None:
+        raw = pickle.dumps(app_data, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._spill_lock:
+            if self._spill is None:
+                self._spill = tempfile.TemporaryFile(prefix='apps_overlay-')
+            offset = self._spill.seek(0, os.SEEK_END)
+            self._spill.write(raw)
+        self._overlay[app_id] = (offset, len(raw))
+        self._removed.discard(app_id)
+
+    def __delitem__(self, app_id) -> None:
+        if app_id not in self:
+            raise KeyError(app_id)
+        self._overlay.pop(app_id, None)
+        if app_id in self.catalog:
+            self._removed.add(app_id)
+
+    def __contains__(self, app_id) -> bool:
+        if not isinstance(app_id, int):
+            return False
+        return app_id in self._overlay or (app_id in self.catalog and app_id not in self._removed)
+
+    def __iter__(self) -> Iterator[int]:
+        if not self.changed:
+            return iter(self.catalog.appids)
+        changed = self.changed_ids()
+        added = sorted(app_id for app_id in self._overlay if app_id not in self.catalog)
+        return iter([app_id for app_id in self.catalog.appids if app_id not in changed or app_id in self._overlay]
+                    + added)
+
+    def __len__(self) -> int:
+        added = sum(1 for app_id in self._overlay if app_id not in self.catalog)
+        return len(self.catalog) - len(self._removed) + added
+
+    def type_ids(self) -> Dict[str, array]:
+        """
+        SqliteCatalog.type_ids with the changed apps applied.
+        """
+        type_ids = self.catalog.type_ids()
+        if not self.changed:
+            return type_ids
+
+        changed = self.changed_ids()
+        merged = {app_type: [app_id for app_id in app_ids if app_id not in changed]
+                  for app_type, app_ids in type_ids.items()}
+        for app_id, app_data in self.overlay_items():
+            merged.setdefault((app_data.get('type') or '').lower(), []).append(app_id)
+        return {app_type: array('I', sorted(app_ids)) for app_type, app_ids in merged.items() if app_ids}
+
+    def price_rows(self) -> List[Tuple]:
+        """
+        SqliteCatalog.price_rows with the changed apps applied.
+        """
+        rows = self.catalog.price_rows()
+        if not self.changed:
+            return rows
+
+        changed = self.changed_ids()
+        rows = [row for row in rows if row[0] not in changed]
+        rows += [_price_row(app_id, app_data) for app_id, app_data in self.overlay_items()]
+        rows.sort()
+        return rows
+
+    def sort_keys(self, sort: str, app_ids: Iterable[int]) -> Dict[int, Any]:
+        """
+        SqliteCatalog.sort_keys with the keys of changed apps computed from their records.
+        """
+        app_ids = list(app_ids)
+        keys = self.catalog.sort_keys(sort, [app_id for app_id in app_ids if app_id not in self._overlay])
+        for app_id in app_ids:
+            if app_id in self._overlay:
+                keys[app_id] = _SORT_VALUES[sort](self[app_id])
+        return keys
+
+    def close(self) -> None:
+        with self._spill_lock:
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+
+
+class SqliteNameIndex:
+    """
+    SearchIndex stand-in for app names: substring search through the
+    trigram FTS table and type-ahead through the indexed lowercased names
+    and name words.
+    """
+
+    def __init__(self, catalog: SqliteCatalog):
+        self.catalog = catalog
+
+    def _where(self, term: str) -> Tuple[str, tuple]:
+        # trigrams need three characters; shorter terms fall back to a LIKE scan
+        if len(term) < 3:
+            return "apps_fts.name LIKE ? ESCAPE '\\'", (_like_pattern(term),)
+        return 'apps_fts MATCH ?', ('name : ' + _fts_phrase(term),)
+
+    def search(self, term: str) -> List[int]:
+        where, params = self._where(term.lower())
+        return self.catalog.ids(f'SELECT rowid FROM apps_fts WHERE {where}', params).tolist()
+
+    def estimate(self, term: str) -> int:
+        where, params = self._where(term.lower())
+        return self.catalog.execute(f'SELECT COUNT(*) FROM apps_fts WHERE {where}', params).fetchone()[0]
+
+    def prefix_search(self, prefix: str, limit: int = 10) -> List[int]:
+        """
+        Rank apps like SearchIndex.prefix_search: exact names first, then
+        names starting with `prefix`, then names with a word starting with
+        it; ties go to the shorter name.
+        """
+        prefix = prefix.lower().strip()
+        if not prefix or limit <= 0:
+            return []
+
+        low, high = _prefix_bounds(prefix)
+        rows = self.catalog.execute(
+            'SELECT appid, MIN(rank) AS best, name_lower FROM ('
+            '  SELECT appid, CASE WHEN name_lower = ? THEN 0 ELSE 1 END AS rank, name_lower FROM apps'
+            '  WHERE name_lower >= ? AND name_lower < ?'
+            '  UNION ALL'
+            '  SELECT w.appid, 2, a.name_lower FROM name_words w JOIN apps a ON a.appid = w.appid'
+            '  WHERE w.word >= ? AND w.word < ?'
+            ') GROUP BY appid ORDER BY best, length(name_lower), name_lower, appid LIMIT ?',
+            (prefix, low, high, low, high, limit))
+        return [row[0] for row in rows]
+
+
+class SqliteTextIndex:
+    """
+    SearchIndex stand-in for developers or publishers: the distinct names
+    are searched through their trigram FTS table, then joined to the apps.
+    """
+
+    def __init__(self, catalog: SqliteCatalog, field: str):
+        self.catalog = catalog
+        self.table, self.link_table, self.link_column, self.fts_table, _ = TEXT_FIELDS[field]
+
+    def _query(self, select: str, term: str) -> Tuple[str, tuple]:
+        if len(term) < 3:
+            where, params = f"{self.fts_table}.name LIKE ? ESCAPE '\\'", (_like_pattern(term),)
+        else:
+            where, params = f'{self.fts_table} MATCH ?', (_fts_phrase(term),)
+        return (f'SELECT {select} FROM {self.fts_table} JOIN {self.link_table} l '
+                f'ON l.{self.link_column} = {self.fts_table}.rowid WHERE {where}'), params
+
+    def search(self, term: str) -> List[int]:
+        return self.catalog.ids(*self._query('l.appid', term.lower())).tolist()
+
+    def estimate(self, term: str) -> int:
+        sql, params = self._query('COUNT(*)', term.lower())
+        return self.catalog.execute(sql, params).fetchone()[0]
+
+
+class SqliteFacetIndex:
+    """
+    FacetIndex stand-in for genres or categories. The few distinct facets
+    are matched in Python, with FacetIndex's case-insensitive substring
+    rule, and only their app links are read from disk.
+    """
+
+    def __init__(self, catalog: SqliteCatalog, facet: str):
+        self.catalog = catalog
+        self.table, self.link_table, self.link_column, _ = FACETS[facet]
+        # row id -> (Steam's facet id, lowercased description)
+        self._facets = {row_id: (steam_id, description.lower()) for row_id, steam_id, description in
+                        catalog.execute(f'SELECT id, steam_id, description FROM {self.table}')}
+
+    def _matching(self, term: str) -> List[int]:
+        term = term.lower()
+        return [row_id for row_id, (_, description) in self._facets.items() if term in description]
+
+    def _links(self, select: str, row_ids: List[int]) -> str:
+        return (f'SELECT {select} FROM {self.link_table} '
+                f'WHERE {self.link_column} IN ({",".join("?" * len(row_ids))})')
+
+    def lookup(self, term: str) -> array:
+        row_ids = self._matching(term)
+        if not row_ids:
+            return array('I')
+        return self.catalog.ids(self._links('appid', row_ids), row_ids)
+
+    def estimate(self, term: str) -> int:
+        row_ids = self._matching(term)
+        if not row_ids:
+            return 0
+        return self.catalog.execute(self._links('COUNT(*)', row_ids), row_ids).fetchone()[0]
+
+    def lookup_id(self, facet_id) -> array:
+        row_ids = [row_id for row_id, (steam_id, _) in self._facets.items() if steam_id == str(facet_id)]
+        if not row_ids:
+            return array('I')
+        return self.catalog.ids(self._links('appid', row_ids), row_ids)
+
+    def query(self, terms: Iterable[str], match: str = 'all') -> array:
+        postings = [self.lookup(term) for term in terms]
+        if not postings:
+            return array('I')
+        if match == 'any':
+            return union_postings(*postings)
+        return intersect_postings(*postings)
+
+
+class OverlayIndex:
+    """
+    Index of a SqliteAppsDict with changes: answers from one of the catalog's
+    indexes, minus the apps changed since it was written, plus an in-memory
+    SearchIndex or FacetIndex built over the changed apps.
+    """
+
+    def __init__(self, base, overlay, apps: SqliteAppsDict):
+        self.base = base
+        self.overlay = overlay
+        self.apps = apps
+        self.changed = apps.changed_ids()
+
+    def _merge(self, base_ids: Iterable[int], overlay_ids: Iterable[int]) -> array:
+        app_ids = {app_id for app_id in base_ids if app_id not in self.changed}
+        app_ids.update(overlay_ids)
+        return array('I', sorted(app_ids))
+
+    def search(self, term: str) -> List[int]:
+        return self._merge(self.base.search(term), self.overlay.search(term)).tolist()
+
+    def lookup(self, term: str) -> array:
+        return self._merge(self.base.lookup(term), self.overlay.lookup(term))
+
+    def lookup_id(self, facet_id) -> array:
+        return self._merge(self.base.lookup_id(facet_id), self.overlay.lookup_id(facet_id))
+
+    def estimate(self, term: str) -> int:
+        return self.base.estimate(term) + self.overlay.estimate(term)
+
+    def query(self, terms: Iterable[str], match: str = 'all') -> array:
+        postings = [self.lookup(term) for term in terms]
+        if not postings:
+            return array('I')
+        if match == 'any':
+            return union_postings(*postings)
+        return intersect_postings(*postings)
+
+    def prefix_search(self, prefix: str, limit: int = 10) -> List[int]:
+        """
+        Merge both indexes' type-ahead candidates and rank them again by
+        name, with the rule both indexes share.
+        """
+        prefix = prefix.lower().strip()
+        if not prefix or limit <= 0:
+            return []
+
+        # changed apps may take up to len(changed) of the catalog's places
+        candidates = {app_id for app_id in self.base.prefix_search(prefix, limit + len(self.changed))
+                      if app_id not in self.changed}
+        candidates.update(self.overlay.prefix_search(prefix, limit))
+
+        def rank(app_id):
+            name = (self.apps[app_id].get('name') or '').lower()
+            return 0 if name == prefix else 1 if name.startswith(prefix) else 2, len(name), name, app_id
+
+        return sorted(candidates, key=rank)[:limit]
+
+
+def load_sqlite_catalog(path: Path, source_path: Optional[Path] = None) -> Optional[SqliteCatalog]:
+    """
+    Open a SQLite catalog if it exists and mirrors `source_path`.
+
+    Returns:
+        The catalog, or None if missing, unreadable or written for a different
+        version of the apps_dict checkpoint
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+
+    try:
+        catalog = SqliteCatalog(path)
+    except (sqlite3.Error, ValueError):
+        return None
+
+    if source_path is not None and catalog.source != _source_signature(source_path):
+        return None
+    return catalog
+
+
+if __name__ == '__main__':
+    # convert an existing apps_dict checkpoint, e.g.
+    # python -m pyscripts.sqlite_catalog checkpoints/apps_dict-ckpt-fin.p
+    source = Path(sys.argv[1]).resolve()
+    with open(source, 'rb') as f:
+        apps = pickle.load(f)
+    target = source.parent / SQLITE_FILENAME
+    print(f"Wrote {write_sqlite_catalog(target, apps, source)} apps to {target}")
@@ -1,44 +1,26 @@
-from collections import deque
 from datetime import datetime
 import os
-import time
-import requests
 import json
+import time
 
 import pickle
+import sqlite3
 from pathlib import Path
 
 import traceback
 
-def get_app_ids():
-    req = requests.get("https://api.steampowered.com/ISteamApps/GetAppList/v2/")
-
-    if (req.status_code != 200):
-        print_log("Failed to get all games on steam.")
-        return
-
-    try:
-        data = req.json()
-    except Exception as e:
-        traceback.print_exc(limit=5)
-        return {}
-
-    apps_data = data['applist']['apps']
-
-    apps_ids = []
-
-    for app in apps_data:
-        appid = app['appid']
-        name = app['name']
-
-        # skip apps that have empty name
-        if not name:
-            continue
-
-        apps_ids.append(appid)
-
-    return apps_ids
-
+from pyscripts.app_id_bitmap import AppIdBitmap, CrawlState, id_array, load_crawl_state, load_id_list, save_crawl_state
+from pyscripts.app_id_retriever import get_app_ids
+from pyscripts.app_records import normalize_app, normalize_apps
+from pyscripts.catalog_aggregates import CatalogAggregates, load_aggregates, save_aggregates
+from pyscripts.checkpoint_log import APP, ERROR, EXCLUDED, LOG_FILENAME, REMOVED, CheckpointLog, replay_log
+from pyscripts.columnar_catalog import COLUMNAR_FILENAME, write_columnar_catalog
+from pyscripts.delta_refresh import (DEFAULT_TTL_DAYS, load_app_meta, plan_refresh, record_fetch, save_app_meta,
+                                     seed_app_meta)
+from pyscripts.fetch_engine import AppDetailsFetcher
+from pyscripts.job_queue import DONE, JOB_QUEUE_FILENAME, LEASE_BATCH, JobQueue
+from pyscripts.metrics import CHECKPOINT_SAVE_BYTES, CHECKPOINT_SAVE_SECONDS
+from pyscripts.sqlite_catalog import SQLITE_FILENAME, write_sqlite_catalog
 
 def print_log(*args):
     print(f"[{str(datetime.now())[:-3]}] ", end="")
@@ -46,10 +28,12 @@ def print_log(*args):
 
 
 def save_checkpoints(checkpoint_folder, apps_dict_filename_prefix, exc_apps_filename_prefix, error_apps_filename_prefix,
-                     apps_dict, excluded_apps_list, error_apps_list):
+                     apps_dict, crawl_state: CrawlState, aggregates=None, app_meta=None):
     if not checkpoint_folder.exists():
         checkpoint_folder.mkdir(parents=True)
 
+    start = time.perf_counter()
+
     save_path = checkpoint_folder.joinpath(
         apps_dict_filename_prefix + f'-ckpt-fin.p'
     ).resolve()
@@ -65,15 +49,66 @@ def save_checkpoints(checkpoint_folder, apps_dict_filename_prefix, exc_apps_file
     save_pickle(save_path, apps_dict)
     print_log(f'Successfully create app_dict checkpoint: {save_path}')
 
-    save_pickle(save_path2, excluded_apps_list)
+    if aggregates is not None:
+        save_aggregates(save_path, aggregates)
+
+    save_pickle(save_path2, id_array(crawl_state.excluded))
     print_log(f"Successfully create excluded apps checkpoint: {save_path2}")
 
-    save_pickle(save_path3, error_apps_list)
+    save_pickle(save_path3, id_array(crawl_state.errors))
     print_log(f"Successfully create error apps checkpoint: {save_path3}")
 
+    if app_meta is not None:
+        save_app_meta(checkpoint_folder, app_meta)
+
+    save_crawl_state(checkpoint_folder, (save_path, save_path2, save_path3), crawl_state)
+
+    CHECKPOINT_SAVE_SECONDS.observe(time.perf_counter() - start, format='pickle')
+    CHECKPOINT_SAVE_BYTES.set(sum(path.stat().st_size for path in (save_path, save_path2, save_path3)),
+                              format='pickle')
+
     print()
 
 
+def save_columnar_catalog(checkpoint_folder, apps_dict_filename_prefix, apps_dict):
+    source_path = checkpoint_folder.joinpath(apps_dict_filename_prefix + f'-ckpt-fin.p').resolve()
+    save_path = checkpoint_folder.joinpath(COLUMNAR_FILENAME).resolve()
+
+    start = time.perf_counter()
+    try:
+        count = write_columnar_catalog(save_path, apps_dict, source_path)
+    except OSError as e:
+        # e.g. a reader still has the old catalog mapped on Windows; the pickle stays authoritative
+        print_log(f'Failed to write columnar catalog {save_path}: {e}')
+        return
+
+    CHECKPOINT_SAVE_SECONDS.observe(time.perf_counter() - start, format='columnar')
+    CHECKPOINT_SAVE_BYTES.set(save_path.stat().st_size, format='columnar')
+
+    print_log(f'Successfully create columnar catalog ({count} apps): {save_path}')
+
+
+def save_sqlite_catalog(checkpoint_folder, apps_dict_filename_prefix, apps_dict):
+    # only kept up to date once created (python -m pyscripts.sqlite_catalog), i.e. when the web tier uses it
+    save_path = checkpoint_folder.joinpath(SQLITE_FILENAME).resolve()
+    if not save_path.exists():
+        return
+
+    source_path = checkpoint_folder.joinpath(apps_dict_filename_prefix + f'-ckpt-fin.p').resolve()
+
+    start = time.perf_counter()
+    try:
+        count = write_sqlite_catalog(save_path, apps_dict, source_path)
+    except (OSError, sqlite3.Error) as e:
+        print_log(f'Failed to write SQLite catalog {save_path}: {e}')
+        return
+
+    CHECKPOINT_SAVE_SECONDS.observe(time.perf_counter() - start, format='sqlite')
+    CHECKPOINT_SAVE_BYTES.set(save_path.stat().st_size, format='sqlite')
+
+    print_log(f'Successfully create SQLite catalog ({count} apps): {save_path}')
+
+
 def load_pickle(path_to_load: Path) -> dict:
     obj = pickle.load(open(path_to_load, "rb"))
 
@@ -81,8 +116,11 @@ def load_pickle(path_to_load: Path) -> dict:
 
 
 def save_pickle(path_to_save: Path, obj):
-    with open(path_to_save, 'wb') as handle:
+    # write to a temp file and rename so readers never see a half-written pickle
+    tmp_path = Path(str(path_to_save) + '.tmp')
+    with open(tmp_path, 'wb') as handle:
         pickle.dump(obj, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path_to_save)
 
 
 def check_latest_checkpoints(checkpoint_folder, apps_dict_filename_prefix, exc_apps_filename_prefix,
@@ -114,20 +152,67 @@ def check_latest_checkpoints(checkpoint_folder, apps_dict_filename_prefix, exc_a
     return latest_apps_dict_ckpt_path, latest_exc_apps_list_ckpt_path, latest_error_apps_list_ckpt_path
 
 
-def download_all_apps(progress_callback=None, stop_event=None):
-    print_log("Started Steam scraper process", os.getpid())
+def throttle_message(appid, status, pause):
+    if status == 429:
+        return f'Too many requests. Put App ID {appid} back in queue. Backing off for {pause:.0f} sec'
+    return f'Forbidden to access. Put App ID {appid} back in queue. Backing off for {pause:.0f} sec'
 
-    apps_dict_filename_prefix = 'apps_dict'
-    exc_apps_filename_prefix = 'excluded_apps_list'
-    error_apps_filename_prefix = 'error_apps_list'
 
+def load_latest_checkpoints(checkpoint_folder, apps_dict_filename_prefix, exc_apps_filename_prefix,
+                            error_apps_filename_prefix, interned=None):
+    """
+    Recover the crawl state: load the latest snapshot, then replay the
+    checkpoint log written since that snapshot. When `interned` is given the
+    recovered records are normalized with it (see normalize_apps), so they
+    share values with the records fetched afterwards.
+
+    Returns (apps_dict, aggregates, app_meta, crawl_state, log_records), log_records
+    being the number of records replayed, i.e. still in the log. The excluded and
+    error apps are in crawl_state.
+    """
     apps_dict = {}
-    excluded_apps_list = []
-    error_apps_list = []
+    aggregates = None
+    app_meta = load_app_meta(checkpoint_folder)
 
-    all_app_ids = get_app_ids()
+    latest_apps_dict_ckpt_path, latest_exc_apps_list_ckpt_path, latest_error_apps_list_ckpt_path = check_latest_checkpoints(
+        checkpoint_folder, apps_dict_filename_prefix, exc_apps_filename_prefix, error_apps_filename_prefix)
+
+    if latest_apps_dict_ckpt_path:
+        apps_dict = load_pickle(latest_apps_dict_ckpt_path)
+        aggregates = load_aggregates(latest_apps_dict_ckpt_path)
+        print_log('Successfully load apps_dict checkpoint:', latest_apps_dict_ckpt_path)
+        print_log(f'Number of apps in apps_dict: {len(apps_dict)}')
+
+    # genre/tag/price counts for the analytics pages, kept current as apps are added
+    if aggregates is None:
+        aggregates = CatalogAggregates.build(apps_dict)
+
+    # bitmaps of fetched / excluded / error app ids; the excluded and error list
+    # checkpoints are only read when no state was saved along with them
+    crawl_state = load_crawl_state(checkpoint_folder, (latest_apps_dict_ckpt_path, latest_exc_apps_list_ckpt_path,
+                                                       latest_error_apps_list_ckpt_path))
+    if crawl_state is None:
+        crawl_state = CrawlState(AppIdBitmap(apps_dict.keys()), load_id_list(latest_exc_apps_list_ckpt_path),
+                                 load_id_list(latest_error_apps_list_ckpt_path))
+    print_log(f'Number of apps in excluded_apps_list: {len(crawl_state.excluded)}')
+    print_log(f'Number of apps in error_apps_list: {len(crawl_state.errors)}')
+
+    replayed = replay_log(checkpoint_folder / LOG_FILENAME, apps_dict, crawl_state, aggregates, app_meta=app_meta)
+    if replayed:
+        print_log(f'Replayed {replayed} records from checkpoint log')
+
+    if interned is not None:
+        normalize_apps(apps_dict, interned)
+
+    return apps_dict, aggregates, app_meta, crawl_state, replayed
 
-    print_log('Total number of apps on steam:', len(all_app_ids))
+
+def download_all_apps(progress_callback=None, stop_event=None, workers=4):
+    print_log("Started Steam scraper process", os.getpid())
+
+    apps_dict_filename_prefix = 'apps_dict'
+    exc_apps_filename_prefix = 'excluded_apps_list'
+    error_apps_filename_prefix = 'error_apps_list'
 
     # path = project directory (i.e. steam_data_scraping)/checkpoints
     checkpoint_folder =  Path(__file__).parent.parent.resolve() / "checkpoints"
@@ -140,128 +225,276 @@ def download_all_apps(progress_callback=None, stop_event=None):
 
         checkpoint_folder.mkdir(parents=True)
 
-    latest_apps_dict_ckpt_path, latest_exc_apps_list_ckpt_path, latest_error_apps_list_ckpt_path = check_latest_checkpoints(
-        checkpoint_folder, apps_dict_filename_prefix, exc_apps_filename_prefix, error_apps_filename_prefix)
+    all_app_ids = get_app_ids(checkpoint_folder)
+    if all_app_ids is None:
+        print_log('Failed to get the app list. Download aborted.')
+        return
 
-    if latest_apps_dict_ckpt_path:
-        apps_dict = load_pickle(latest_apps_dict_ckpt_path)
-        print_log('Successfully load apps_dict checkpoint:', latest_apps_dict_ckpt_path)
-        print_log(f'Number of apps in apps_dict: {len(apps_dict)}')
+    print_log('Total number of apps on steam:', len(all_app_ids))
+
+    # repeated values of the loaded and fetched records, shared between them (see normalize_app)
+    interned = {}
+    apps_dict, aggregates, app_meta, crawl_state, log_records = load_latest_checkpoints(
+        checkpoint_folder, apps_dict_filename_prefix, exc_apps_filename_prefix, error_apps_filename_prefix, interned)
 
-    if latest_exc_apps_list_ckpt_path:
-        excluded_apps_list = load_pickle(latest_exc_apps_list_ckpt_path)
-        print_log("Successfully load excluded_apps_list checkpoint:", latest_exc_apps_list_ckpt_path)
-        print_log(f'Number of apps in excluded_apps_list: {len(excluded_apps_list)}')
+    # all_app_ids is sorted and de-duplicated
+    total = len(all_app_ids)
 
-    if latest_error_apps_list_ckpt_path:
-        error_apps_list = load_pickle(latest_error_apps_list_ckpt_path)
-        print_log("Successfully load error_apps_list checkpoint:", latest_error_apps_list_ckpt_path)
-        print_log(f'Number of apps in error_apps_list: {len(error_apps_list)}')
+    # the queue keeps each app's state and retry schedule across restarts;
+    # apps processed outside it (snapshots, sharded crawls) are closed here
+    jobs = JobQueue(checkpoint_folder / JOB_QUEUE_FILENAME)
+    remaining = jobs.sync(all_app_ids, crawl_state)
 
-    total = len(set(all_app_ids))
+    done = total - remaining
 
-    # remove app_ids that already scrapped or excluded or error
-    all_app_ids = set(all_app_ids) \
-                  - set(map(int, set(apps_dict.keys()))) \
-                  - set(map(int, excluded_apps_list)) \
-                  - set(map(int, error_apps_list))
+    print('Number of remaining apps:', remaining)
 
-    done = total - len(all_app_ids)
+    # every result is appended here; snapshots are only rewritten on compaction
+    log = CheckpointLog(checkpoint_folder / LOG_FILENAME, records=log_records)
 
-    # first get remaining apps
-    apps_remaining_deque = deque(set(all_app_ids))
+    if progress_callback:
+        progress_callback(total, done, "starting")
+
+    # the fetcher re-queues throttled apps itself; their jobs stay leased meanwhile
+    def on_throttle(appid, status, pause):
+        message = throttle_message(appid, status, pause)
+        print_log(message)
+        if progress_callback:
+            progress_callback(total, done, message)
+
+    fetcher = AppDetailsFetcher(workers=workers, name='apps')
+
+    # jobs are leased a batch at a time so other workers sharing the queue get their share
+    while not (stop_event and stop_event.is_set()):
+        batch = jobs.lease(LEASE_BATCH)
+        if not batch:
+            # nothing eligible now; wait for the next scheduled retry (or another worker's lease
+            # to expire) instead of finishing with jobs still open
+            wait = jobs.next_eligible_in()
+            if wait is None:
+                break
+            message = f'Waiting for {jobs.open_count()} scheduled retries. Next in {int(wait) + 1} sec'
+            print_log(message)
+            if progress_callback:
+                progress_callback(total, done, message)
+            if stop_event:
+                stop_event.wait(wait + 1)
+            else:
+                time.sleep(wait + 1)
+            continue
+
+        for result in fetcher.fetch_all(batch, stop_event, on_throttle):
+
+            appid = result.appid
+
+            # test whether the game exists or not
+            # by making request to get the details of the app
+            try:
+                if result.error is not None:
+                    raise result.error
+
+                if result.status == 200:
+                    appdetails = result.payload[str(appid)]
+
+                else:
+                    print_log("ERROR: status code:", result.status)
+                    if jobs.fail(appid, result.status):
+                        print_log(f"Error in App Id: {appid}. Retry scheduled.")
+                        continue
+                    print_log(f"Error in App Id: {appid}. Put the app to error apps list.")
+                    if progress_callback:
+                        progress_callback(total, done, f"Error in App Id: {appid}. Put the app to error apps list.")
+                    crawl_state.errors.add(appid)
+                    log.append(ERROR, appid)
+                    jobs.complete(appid, ERROR, result.status)
+                    done += 1
+                    continue
+
+            except:
+                print_log(f"Error in decoding app details request. App id: {appid}")
+
+                traceback.print_exc(limit=5)
+                print()
+                # network errors and garbled responses are retried before the app is given up on
+                if jobs.fail(appid, type(result.error).__name__ if result.error else 'decode'):
+                    continue
+                appdetails = {'success': False}
+
+            done += 1
+            if progress_callback:
+                progress_callback(total, done, f"fetched {appid}")
+
+            # not success -> the game does not exist anymore
+            # add the app id to excluded app id list
+            if appdetails['success'] == False:
+                crawl_state.excluded.add(appid)
+                log.append(EXCLUDED, appid)
+                jobs.complete(appid, EXCLUDED, result.status)
+                print_log(f'No successful response. Add App ID: {appid} to excluded apps list')
+                continue
 
-    print('Number of remaining apps:', len(apps_remaining_deque))
+            appdetails_data = appdetails['data']
+
+            appdetails_data['appid'] = appid
+            appdetails_data = normalize_app(appdetails_data, interned)
+
+            aggregates.replace_app(apps_dict.get(appid), appdetails_data)
+            apps_dict[appid] = appdetails_data
+            crawl_state.fetched.add(appid)
+            record_fetch(app_meta, appid, appdetails_data)
+            log.append(APP, appid, appdetails_data)
+            jobs.complete(appid, DONE, result.status)
+            print_log(f"Successfully get content of App ID: {appid}")
+
+            # fold the log into a fresh snapshot once it is large relative to the catalog
+            if log.should_compact(len(apps_dict)):
+                save_checkpoints(checkpoint_folder, apps_dict_filename_prefix, exc_apps_filename_prefix,
+                                 error_apps_filename_prefix, apps_dict, crawl_state, aggregates, app_meta)
+                log.truncate()
+
+    # leased jobs the fetcher did not get to go back to the queue
+    jobs.release()
+    jobs.close()
+
+    if stop_event and stop_event.is_set():
+        log.close()
+        if progress_callback:
+            progress_callback(total, done, "paused")
+        return
 
-    i = 0
+    # save checkpoints at the end
+    save_checkpoints(checkpoint_folder, apps_dict_filename_prefix, exc_apps_filename_prefix, error_apps_filename_prefix,
+                     apps_dict, crawl_state, aggregates, app_meta)
+    log.truncate()
+    log.close()
+    save_columnar_catalog(checkpoint_folder, apps_dict_filename_prefix, apps_dict)
+    save_sqlite_catalog(checkpoint_folder, apps_dict_filename_prefix, apps_dict)
 
     if progress_callback:
-        progress_callback(total, done, "starting")
+        progress_callback(total, done, "finalizing")
 
-    while len(apps_remaining_deque) > 0:
+    print_log(f"Total number of valid apps: {len(apps_dict)}")
+    print_log(f"Total number of skipped apps: {len(crawl_state.excluded)}")
+    print_log(f"Total number of error apps: {len(crawl_state.errors)}")
 
-        if stop_event and stop_event.is_set():
-            return
+    print_log('Successful run. Program Terminates.')
 
-        appid = apps_remaining_deque.popleft()
 
-        # test whether the game exists or not
-        # by making request to get the details of the app
-        try:
-            appdetails_req = requests.get(f"https://store.steampowered.com/api/appdetails?appids={appid}")
+def refresh_apps(progress_callback=None, stop_event=None, ttl_days=DEFAULT_TTL_DAYS, max_apps=None, workers=4):
+    """
+    Delta refresh of an existing catalog: fetch apps that are new in
+    GetAppList, re-check apps that disappeared from it, and re-fetch apps
+    last fetched more than `ttl_days` ago, in that order.
+    """
+    print_log("Started Steam delta refresh", os.getpid())
 
-            if appdetails_req.status_code == 200:
-                appdetails = appdetails_req.json()
-                appdetails = appdetails[str(appid)]
-                done += 1
-                if progress_callback:
-                    progress_callback(total, done, f"fetched {appid}")
+    apps_dict_filename_prefix = 'apps_dict'
+    exc_apps_filename_prefix = 'excluded_apps_list'
+    error_apps_filename_prefix = 'error_apps_list'
 
-            elif appdetails_req.status_code == 429:
-                print_log(f'Too many requests. Put App ID {appid} back to deque. Sleep for 10 sec')
-                if progress_callback:
-                    progress_callback(total, done, f"Too many requests. Put App ID {appid} back in queue. Sleep for 10 sec")
-                apps_remaining_deque.appendleft(appid)
-                time.sleep(10)
-                continue
+    checkpoint_folder = Path(__file__).parent.parent.resolve() / "checkpoints"
+    checkpoint_folder.mkdir(parents=True, exist_ok=True)
 
+    current_app_ids = get_app_ids(checkpoint_folder)
+    if not current_app_ids:
+        print_log('Failed to get the current app list. Refresh aborted.')
+        return
 
-            elif appdetails_req.status_code == 403:
-                print_log(f'Forbidden to access. Put App ID {appid} back to deque. Sleep for 300 sec.')
-                if progress_callback:
-                    progress_callback(total, done, f'Forbidden to access. Put App ID {appid} back to deque. Sleep for 5 min.')
-                apps_remaining_deque.appendleft(appid)
-                time.sleep(5 * 60)
-                continue
+    # repeated values of the loaded and fetched records, shared between them (see normalize_app)
+    interned = {}
+    apps_dict, aggregates, app_meta, crawl_state, log_records = load_latest_checkpoints(
+        checkpoint_folder, apps_dict_filename_prefix, exc_apps_filename_prefix, error_apps_filename_prefix, interned)
 
-            else:
-                print_log("ERROR: status code:", appdetails_req.status_code)
-                print_log(f"Error in App Id: {appid}. Put the app to error apps list.")
-                if progress_callback:
-                    progress_callback(total, done, f"Error in App Id: {appid}. Put the app to error apps list.")
-                error_apps_list.append(appid)
-                continue
+    # apps without a fetch time were fetched before app_meta was kept, so no later than their snapshot
+    apps_dict_ckpt_path, _, _ = check_latest_checkpoints(checkpoint_folder, apps_dict_filename_prefix,
+                                                         exc_apps_filename_prefix, error_apps_filename_prefix)
+    if apps_dict_ckpt_path:
+        seeded = seed_app_meta(app_meta, apps_dict, apps_dict_ckpt_path.stat().st_mtime)
+        if seeded:
+            print_log(f'Seeded fetch times of {seeded} apps from {apps_dict_ckpt_path.name}')
 
-        except:
-            print_log(f"Error in decoding app details request. App id: {appid}")
+    plan = plan_refresh(current_app_ids, apps_dict, crawl_state.excluded, app_meta,
+                        ttl_days * 24 * 60 * 60, max_apps=max_apps)
+    print_log(f'Refresh plan: {len(plan.new)} new, {len(plan.removed)} removed, {len(plan.stale)} stale')
 
-            traceback.print_exc(limit=5)
-            appdetails = {'success': False}
-            print()
+    total = len(plan)
+    done = 0
+    changed = 0
 
-        # not success -> the game does not exist anymore
-        # add the app id to excluded app id list
-        if appdetails['success'] == False:
-            excluded_apps_list.append(appid)
-            print_log(f'No successful response. Add App ID: {appid} to excluded apps list')
+    log = CheckpointLog(checkpoint_folder / LOG_FILENAME, records=log_records)
+
+    if progress_callback:
+        progress_callback(total, done, "starting")
+
+    def on_throttle(appid, status, pause):
+        message = throttle_message(appid, status, pause)
+        print_log(message)
+        if progress_callback:
+            progress_callback(total, done, message)
+
+    fetcher = AppDetailsFetcher(workers=workers, name='refresh')
+
+    for result in fetcher.fetch_all(plan.app_ids(), stop_event, on_throttle):
+
+        appid = result.appid
+        done += 1
+        if progress_callback:
+            progress_callback(total, done, f"refreshed {appid}")
+
+        appdetails = None
+        if result.error is None and result.status == 200 and isinstance(result.payload, dict):
+            appdetails = result.payload.get(str(appid))
+
+        # failed request: keep whatever the catalog already has
+        if appdetails is None:
+            print_log(f"Error refreshing App Id: {appid} (status {result.status})")
+            if appid not in apps_dict and crawl_state.errors.add(appid):
+                log.append(ERROR, appid)
             continue
 
-        appdetails_data = appdetails['data']
+        # the store page is gone: drop the app from the catalog
+        if not appdetails.get('success'):
+            if appid in apps_dict:
+                aggregates.remove_app(apps_dict.pop(appid))
+                app_meta.pop(appid, None)
+                crawl_state.fetched.discard(appid)
+                log.append(REMOVED, appid)
+                print_log(f'Removed App ID: {appid} from the catalog')
+            if crawl_state.excluded.add(appid):
+                log.append(EXCLUDED, appid)
+            continue
 
+        appdetails_data = appdetails['data']
         appdetails_data['appid'] = appid
+        appdetails_data = normalize_app(appdetails_data, interned)
 
+        if record_fetch(app_meta, appid, appdetails_data):
+            changed += 1
+        aggregates.replace_app(apps_dict.get(appid), appdetails_data)
         apps_dict[appid] = appdetails_data
-        print_log(f"Successfully get content of App ID: {appid}")
+        crawl_state.fetched.add(appid)
+        log.append(APP, appid, appdetails_data)
 
-        i += 1
-        # for each 50, save a ckpt
-        if i >= 50:
+        if log.should_compact(len(apps_dict)):
             save_checkpoints(checkpoint_folder, apps_dict_filename_prefix, exc_apps_filename_prefix,
-                             error_apps_filename_prefix, apps_dict, excluded_apps_list, error_apps_list)
-            i = 0
+                             error_apps_filename_prefix, apps_dict, crawl_state, aggregates, app_meta)
+            log.truncate()
+
+    if stop_event and stop_event.is_set():
+        log.close()
+        return
 
-    # save checkpoints at the end
     save_checkpoints(checkpoint_folder, apps_dict_filename_prefix, exc_apps_filename_prefix, error_apps_filename_prefix,
-                     apps_dict, excluded_apps_list, error_apps_list)
+                     apps_dict, crawl_state, aggregates, app_meta)
+    log.truncate()
+    log.close()
+    save_columnar_catalog(checkpoint_folder, apps_dict_filename_prefix, apps_dict)
+    save_sqlite_catalog(checkpoint_folder, apps_dict_filename_prefix, apps_dict)
 
     if progress_callback:
         progress_callback(total, done, "finalizing")
 
-    print_log(f"Total number of valid apps: {len(apps_dict)}")
-    print_log(f"Total number of skipped apps: {len(excluded_apps_list)}")
-    print_log(f"Total number of error apps: {len(error_apps_list)}")
-
-    print_log('Successful run. Program Terminates.')
+    print_log(f'Refreshed {done} apps, {changed} new or changed. Catalog size: {len(apps_dict)}')
 
 
 if __name__ == '__main__':
@@ -269,14 +502,10 @@ if __name__ == '__main__':
     exc_apps_filename_prefix = 'excluded_apps_list'
     error_apps_filename_prefix = 'error_apps_list'
 
-    apps_dict = {}
-    excluded_apps_list = []
-    error_apps_list = []
-
-    all_app_ids = get_app_ids()
-
     checkpoint_folder = Path('../checkpoints').resolve()
 
+    all_app_ids = get_app_ids(checkpoint_folder)
+
     print_log('Checkpoint folder:', checkpoint_folder)
 
     if not checkpoint_folder.exists():
@@ -285,22 +514,7 @@ if __name__ == '__main__':
 
         checkpoint_folder.mkdir(parents=True)
 
-    latest_apps_dict_ckpt_path, latest_exc_apps_list_ckpt_path, latest_error_apps_list_ckpt_path = check_latest_checkpoints(
+    apps_dict, _, _, _, _ = load_latest_checkpoints(
         checkpoint_folder, apps_dict_filename_prefix, exc_apps_filename_prefix, error_apps_filename_prefix)
 
-    if latest_apps_dict_ckpt_path:
-        apps_dict = load_pickle(latest_apps_dict_ckpt_path)
-        print_log('Successfully load apps_dict checkpoint:', latest_apps_dict_ckpt_path)
-        print_log(f'Number of apps in apps_dict: {len(apps_dict)}')
-
-    if latest_exc_apps_list_ckpt_path:
-        excluded_apps_list = load_pickle(latest_exc_apps_list_ckpt_path)
-        print_log("Successfully load excluded_apps_list checkpoint:", latest_exc_apps_list_ckpt_path)
-        print_log(f'Number of apps in excluded_apps_list: {len(excluded_apps_list)}')
-
-    if latest_error_apps_list_ckpt_path:
-        error_apps_list = load_pickle(latest_error_apps_list_ckpt_path)
-        print_log("Successfully load error_apps_list checkpoint:", latest_error_apps_list_ckpt_path)
-        print_log(f'Number of apps in error_apps_list: {len(error_apps_list)}')
-
     print(len(apps_dict))
\ No newline at end of file
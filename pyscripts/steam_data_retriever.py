@@ -1,9 +1,32 @@
 import os
+import time
 import pickle
+import threading
+from array import array
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 
+from pyscripts.app_cards import AppCard
+from pyscripts.app_id_bitmap import AppIdBitmap, CrawlState, load_crawl_state, load_id_list
+from pyscripts.app_records import expand_app
+from pyscripts.catalog_aggregates import CatalogAggregates, load_aggregates
+from pyscripts.checkpoint_log import LOG_FILENAME, replay_log
+from pyscripts.columnar_catalog import COLUMNAR_FILENAME, ColumnarAppsDict, load_columnar_catalog
+from pyscripts.facet_index import FacetIndex, intersect_postings, union_postings
+from pyscripts.metrics import CHECKPOINT_APPS, CHECKPOINT_LOAD_BYTES, CHECKPOINT_LOAD_SECONDS, RETRIEVER_QUERY_SECONDS
+from pyscripts.price_table import PriceTable
+from pyscripts.query_planner import Predicate, execute_query
+from pyscripts.record_cache import RECORD_CACHE_BYTES
+from pyscripts.result_pages import SORT_KEY_FUNCTIONS, SUMMARY_FIELDS, page_bounds, project_app, sort_app_ids
+from pyscripts.search_index import SearchIndex
+from pyscripts.sqlite_catalog import (SQLITE_FILENAME, OverlayIndex, SqliteAppsDict, SqliteFacetIndex,
+                                      SqliteNameIndex, SqliteTextIndex, load_sqlite_catalog)
+
+# 'memory' builds in-memory indexes over the pickle (or mmap'ed columnar) checkpoint;
+# 'sqlite' serves from the on-disk SQLite catalog, so workers share it instead of each holding the catalog
+BACKENDS = ('memory', 'sqlite')
+
 
 def print_log(*args):
     print(f"[{str(datetime.now())[:-3]}] ", end="")
@@ -11,14 +34,39 @@ def print_log(*args):
 
 
 class SteamDataRetriever:
-    def __init__(self, checkpoint_folder: str = 'checkpoints', search_data_folder: Optional[str] = None):
+    def __init__(self, checkpoint_folder: str = 'checkpoints', search_data_folder: Optional[str] = None,
+                 backend: str = 'memory', record_cache_bytes: int = RECORD_CACHE_BYTES):
+        if backend not in BACKENDS:
+            raise ValueError(f'Unknown backend: {backend}')
 
         self.checkpoint_folder  = Path(checkpoint_folder).resolve()
         self.search_data_folder = Path(search_data_folder).resolve() if search_data_folder else None
+        self.backend = backend
+        self.record_cache_bytes = record_cache_bytes
 
         self.apps_dict            = {}
-        self.excluded_apps_list   = []
-        self.error_apps_list = []
+        # app_id -> summarize_app dict; the apps_dict itself unless it loads full records on demand
+        self.summaries            = self.apps_dict
+        # fetched / excluded / error app ids
+        self.crawl_state          = CrawlState()
+
+        # (name, mtime_ns, size) of the checkpoint files this instance was loaded from
+        self.version = None
+
+        self.name_index      = SearchIndex()
+        self.developer_index = SearchIndex()
+        self.publisher_index = SearchIndex()
+        self.genre_index     = FacetIndex()
+        self.tag_index       = FacetIndex()
+        self.aggregates      = CatalogAggregates()
+        self.price_table     = PriceTable.build({})
+        # lowercased app type ('game', 'dlc', ...) -> sorted app ids
+        self.type_index: Dict[str, array] = {}
+
+        # sort field -> {app_id: sort value}, filled lazily by get_results_page
+        self._sort_keys = {}
+        # app_id -> AppCard, filled lazily by get_app_card
+        self._cards = {}
 
         self.search_categories = [
             'topsellers',
@@ -36,35 +84,219 @@ class SteamDataRetriever:
             return pickle.load(handle)
 
     def _load_latest_checkpoints(self) -> None:
+        start = time.perf_counter()
 
         # Prefixes for the checkpoint files
         apps_dict_filename_prefix = 'apps_dict'
         exc_apps_filename_prefix = 'excluded_apps_list'
         error_apps_filename_prefix = 'error_apps_list'
 
-        latest_apps_dict_ckpt_path, latest_exc_apps_list_ckpt_path, latest_error_apps_list_ckpt_path = self._check_latest_checkpoints(
+        ckpt_paths = self._check_latest_checkpoints(
             self.checkpoint_folder,
             apps_dict_filename_prefix,
             exc_apps_filename_prefix,
             error_apps_filename_prefix
         )
-
-        if latest_apps_dict_ckpt_path and latest_apps_dict_ckpt_path.exists():
-            self.apps_dict = self._load_pickle(latest_apps_dict_ckpt_path)
+        latest_apps_dict_ckpt_path, latest_exc_apps_list_ckpt_path, latest_error_apps_list_ckpt_path = ckpt_paths
+
+        # stat before reading so a checkpoint written mid-load shows up as a newer version
+        self.version = checkpoint_signature(signature_paths(ckpt_paths))
+
+        aggregates = None
+        catalog = None
+        sqlite_catalog = None
+        log_path = self.checkpoint_folder / LOG_FILENAME
+        has_log = log_path.exists() and log_path.stat().st_size > 0
+
+        if self.backend == 'sqlite' and latest_apps_dict_ckpt_path and latest_apps_dict_ckpt_path.exists():
+            # like the columnar catalog, the SQLite catalog is read-only and must mirror the checkpoint;
+            # apps in the checkpoint log are layered on top of it
+            sqlite_catalog = load_sqlite_catalog(
+                latest_apps_dict_ckpt_path.parent / SQLITE_FILENAME,
+                latest_apps_dict_ckpt_path
+            )
+            if sqlite_catalog is None:
+                print_log('SQLite catalog missing or behind the checkpoints; loading them into memory.')
+
+        if sqlite_catalog is not None:
+            self.apps_dict = SqliteAppsDict(sqlite_catalog)
+            CHECKPOINT_LOAD_BYTES.set((latest_apps_dict_ckpt_path.parent / SQLITE_FILENAME).stat().st_size,
+                                      format='sqlite')
+            aggregates = load_aggregates(latest_apps_dict_ckpt_path)
+        elif latest_apps_dict_ckpt_path and latest_apps_dict_ckpt_path.exists():
+            # the memory-mapped columnar catalog, when it mirrors this checkpoint, avoids unpickling it
+            # and keeps only app summaries resident; full records are decoded on demand
+            catalog = load_columnar_catalog(
+                latest_apps_dict_ckpt_path.parent / COLUMNAR_FILENAME,
+                latest_apps_dict_ckpt_path
+            )
+            if catalog is not None:
+                self.apps_dict = ColumnarAppsDict(catalog, self.record_cache_bytes)
+                CHECKPOINT_LOAD_BYTES.set((latest_apps_dict_ckpt_path.parent / COLUMNAR_FILENAME).stat().st_size,
+                                          format='columnar')
+            else:
+                self.apps_dict = self._load_pickle(latest_apps_dict_ckpt_path)
+                CHECKPOINT_LOAD_BYTES.set(latest_apps_dict_ckpt_path.stat().st_size, format='pickle')
+            aggregates = load_aggregates(latest_apps_dict_ckpt_path)
         else:
             print_log('No valid apps_dict checkpoint found.')
 
-        if latest_exc_apps_list_ckpt_path and latest_exc_apps_list_ckpt_path.exists():
-            self.excluded_apps_list = self._load_pickle(latest_exc_apps_list_ckpt_path)
+        # reuse the downloader's aggregates when they match this checkpoint
+        if aggregates is None:
+            if sqlite_catalog is not None:
+                aggregates = CatalogAggregates.from_sqlite(sqlite_catalog)
+            elif catalog is not None:
+                aggregates = CatalogAggregates.from_columnar(catalog)
+            else:
+                aggregates = CatalogAggregates.build(self.apps_dict)
+        self.aggregates = aggregates
+
+        # the excluded / error list checkpoints are only read when the downloader
+        # saved no crawl state along with them
+        crawl_state = None
+        if latest_apps_dict_ckpt_path:
+            crawl_state = load_crawl_state(latest_apps_dict_ckpt_path.parent, ckpt_paths)
+        if crawl_state is None:
+            if not (latest_exc_apps_list_ckpt_path and latest_exc_apps_list_ckpt_path.exists()):
+                print_log('No valid excluded_apps_list checkpoint found.')
+            if not (latest_error_apps_list_ckpt_path and latest_error_apps_list_ckpt_path.exists()):
+                print_log('No valid error_apps_list checkpoint found.')
+            crawl_state = CrawlState(AppIdBitmap(self.apps_dict.keys()), load_id_list(latest_exc_apps_list_ckpt_path),
+                                     load_id_list(latest_error_apps_list_ckpt_path))
+        self.crawl_state = crawl_state
+
+        # apps fetched since the crawler's last snapshot, replayed over all three checkpoints
+        # as the downloader recovers them; a columnar or SQLite apps_dict spills them to disk
+        if has_log:
+            replay_log(log_path, self.apps_dict, self.crawl_state, self.aggregates, repair=False)
+
+        self.summaries = getattr(self.apps_dict, 'summaries', self.apps_dict)
+        self._build_indexes()
+
+        if sqlite_catalog is not None:
+            load_format = 'sqlite'
+        elif catalog is not None:
+            load_format = 'columnar'
         else:
-            print_log('No valid excluded_apps_list checkpoint found.')
+            load_format = 'pickle'
+        CHECKPOINT_LOAD_SECONDS.observe(time.perf_counter() - start, format=load_format)
+        CHECKPOINT_APPS.set(len(self.apps_dict))
 
-        if latest_error_apps_list_ckpt_path and latest_error_apps_list_ckpt_path.exists():
-            self.error_apps_list = self._load_pickle(latest_error_apps_list_ckpt_path)
-        else:
-            print_log('No valid error_apps_list checkpoint found.')
+    def _build_indexes(self) -> None:
+        """
+        Build the in-memory search and facet indexes over the loaded apps_dict.
+        """
+        self._sort_keys = {}
+        self._cards = {}
 
-    def _check_latest_checkpoints(self, checkpoint_folder, apps_dict_filename_prefix,
+        if isinstance(self.apps_dict, ColumnarAppsDict) and not self.apps_dict.changed:
+            self._build_indexes_from_columnar(self.apps_dict.catalog)
+            return
+
+        if isinstance(self.apps_dict, SqliteAppsDict):
+            self._attach_sqlite_indexes(self.apps_dict)
+            return
+
+        # summaries carry every field the indexes need
+        apps = [(app_id, app_data) for app_id, app_data in self.summaries.items() if isinstance(app_data, dict)]
+
+        self.name_index = SearchIndex.build(
+            (app_id, [app_data.get('name')]) for app_id, app_data in apps
+        )
+        self.developer_index = SearchIndex.build(
+            (app_id, app_data.get('developers') or []) for app_id, app_data in apps
+        )
+        self.publisher_index = SearchIndex.build(
+            (app_id, app_data.get('publishers') or []) for app_id, app_data in apps
+        )
+        self.genre_index = FacetIndex.build(
+            (app_id, app_data.get('genres') or []) for app_id, app_data in apps
+        )
+        self.tag_index = FacetIndex.build(
+            (app_id, app_data.get('categories') or []) for app_id, app_data in apps
+        )
+        self.price_table = PriceTable.build(self.summaries)
+
+        type_ids = {}
+        for app_id, app_data in apps:
+            type_ids.setdefault((app_data.get('type') or '').lower(), []).append(app_id)
+        self.type_index = {app_type: array('I', sorted(ids)) for app_type, ids in type_ids.items()}
+
+    def _build_indexes_from_columnar(self, catalog) -> None:
+        """
+        Build the indexes from the catalog's name/developer/publisher blobs and
+        facet columns without decoding any full app record.
+        """
+        app_ids = catalog.column('appid')
+        rows = range(len(catalog))
+
+        self.name_index = SearchIndex.build(
+            (app_ids[i], [catalog.text('name', i)]) for i in rows
+        )
+        self.developer_index = SearchIndex.build(
+            (app_ids[i], catalog.text_list('developers', i)) for i in rows
+        )
+        self.publisher_index = SearchIndex.build(
+            (app_ids[i], catalog.text_list('publishers', i)) for i in rows
+        )
+
+        genres = catalog.facets('genres')
+        self.genre_index = FacetIndex.build(
+            (app_ids[i], [genres[code] for code in catalog.facet_codes('genres', i)]) for i in rows
+        )
+        categories = catalog.facets('categories')
+        self.tag_index = FacetIndex.build(
+            (app_ids[i], [categories[code] for code in catalog.facet_codes('categories', i)]) for i in rows
+        )
+        self.price_table = PriceTable.from_columnar(catalog)
+
+        type_names = [(app_type or '').lower() for app_type in catalog.dictionaries['type']]
+        type_ids = {}
+        for i, code in enumerate(catalog.column('type')):
+            type_ids.setdefault(type_names[code], []).append(app_ids[i])
+        self.type_index = {app_type: array('I', ids) for app_type, ids in type_ids.items()}
+
+    def _attach_sqlite_indexes(self, apps_dict: SqliteAppsDict) -> None:
+        """
+        Answer searches from the SQLite catalog's tables and FTS indexes;
+        only the app type postings and price columns are held in memory.
+        Apps changed since the catalog was written (replayed from the
+        checkpoint log) get small in-memory indexes merged into the answers.
+        """
+        catalog = apps_dict.catalog
+        self.name_index = SqliteNameIndex(catalog)
+        self.developer_index = SqliteTextIndex(catalog, 'developers')
+        self.publisher_index = SqliteTextIndex(catalog, 'publishers')
+        self.genre_index = SqliteFacetIndex(catalog, 'genres')
+        self.tag_index = SqliteFacetIndex(catalog, 'categories')
+        self.price_table = PriceTable.from_sqlite(apps_dict)
+        self.type_index = apps_dict.type_ids()
+
+        if not apps_dict.changed:
+            return
+
+        apps = list(apps_dict.overlay_items())
+        self.name_index = OverlayIndex(self.name_index, SearchIndex.build(
+            (app_id, [app_data.get('name')]) for app_id, app_data in apps
+        ), apps_dict)
+        self.developer_index = OverlayIndex(self.developer_index, SearchIndex.build(
+            (app_id, app_data.get('developers') or []) for app_id, app_data in apps
+        ), apps_dict)
+        self.publisher_index = OverlayIndex(self.publisher_index, SearchIndex.build(
+            (app_id, app_data.get('publishers') or []) for app_id, app_data in apps
+        ), apps_dict)
+        self.genre_index = OverlayIndex(self.genre_index, FacetIndex.build(
+            (app_id, app_data.get('genres') or []) for app_id, app_data in apps
+        ), apps_dict)
+        self.tag_index = OverlayIndex(self.tag_index, FacetIndex.build(
+            (app_id, app_data.get('categories') or []) for app_id, app_data in apps
+        ), apps_dict)
+
+    def _apps_for_ids(self, app_ids: List[int]) -> List[Dict]:
+        return [expand_app(self.apps_dict[app_id]) for app_id in app_ids if app_id in self.apps_dict]
+
+    @staticmethod
+    def _check_latest_checkpoints(checkpoint_folder, apps_dict_filename_prefix,
                                   exc_apps_filename_prefix, error_apps_filename_prefix):
 
         latest_apps_dict_ckpt_path = None
@@ -102,20 +334,21 @@ class SteamDataRetriever:
 
         return latest_apps_dict_ckpt_path, latest_exc_apps_list_ckpt_path, latest_error_apps_list_ckpt_path
 
-    def load_search_category(self, category: str) -> List[Dict[str, Any]]:
+    def load_search_category(self, category: str, search_data_folder: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Load one category of search results, e.g. 'topsellers', from its .pkl.
         """
-        if not self.search_data_folder:
+        folder = Path(search_data_folder).resolve() if search_data_folder else self.search_data_folder
+        if not folder:
             raise ValueError("No search_data_folder specified")
 
         if category not in self.search_categories:
             raise ValueError(f"Unknown category: {category}")
 
         # filename: e.g. "topsellers_20250506.pkl"
-        suffix = self.search_data_folder.name[-8:]
+        suffix = folder.name[-8:]
         fname = f"{category}_{suffix}.pkl"
-        path = self.search_data_folder / fname
+        path = folder / fname
 
         if not path.exists():
             print_log(f"No search results pickle for '{category}': {path}")
@@ -123,9 +356,9 @@ class SteamDataRetriever:
 
         return self._load_pickle(path)
 
-    def load_all_search_results(self) -> Dict[str, List[Dict[str, Any]]]:
+    def load_all_search_results(self, search_data_folder: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
         return {
-            cat: self.load_search_category(cat)
+            cat: self.load_search_category(cat, search_data_folder)
             for cat in self.search_categories
         }
 
@@ -151,9 +384,27 @@ class SteamDataRetriever:
 
         if app_id in self.apps_dict.keys():
                 if self.apps_dict[app_id].get('name'):
-                    return self.apps_dict[app_id]
+                    return expand_app(self.apps_dict[app_id])
         return None
 
+    def get_app_card(self, app_id: int) -> Optional[AppCard]:
+        """
+        Get the home page card for an app, projected once per loaded catalog.
+
+        Args:
+            app_id: The app ID to retrieve
+
+        Returns:
+            AppCard or None if not found
+        """
+        card = self._cards.get(app_id)
+        if card is None:
+            app_data = self.summaries.get(app_id)
+            if not app_data or not app_data.get('name'):
+                return None
+            card = self._cards[app_id] = AppCard.from_app(app_data)
+        return card
+
     def get_apps_by_name(self, search_term: str) -> List[Dict]:
         """
         Search for apps by name.
@@ -164,16 +415,26 @@ class SteamDataRetriever:
         Returns:
             List of app details dictionaries that match the search
         """
-        search_term = search_term.lower()
-        results = []
-
+        return self._apps_for_ids(self.name_index.search(search_term))
 
+    def suggest_apps_by_name(self, prefix: str, limit: int = 10) -> List[Dict]:
+        """
+        Rank app names for type-ahead.
 
-        for app_id, app_data in self.apps_dict.items():
-            if 'name' in app_data and search_term in app_data['name'].lower():
-                results.append(app_data)
+        Args:
+            prefix: What the user has typed so far
+            limit: Maximum number of suggestions
 
-        return results
+        Returns:
+            List of {'appid', 'name'} dictionaries, best match first
+        """
+        with RETRIEVER_QUERY_SECONDS.time(search_type='suggest'):
+            app_ids = self.name_index.prefix_search(prefix, limit)
+        return [
+            {'appid': app_id, 'name': self.summaries[app_id].get('name')}
+            for app_id in app_ids
+            if app_id in self.summaries
+        ]
 
     def filter_apps_by_type(self, app_type: str) -> List[Dict]:
         """
@@ -185,13 +446,7 @@ class SteamDataRetriever:
         Returns:
             List of app details dictionaries of the specified type
         """
-        results = []
-
-        for app_id, app_data in self.apps_dict.items():
-            if 'type' in app_data and app_data['type'].lower() == app_type.lower():
-                results.append(app_data)
-
-        return results
+        return self._apps_for_ids(self.type_index.get(app_type.lower(), []))
 
     def filter_apps_by_price_range(self, min_price: float = 0.0, max_price: float = float('inf')) -> List[Dict]:
         """
@@ -204,16 +459,7 @@ class SteamDataRetriever:
         Returns:
             List of app details dictionaries within the price range
         """
-        results = []
-
-        for app_id, app_data in self.apps_dict.items():
-            if 'price_overview' in app_data:
-                # Price is often stored in cents, convert to dollars
-                price = app_data['price_overview'].get('initial', 0) / 100
-                if min_price <= price <= max_price:
-                    results.append(app_data)
-
-        return results
+        return self._apps_for_ids(self.price_table.filter_range(min_price, max_price).tolist())
 
     def get_apps_with_genre(self, genre: str) -> List[Dict]:
         """
@@ -225,17 +471,7 @@ class SteamDataRetriever:
         Returns:
             List of app details dictionaries within the specified genre
         """
-        genre = genre.lower()
-        results = []
-
-        for app_id, app_data in self.apps_dict.items():
-            if 'genres' in app_data:
-                genres = app_data['genres']
-                for gen in genres:
-                    if 'description' in gen and genre in gen['description'].lower():
-                        results.append(app_data)
-                        break
-        return results
+        return self._apps_for_ids(self.genre_index.lookup(genre))
 
     def get_apps_with_tag(self, tag: str) -> List[Dict]:
         """
@@ -247,18 +483,31 @@ class SteamDataRetriever:
         Returns:
             List of app details dictionaries that have the tag
         """
-        tag = tag.lower()
-        results = []
+        return self._apps_for_ids(self.tag_index.lookup(tag))
 
-        for app_id, app_data in self.apps_dict.items():
-            if 'categories' in app_data:
-                categories = app_data['categories']
-                for category in categories:
-                    if 'description' in category and tag in category['description'].lower():
-                        results.append(app_data)
-                        break
+    def get_apps_with_facets(self, genres: Optional[List[str]] = None, tags: Optional[List[str]] = None,
+                             match: str = 'all') -> List[Dict]:
+        """
+        Get apps matching several genres and/or tags at once.
+
+        Args:
+            genres: Genres to search for
+            tags: Tags to search for
+            match: 'all' for apps matching every genre and tag, 'any' for apps matching at least one
+
+        Returns:
+            List of app details dictionaries that match
+        """
+        postings = [self.genre_index.lookup(genre) for genre in genres or []]
+        postings += [self.tag_index.lookup(tag) for tag in tags or []]
+        if not postings:
+            return []
 
-        return results
+        if match == 'any':
+            app_ids = union_postings(*postings)
+        else:
+            app_ids = intersect_postings(*postings)
+        return self._apps_for_ids(app_ids)
 
     def get_apps_by_developer(self, developer: str) -> List[Dict]:
         """
@@ -270,18 +519,7 @@ class SteamDataRetriever:
         Returns:
             List of app details dictionaries by the developer
         """
-        developer = developer.lower()
-        results = []
-
-        for app_id, app_data in self.apps_dict.items():
-            if 'developers' in app_data:
-                developers = app_data['developers']
-                for dev in developers:
-                    if developer in dev.lower():
-                        results.append(app_data)
-                        break
-
-        return results
+        return self._apps_for_ids(self.developer_index.search(developer))
 
     def get_apps_by_publisher(self, publisher: str) -> List[Dict]:
         """
@@ -293,18 +531,100 @@ class SteamDataRetriever:
         Returns:
             List of app details dictionaries by the publisher
         """
-        publisher = publisher.lower()
-        results = []
+        return self._apps_for_ids(self.publisher_index.search(publisher))
+
+    def search_app_ids(self, search_type: str, term: str) -> List[int]:
+        """
+        Get the ids of the apps matching a search, without loading their details.
+
+        Args:
+            search_type: 'name', 'developer', 'publisher', 'genre' or 'tag'
+            term: The search term
+
+        Returns:
+            Sorted list of matching app IDs
+
+        Raises:
+            ValueError: If the search type is unknown
+        """
+        if search_type == 'name':
+            search = self.name_index.search
+        elif search_type == 'developer':
+            search = self.developer_index.search
+        elif search_type == 'publisher':
+            search = self.publisher_index.search
+        elif search_type == 'genre':
+            search = self.genre_index.lookup
+        elif search_type == 'tag':
+            search = self.tag_index.lookup
+        else:
+            raise ValueError(f'Unknown search type: {search_type}')
+
+        with RETRIEVER_QUERY_SECONDS.time(search_type=search_type):
+            return [app_id for app_id in search(term) if app_id in self.apps_dict]
+
+    def _sort_value(self, sort: str, app_id: int):
+        keys = self._sort_keys.setdefault(sort, {})
+        if app_id not in keys:
+            keys[app_id] = SORT_KEY_FUNCTIONS[sort](self.summaries[app_id])
+        return keys[app_id]
+
+    def query_app_ids(self, predicates: List[Predicate]) -> Tuple[List[int], List[Dict]]:
+        """
+        Get the ids of the apps matching every predicate (see query_planner).
+
+        Args:
+            predicates: Filters from query_planner.parse_query
+
+        Returns:
+            (sorted list of matching app IDs, plan steps)
+        """
+        with RETRIEVER_QUERY_SECONDS.time(search_type='query'):
+            return execute_query(self, predicates)
+
+    def get_results_page(self, app_ids: List[int], page: int = 1, page_size: int = 100, sort: str = 'appid',
+                         descending: bool = False, fields='card') -> Dict:
+        """
+        Sort a result set and return one page of it.
+
+        Only the apps on the requested page are read and projected, so the
+        cost of the response follows the page size rather than the number of
+        matches.
+
+        Args:
+            app_ids: Matching app IDs
+            page: 1-based page number
+            page_size: Apps per page
+            sort: 'appid', 'name', 'release_date' or 'price'; ties are broken by app ID
+            descending: Reverse the sort order
+            fields: 'card', None for full app details, or the field names to keep
+
+        Returns:
+            Dictionary with total, page, page_size, pages and the projected results
+        """
+        if sort == 'appid':
+            ordered = sorted(app_ids, reverse=descending)
+        elif isinstance(self.apps_dict, SqliteAppsDict):
+            # the sort keys are columns of the catalog; read them without decoding any app
+            keys = self.apps_dict.sort_keys(sort, app_ids)
+            ordered = sort_app_ids(app_ids, keys.get, descending)
+        else:
+            ordered = sort_app_ids(app_ids, lambda app_id: self._sort_value(sort, app_id), descending)
 
-        for app_id, app_data in self.apps_dict.items():
-            if 'publishers' in app_data:
-                publishers = app_data['publishers']
-                for pub in publishers:
-                    if publisher in pub.lower():
-                        results.append(app_data)
-                        break
+        # cards and projections of summary fields never need the full record
+        if fields == 'card' or (fields is not None and set(fields) <= set(SUMMARY_FIELDS)):
+            app_for = self.summaries.__getitem__
+        else:
+            app_for = lambda app_id: expand_app(self.apps_dict[app_id])
 
-        return results
+        start, end, pages = page_bounds(len(ordered), page, page_size)
+        return {
+            'total': len(ordered),
+            'page': page,
+            'page_size': page_size,
+            'pages': pages,
+            'results': [project_app(app_for(app_id), fields) for app_id in ordered[start:end]],
+        }
 
     def get_data_stats(self) -> Dict:
         """
@@ -315,8 +635,8 @@ class SteamDataRetriever:
         """
         return {
             'total_apps': len(self.apps_dict),
-            'excluded_apps': len(self.excluded_apps_list),
-            'error_apps': len(self.error_apps_list)
+            'excluded_apps': len(self.crawl_state.excluded),
+            'error_apps': len(self.crawl_state.errors)
         }
 
     def clean_and_save_apps_dict(self) -> int:
@@ -345,8 +665,8 @@ class SteamDataRetriever:
 
         for app_id in to_remove:
             data.pop(app_id, None)
-            if app_id not in self.excluded_apps_list:
-                self.excluded_apps_list.append(app_id)
+            self.crawl_state.fetched.discard(app_id)
+            self.crawl_state.excluded.add(app_id)
 
         # 4) write the cleaned dict back
         with open(apps_ckpt_path, 'wb') as f:
@@ -354,11 +674,131 @@ class SteamDataRetriever:
 
         # 5) update in-memory apps_dict and log
         self.apps_dict = data
+        self.summaries = data
+        self.aggregates = CatalogAggregates.build(data)
+        self._build_indexes()
         print_log(f"clean_and_save_apps_dict: removed {len(to_remove)} entries from {apps_ckpt_path.name}")
 
         return len(to_remove)
 
 
+def signature_paths(ckpt_paths) -> Tuple:
+    """
+    Get the files whose changes should trigger a reload: the latest
+    checkpoints plus the columnar and SQLite catalogs and the checkpoint log
+    next to the apps_dict checkpoint. The crawler appends to the log between
+    snapshots, so its size and mtime change with every fetched app; the log
+    comes last so SharedRetriever can tell log-only changes apart.
+    """
+    apps_dict_path = ckpt_paths[0]
+    if not apps_dict_path:
+        return tuple(ckpt_paths) + (None, None, None)
+    folder = apps_dict_path.parent
+    return tuple(ckpt_paths) + (folder / COLUMNAR_FILENAME, folder / SQLITE_FILENAME, folder / LOG_FILENAME)
+
+
+def checkpoint_signature(ckpt_paths) -> Tuple:
+    """
+    Identify the on-disk state of a set of checkpoint files.
+
+    Args:
+        ckpt_paths: Iterable of checkpoint paths (entries may be None)
+
+    Returns:
+        Tuple of (file name, mtime_ns, size) per path, None for missing files
+    """
+    signature = []
+    for path in ckpt_paths:
+        try:
+            st = os.stat(path) if path else None
+        except OSError:
+            st = None
+        signature.append((path.name, st.st_mtime_ns, st.st_size) if st else None)
+    return tuple(signature)
+
+
+class SharedRetriever:
+    """
+    Thread-safe holder of one SteamDataRetriever snapshot per process.
+
+    The checkpoint folder is re-checked at most every `check_interval` seconds.
+    When the latest checkpoint files change (name, mtime or size) a fresh
+    retriever is loaded and swapped in; requests arriving during the reload
+    keep using the previous snapshot.
+
+    A running crawl grows the checkpoint log with every app, so when only
+    the log changed the reload waits until the snapshot is
+    `log_reload_interval` seconds old; new snapshots are picked up at once.
+    """
+
+    def __init__(self, checkpoint_folder: str = 'checkpoints', check_interval: float = 5.0, backend: str = 'memory',
+                 log_reload_interval: float = 5 * 60):
+        self.checkpoint_folder = checkpoint_folder
+        self.check_interval = check_interval
+        self.backend = backend
+        self.log_reload_interval = log_reload_interval
+
+        self._retriever: Optional[SteamDataRetriever] = None
+        self._last_check = 0.0
+        self._loaded_at = 0.0
+        self._reload_lock = threading.Lock()
+
+    def _latest_signature(self) -> Tuple:
+        folder = Path(self.checkpoint_folder).resolve()
+        ckpt_paths = SteamDataRetriever._check_latest_checkpoints(
+            folder, 'apps_dict', 'excluded_apps_list', 'error_apps_list'
+        )
+        return checkpoint_signature(signature_paths(ckpt_paths))
+
+    def get(self) -> SteamDataRetriever:
+        """
+        Get the current retriever, reloading it first if the checkpoints changed.
+
+        Returns:
+            The shared SteamDataRetriever snapshot
+        """
+        retriever = self._retriever
+        now = time.monotonic()
+
+        if retriever is not None and now - self._last_check < self.check_interval:
+            return retriever
+
+        # only one thread checks/reloads; the others serve the current snapshot
+        blocking = retriever is None
+        if not self._reload_lock.acquire(blocking=blocking):
+            return retriever
+
+        try:
+            if self._retriever is not None and self._retriever is not retriever:
+                return self._retriever
+
+            self._last_check = time.monotonic()
+            if retriever is not None:
+                latest = self._latest_signature()
+                if latest == retriever.version:
+                    return retriever
+                # the log is the last file of the signature
+                if latest[:-1] == retriever.version[:-1] and \
+                        self._last_check - self._loaded_at < self.log_reload_interval:
+                    return retriever
+
+            try:
+                fresh = SteamDataRetriever(checkpoint_folder=self.checkpoint_folder, backend=self.backend)
+            except Exception as e:
+                # e.g. a checkpoint caught half-written; keep serving the old snapshot
+                if retriever is None:
+                    raise
+                print_log(f"Failed to reload checkpoints, keeping previous snapshot: {e}")
+                return retriever
+
+            print_log(f"Loaded checkpoint snapshot: {len(fresh.apps_dict)} apps")
+            self._retriever = fresh
+            self._loaded_at = time.monotonic()
+            return fresh
+        finally:
+            self._reload_lock.release()
+
+
 def test_search():
 
     retriever = SteamDataRetriever("../checkpoints", '../checkpoints/search_results_20250519')
@@ -2,16 +2,30 @@ import os
 import re
 import time
 import pickle
-import requests
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from pyscripts.app_id_bitmap import AppIdBitmap, CrawlState, id_array, load_crawl_state, load_id_list, save_crawl_state
+from pyscripts.app_records import normalize_app, normalize_apps
+from pyscripts.catalog_aggregates import CatalogAggregates, load_aggregates, save_aggregates
+from pyscripts.checkpoint_log import LOG_FILENAME, CheckpointLog, replay_log
+from pyscripts.delta_refresh import load_app_meta, record_fetch, save_app_meta
+from pyscripts.fetch_engine import AppDetailsFetcher
+from pyscripts.http_client import http_get
+from pyscripts.steam_data_downloader import save_sqlite_catalog, throttle_message
+from pyscripts.columnar_catalog import COLUMNAR_FILENAME, write_columnar_catalog
+
 def print_log(*args):
     print(f"[{str(datetime.now())[:-3]}]", *args)
 
 def get_search_results(params):
     url = "https://store.steampowered.com/search/results/"
-    resp = requests.get(url, params=params)
+    try:
+        resp = http_get(url, params=params)
+    except Exception as e:
+        print_log(f"Failed to get search results: {e}")
+        return {"items": []}
     if resp.status_code != 200:
         print_log(f"Failed to get search results: {resp.status_code}")
         return {"items": []}
@@ -22,8 +36,11 @@ def get_search_results(params):
         return {"items": []}
 
 def save_pickle(path: Path, obj):
-    with open(path, 'wb') as f:
+    # write to a temp file and rename so readers never see a half-written pickle
+    tmp_path = Path(str(path) + '.tmp')
+    with open(tmp_path, 'wb') as f:
         pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
 
 def load_pickle(path: Path):
     return pickle.load(open(path, 'rb'))
@@ -33,15 +50,27 @@ def save_checkpoints(folder: Path,
                      exc_prefix: str,
                      err_prefix: str,
                      apps_dict: dict,
-                     excluded_list: list,
-                     error_list: list):
+                     crawl_state: CrawlState,
+                     aggregates: CatalogAggregates = None):
     folder.mkdir(parents=True, exist_ok=True)
     save_pickle(folder / f"{apps_prefix}-ckpt-fin.p", apps_dict)
     print_log(f"Checkpoint saved: {apps_prefix}")
-    save_pickle(folder / f"{exc_prefix}-ckpt-fin.p", excluded_list)
+    if aggregates is not None:
+        save_aggregates(folder / f"{apps_prefix}-ckpt-fin.p", aggregates)
+    save_pickle(folder / f"{exc_prefix}-ckpt-fin.p", id_array(crawl_state.excluded))
     print_log(f"Checkpoint saved: {exc_prefix}")
-    save_pickle(folder / f"{err_prefix}-ckpt-fin.p", error_list)
+    save_pickle(folder / f"{err_prefix}-ckpt-fin.p", id_array(crawl_state.errors))
     print_log(f"Checkpoint saved: {err_prefix}")
+    save_crawl_state(folder, [folder / f"{prefix}-ckpt-fin.p" for prefix in (apps_prefix, exc_prefix, err_prefix)],
+                     crawl_state)
+
+def save_columnar_catalog(folder: Path, apps_prefix: str, apps_dict: dict):
+    try:
+        count = write_columnar_catalog(folder / COLUMNAR_FILENAME, apps_dict, folder / f"{apps_prefix}-ckpt-fin.p")
+    except OSError as e:
+        print_log(f"Failed to write columnar catalog: {e}")
+        return
+    print_log(f"Columnar catalog saved: {count} apps")
 
 def check_latest_checkpoints(folder: Path,
                              apps_prefix: str,
@@ -58,14 +87,74 @@ EXCLUDED_APPS_PREFIX  = 'excluded_apps_list'
 ERROR_APPS_PREFIX     = 'error_apps_list'
 CHECKPOINT_FOLDER     = Path(__file__).resolve().parents[1] / 'checkpoints'
 
-def download_trend(progress_callback=None, stop_event=None, app_details=None, appid=None):
+TREND_CATEGORIES = [
+    {'filter':'topsellers'},
+    {'filter':'globaltopsellers'},
+    {'filter':'popularnew'},
+    {'filter':'popularcommingsoon'},
+    {'filter':'', 'specials':1}
+]
+TREND_PAGES           = list(range(1, 5))
+DEFAULT_SEARCH_PARAMS = {'hidef2p':1, 'json':1, 'page':1, 'filter':'topsellers'}
+APPDETAILS_PARAMS     = {"cc": "US", "l": "english"}
+
+# trending apps fetched more recently than this (seconds) are not fetched again
+FRESHNESS_WINDOW      = 24 * 60 * 60
+SEARCH_WORKERS        = 8
+
+def category_name(update):
+    return update['filter'] or 'specials'
+
+def fetch_search_pages(categories, pages, stop_event=None, workers=SEARCH_WORKERS):
+    """
+    Fetch every page of every trending category concurrently.
+
+    Returns {category name: non-bundle items in page order, each with an 'appid' (None if unknown)}
+    """
+    jobs = [(update, page) for update in categories for page in pages]
+
+    def fetch(job):
+        update, page = job
+        if stop_event and stop_event.is_set():
+            return {"items": []}
+        params = DEFAULT_SEARCH_PARAMS.copy()
+        params.update(update)
+        params['page'] = page
+        return get_search_results(params)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        responses = list(pool.map(fetch, jobs))
+
+    items_by_category = {}
+    for (update, page), sr in zip(jobs, responses):
+        raw_items = sr.get('items', [])
+
+        non_bundle_items = [
+            item for item in raw_items
+            if 'bundles' not in item.get('logo','')
+        ]
+        print_log(
+            f"Page {page} ({update['filter']}): "
+            f"{len(non_bundle_items)} non-bundle of {len(raw_items)} total"
+        )
+
+        # extract appid
+        for item in non_bundle_items:
+            m = re.search(r"steam/\w+/(\d+)", item.get('logo',''))
+            item['appid'] = int(m.group(1)) if m else None
+
+        items_by_category.setdefault(category_name(update), []).extend(non_bundle_items)
+
+    return items_by_category
+
+def download_trend(progress_callback=None, stop_event=None, app_details=None, appid=None, workers=4):
 
     def get_app_details(appid):
         while (True):
             endpoint = "https://store.steampowered.com/api/appdetails/"
             params = {"appids": appid, "cc": "US", "l": "english"}
 
-            appdetails_req = requests.get(endpoint, params=params)
+            appdetails_req = http_get(endpoint, params=params)
 
             if appdetails_req.status_code == 200:
                 appdetails = appdetails_req.json()
@@ -105,8 +194,6 @@ def download_trend(progress_callback=None, stop_event=None, app_details=None, ap
 
     print_log('Checkpoint folder:', CHECKPOINT_FOLDER)
     apps_dict     = {}
-    excluded_apps = []
-    error_apps    = []
 
     # load previous checkpoints
     ckpt_paths = check_latest_checkpoints(
@@ -121,123 +208,138 @@ def download_trend(progress_callback=None, stop_event=None, app_details=None, ap
             apps_dict[aid] = payload["data"]
             print_log(f"Migrated app {aid} to new format")
 
-    for label, path in zip(['apps_dict','excluded','error'], ckpt_paths):
-        if path:
-            loaded = load_pickle(path)
-            print_log(f"Loaded {label} ({len(loaded)} items): {path}")
-            if label == 'apps_dict':   apps_dict     = loaded
-            elif label == 'excluded':  excluded_apps = loaded
-            else:                      error_apps    = loaded
+    if ckpt_paths[0]:
+        apps_dict = load_pickle(ckpt_paths[0])
+        print_log(f"Loaded apps_dict ({len(apps_dict)} items): {ckpt_paths[0]}")
+
+    aggregates = load_aggregates(ckpt_paths[0]) if ckpt_paths[0] else None
+    if aggregates is None:
+        aggregates = CatalogAggregates.build(apps_dict)
+
+    # the excluded / error lists are only read when no crawl state was saved with them
+    crawl_state = load_crawl_state(CHECKPOINT_FOLDER, ckpt_paths)
+    if crawl_state is None:
+        crawl_state = CrawlState(AppIdBitmap(apps_dict.keys()), load_id_list(ckpt_paths[1]),
+                                 load_id_list(ckpt_paths[2]))
+
+    app_meta = load_app_meta(CHECKPOINT_FOLDER)
+
+    # apps the full-catalog crawler logged since its last snapshot
+    replayed = replay_log(CHECKPOINT_FOLDER / LOG_FILENAME, apps_dict, crawl_state, aggregates, app_meta=app_meta)
+    if replayed:
+        print_log(f"Replayed {replayed} records from checkpoint log")
+
+    # repeated values of the loaded and fetched records, shared between them (see normalize_app)
+    interned = {}
+    normalize_apps(apps_dict, interned)
 
     execute_time  = datetime.now().strftime('%Y%m%d')
     search_folder = CHECKPOINT_FOLDER / 'searchresults' / f'search_results_{execute_time}'
     search_folder.mkdir(parents=True, exist_ok=True)
 
-    params_list = [
-        {'filter':'topsellers'},
-        {'filter':'globaltopsellers'},
-        {'filter':'popularnew'},
-        {'filter':'popularcommingsoon'},
-        {'filter':'', 'specials':1}
-    ]
-    page_list      = list(range(1, 5))
-    default_params = {'hidef2p':1, 'json':1, 'page':1, 'filter':'topsellers'}
-
-    total = 500
+    total = 0
     done = 0
 
     if progress_callback:
         progress_callback(total, done, "starting")
 
-    for update in params_list:
-
-        if stop_event and stop_event.is_set():
-            return
-
-        date_str = execute_time
-        name     = update['filter'] or 'specials'
-        filename = f"{name}_{date_str}.pkl"
-        out_path = search_folder / filename
-        if out_path.exists():
-            if progress_callback:
-                done += 100
-                progress_callback(total, done, "")
+    categories = []
+    for update in TREND_CATEGORIES:
+        filename = f"{category_name(update)}_{execute_time}.pkl"
+        if (search_folder / filename).exists():
             print_log(f"File exists, skipping: {filename}")
             continue
+        categories.append(update)
 
-        items_all = []
-        for page in page_list:
-
-            if stop_event and stop_event.is_set():
-                return
-
-            params = default_params.copy()
-            params.update(update)
-            params['page'] = page
+    if not categories:
+        return
 
-            sr = get_search_results(params)
-            raw_items = sr.get('items', [])
+    items_by_category = fetch_search_pages(categories, TREND_PAGES, stop_event)
 
-            non_bundle_items = [
-                item for item in raw_items
-                if 'bundles' not in item.get('logo','')
-            ]
-            print_log(
-                f"Page {page} ({update['filter']}): "
-                f"{len(non_bundle_items)} non-bundle of {len(raw_items)} total"
-            )
+    if stop_event and stop_event.is_set():
+        return
 
-            # extract appid
-            for item in non_bundle_items:
-                m = re.search(r"steam/\w+/(\d+)", item.get('logo',''))
-                item['appid'] = int(m.group(1)) if m else None
+    # the same app often trends in several categories; fetch it once, and
+    # not at all if a recent fetch is already in the catalog
+    trending_ids = list(dict.fromkeys(
+        item['appid'] for items in items_by_category.values() for item in items if item['appid']
+    ))
+    fresh_after = time.time() - FRESHNESS_WINDOW
+    to_fetch = [aid for aid in trending_ids
+                if aid not in apps_dict or app_meta.get(aid, (0.0, None))[0] <= fresh_after]
+    print_log(f"{len(trending_ids)} trending apps, {len(trending_ids) - len(to_fetch)} fetched recently, "
+              f"{len(to_fetch)} to fetch")
 
-            # get details only for valid appids
-            for item in non_bundle_items:
+    total = len(to_fetch)
 
-                if stop_event and stop_event.is_set():
-                    return
+    if progress_callback:
+        progress_callback(total, done, f"fetching details for {total} apps")
 
-                aid = item['appid']
-                if not aid:
-                    continue
+    def on_throttle(aid, status, pause):
+        message = throttle_message(aid, status, pause)
+        print_log(message)
+        if progress_callback:
+            progress_callback(total, done, message)
+
+    fetcher = AppDetailsFetcher(workers=workers, params=APPDETAILS_PARAMS, name='trend')
+
+    for result in fetcher.fetch_all(to_fetch, stop_event, on_throttle):
+        aid = result.appid
+        done += 1
+
+        details = None
+        if result.error is None and result.status == 200 and isinstance(result.payload, dict):
+            details = result.payload.get(str(aid))
+
+        if details is None:
+            print_log(f"Error in App Id: {aid} (status {result.status})")
+        elif details.get('success'):
+            print_log(f"{'Updated' if aid in apps_dict else 'Added'} app {aid}")
+            app_data = normalize_app(details["data"], interned)
+            aggregates.replace_app(apps_dict.get(aid), app_data)
+            apps_dict[aid] = app_data
+            crawl_state.fetched.add(aid)
+            record_fetch(app_meta, aid, app_data)
+        elif crawl_state.excluded.add(aid):
+            print_log(f"Excluded app {aid}")
 
-                details = get_app_details(aid)
+        if progress_callback:
+            progress_callback(total, done, f"Added App ID: {aid}")
 
-                if details and details['success'] == True:
-                    apps_dict[aid] = details["data"]
-                    print_log(f"{'Added' if aid not in apps_dict else 'Updated'} app {aid}")
-                else:
-                    if aid not in excluded_apps:
-                        excluded_apps.append(aid)
-                        print_log(f"Excluded app {aid}")
+    if progress_callback:
+        progress_callback(total, done, "finalizing")
 
-                if progress_callback:
-                    done += 1
-                    progress_callback(total, done, f"Added App ID: {aid}")
+    # keep what was fetched even when stopped; a resumed run reuses it
+    save_checkpoints(
+        CHECKPOINT_FOLDER,
+        APPS_DICT_PREFIX,
+        EXCLUDED_APPS_PREFIX,
+        ERROR_APPS_PREFIX,
+        apps_dict,
+        crawl_state,
+        aggregates
+    )
+    save_app_meta(CHECKPOINT_FOLDER, app_meta)
 
-            items_all.extend(non_bundle_items)
+    # the replayed crawl log is in the snapshot now; left in place it would be replayed again
+    log = CheckpointLog(CHECKPOINT_FOLDER / LOG_FILENAME)
+    log.truncate()
+    log.close()
 
-        if progress_callback:
-            progress_callback(total, done, "finalizing")
+    if stop_event and stop_event.is_set():
+        return
 
-        print_log(f"[DEBUG] {name}: would write {len(items_all)} items to {out_path}")
+    for update in categories:
+        filename = f"{category_name(update)}_{execute_time}.pkl"
+        items_all = items_by_category.get(category_name(update), [])
 
         # save raw, filtered search results
-        with open(out_path, 'wb') as f:
+        with open(search_folder / filename, 'wb') as f:
             pickle.dump(items_all, f)
-        print_log(f"Saved search results: {filename}")
-
-        # checkpoint
-        save_checkpoints(
-            CHECKPOINT_FOLDER,
-            APPS_DICT_PREFIX,
-            EXCLUDED_APPS_PREFIX,
-            ERROR_APPS_PREFIX,
-            apps_dict,
-            excluded_apps,
-            error_apps
-        )
+        print_log(f"Saved search results: {filename} ({len(items_all)} items)")
+
+    save_columnar_catalog(CHECKPOINT_FOLDER, APPS_DICT_PREFIX, apps_dict)
+    save_sqlite_catalog(CHECKPOINT_FOLDER, APPS_DICT_PREFIX, apps_dict)
 
 if __name__ == '__main__':
     print(os.path.exists('../checkpoints/searchresults/search_results_20250519'))
@@ -0,0 +1,245 @@
+import random
+import pickle
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from pyscripts.app_id_bitmap import CrawlState
+from pyscripts.catalog_aggregates import CatalogAggregates
+from pyscripts.steam_data_downloader import save_checkpoints, save_columnar_catalog
+
+# (id, description, relative frequency) roughly as they occur across the Steam catalog
+GENRE_WEIGHTS = [
+    ('23', 'Indie', 0.62),
+    ('1', 'Action', 0.40),
+    ('4', 'Casual', 0.38),
+    ('25', 'Adventure', 0.37),
+    ('28', 'Simulation', 0.19),
+    ('2', 'Strategy', 0.18),
+    ('3', 'RPG', 0.16),
+    ('70', 'Early Access', 0.10),
+    ('37', 'Free to Play', 0.07),
+    ('18', 'Sports', 0.04),
+    ('9', 'Racing', 0.04),
+    ('29', 'Massively Multiplayer', 0.02),
+]
+
+CATEGORY_WEIGHTS = [
+    (2, 'Single-player', 0.92),
+    (62, 'Family Sharing', 0.70),
+    (22, 'Steam Achievements', 0.48),
+    (23, 'Steam Cloud', 0.28),
+    (28, 'Full controller support', 0.20),
+    (1, 'Multi-player', 0.18),
+    (18, 'Partial Controller Support', 0.12),
+    (29, 'Steam Trading Cards', 0.10),
+    (49, 'PvP', 0.09),
+    (9, 'Co-op', 0.08),
+    (36, 'Online PvP', 0.07),
+    (38, 'Online Co-op', 0.06),
+    (44, 'Remote Play Together', 0.06),
+    (41, 'Remote Play on TV', 0.04),
+]
+
+# (app type, share of the catalog)
+TYPE_WEIGHTS = [('game', 0.68), ('dlc', 0.22), ('demo', 0.05), ('music', 0.03), ('video', 0.02)]
+
+# initial prices in cents and how often they occur among paid apps
+PRICE_POINTS = [(99, 0.10), (199, 0.08), (299, 0.07), (499, 0.18), (799, 0.06), (999, 0.16), (1499, 0.12),
+                (1999, 0.10), (2499, 0.04), (2999, 0.04), (3999, 0.02), (5999, 0.02), (6999, 0.01)]
+
+SEARCH_CATEGORIES = ['topsellers', 'globaltopsellers', 'popularnew', 'popularcommingsoon', 'specials']
+
+_WORDS = (
+    'star dew valley gun fire reborn dark souls hollow knight portal half life counter strike terra ria space '
+    'craft farm sim city racing legend quest hero shadow tactics dungeon crawler pixel rogue zombie survival '
+    'island kingdom empire war frontier galaxy ocean night neon cyber dragon tales saga chronicles arena '
+    'puzzle tower defense idle clicker detective mystery horror forest castle planet robot ninja samurai'
+).split()
+
+_LOREM = (
+    'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore et '
+    'dolore magna aliqua ut enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip'
+).split()
+
+_MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+def parse_weights(value: Optional[str], table: Sequence[Tuple[Any, str, float]]) -> Optional[Dict[str, float]]:
+    """
+    Parse "Indie=0.6,Action=0.3"-style overrides for the genre or category frequencies.
+
+    Args:
+        value: Comma separated name=probability pairs
+        table: GENRE_WEIGHTS or CATEGORY_WEIGHTS, whose descriptions are the valid names
+
+    Raises:
+        ValueError: If an entry is not name=number or names an unknown genre/category
+    """
+    if not value:
+        return None
+    known = {description for _, description, _ in table}
+    weights = {}
+    for entry in value.split(','):
+        name, sep, weight = entry.partition('=')
+        name = name.strip()
+        if not sep:
+            raise ValueError(f'Expected name=weight, got {entry!r}')
+        if name not in known:
+            raise ValueError(f'Unknown name {name!r}; expected one of {", ".join(sorted(known))}')
+        weights[name] = float(weight)
+    return weights
+
+
+def _apply_overrides(table: Sequence[Tuple[Any, str, float]], overrides: Optional[Dict[str, float]]):
+    if not overrides:
+        return list(table)
+    return [(facet_id, description, overrides.get(description, weight)) for facet_id, description, weight in table]
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return ' '.join(rng.choice(_LOREM) for _ in range(words))
+
+
+def _html(rng: random.Random, size: int) -> str:
+    # appdetails descriptions are HTML paragraphs with the odd image and list
+    parts = []
+    length = 0
+    while length < size:
+        paragraph = f'<p>{_text(rng, rng.randint(20, 60))}</p>'
+        if rng.random() < 0.2:
+            paragraph += '<img src="https://shared.akamai.steamstatic.com/store_item_assets/steam/apps/0/extras/x.gif">'
+        parts.append(paragraph)
+        length += len(paragraph)
+    return '<br>'.join(parts)
+
+
+def _pick(rng: random.Random, weighted):
+    return rng.choices([item for item, _ in weighted], weights=[weight for _, weight in weighted])[0]
+
+
+def generate_app(rng: random.Random, appid: int, genres, categories, text_scale: float = 1.0) -> Dict:
+    """
+    Build one synthetic appdetails payload with the fields and rough sizes of a real one.
+    """
+    name = ' '.join(rng.choice(_WORDS).title() for _ in range(rng.randint(1, 4)))
+    developer = rng.choice([f'{rng.choice(_WORDS).title()} Studios', f'{rng.choice(_WORDS).title()} Games',
+                            f'Indie Dev {rng.randint(1, 5000)}'])
+    publisher = developer if rng.random() < 0.6 else f'{rng.choice(_WORDS).title()} Publishing'
+
+    app_genres = [{'id': genre_id, 'description': description}
+                  for genre_id, description, weight in genres if rng.random() < weight]
+    if not app_genres:
+        genre_id, description, _ = genres[0]
+        app_genres = [{'id': genre_id, 'description': description}]
+    app_categories = [{'id': category_id, 'description': description}
+                      for category_id, description, weight in categories if rng.random() < weight]
+
+    is_free = rng.random() < 0.12
+    base = f'https://shared.akamai.steamstatic.com/store_item_assets/steam/apps/{appid}'
+
+    app = {
+        'type': _pick(rng, TYPE_WEIGHTS),
+        'name': name,
+        'steam_appid': appid,
+        'required_age': 0,
+        'is_free': is_free,
+        'detailed_description': _html(rng, int(rng.randint(1500, 6000) * text_scale)),
+        'about_the_game': _html(rng, int(rng.randint(1000, 4000) * text_scale)),
+        'short_description': _text(rng, int(rng.randint(15, 40) * text_scale)),
+        'supported_languages': 'English<strong>*</strong>, French, German, Spanish - Spain',
+        'header_image': f'{base}/header.jpg',
+        'capsule_image': f'{base}/capsule_231x87.jpg',
+        'website': None,
+        'pc_requirements': {
+            'minimum': _html(rng, int(rng.randint(200, 800) * text_scale)),
+            'recommended': _html(rng, int(rng.randint(200, 800) * text_scale)),
+        },
+        'developers': [developer],
+        'publishers': [publisher],
+        'platforms': {'windows': True, 'mac': rng.random() < 0.2, 'linux': rng.random() < 0.15},
+        'categories': app_categories,
+        'genres': app_genres,
+        'screenshots': [
+            {'id': i, 'path_thumbnail': f'{base}/ss_{i}.600x338.jpg', 'path_full': f'{base}/ss_{i}.1920x1080.jpg'}
+            for i in range(rng.randint(3, 12))
+        ],
+        'release_date': {
+            'coming_soon': False,
+            'date': f'{rng.randint(1, 28)} {rng.choice(_MONTHS)}, {rng.randint(2006, 2025)}',
+        },
+        'support_info': {'url': '', 'email': ''},
+        'background': f'{base}/page_bg_generated_v6b.jpg',
+        'content_descriptors': {'ids': [], 'notes': None},
+    }
+
+    if not is_free and rng.random() < 0.92:
+        initial = _pick(rng, PRICE_POINTS)
+        discount = rng.choice([0, 0, 0, 0, 10, 20, 25, 33, 50, 75, 90])
+        final = initial * (100 - discount) // 100
+        app['price_overview'] = {
+            'currency': 'USD',
+            'initial': initial,
+            'final': final,
+            'discount_percent': discount,
+            'initial_formatted': f'${initial / 100:.2f}' if discount else '',
+            'final_formatted': f'${final / 100:.2f}',
+        }
+
+    return app
+
+
+def generate_apps_dict(count: int, seed: int = 0, genre_weights: Optional[Dict[str, float]] = None,
+                       category_weights: Optional[Dict[str, float]] = None, text_scale: float = 1.0) -> Dict[int, Dict]:
+    """
+    Generate a reproducible synthetic catalog.
+
+    Args:
+        count: Number of apps
+        seed: Random seed; the same arguments always give the same catalog
+        genre_weights: Genre description -> probability an app has it, overriding GENRE_WEIGHTS
+        category_weights: Category description -> probability, overriding CATEGORY_WEIGHTS
+        text_scale: Multiplier for the description and requirement text sizes
+
+    Returns:
+        App ID -> appdetails dictionary, with ids spaced like Steam's (multiples of 10)
+    """
+    rng = random.Random(seed)
+    genres = _apply_overrides(GENRE_WEIGHTS, genre_weights)
+    categories = _apply_overrides(CATEGORY_WEIGHTS, category_weights)
+
+    return {
+        appid: generate_app(rng, appid, genres, categories, text_scale)
+        for appid in range(10, 10 * (count + 1), 10)
+    }
+
+
+def write_synthetic_checkpoints(checkpoint_folder: Path, apps_dict: Dict[int, Dict], columnar: bool = False,
+                                search_results: bool = True, seed: int = 0) -> None:
+    """
+    Write a catalog as checkpoints the retriever and app load like real ones.
+
+    Args:
+        checkpoint_folder: Destination, created if missing
+        apps_dict: Catalog, e.g. from generate_apps_dict
+        columnar: Also write the columnar catalog
+        search_results: Also write a set of trending search results for the home page
+        seed: Random seed for picking the trending apps
+    """
+    checkpoint_folder = Path(checkpoint_folder)
+    save_checkpoints(checkpoint_folder, 'apps_dict', 'excluded_apps_list', 'error_apps_list',
+                     apps_dict, CrawlState.build(apps_dict, [], []), aggregates=CatalogAggregates.build(apps_dict))
+
+    if columnar:
+        save_columnar_catalog(checkpoint_folder, 'apps_dict', apps_dict)
+
+    if search_results:
+        rng = random.Random(seed)
+        app_ids = list(apps_dict)
+        search_folder = checkpoint_folder / 'searchresults' / 'search_results_20250101'
+        search_folder.mkdir(parents=True, exist_ok=True)
+        for category in SEARCH_CATEGORIES:
+            items = [{'appid': appid, 'name': apps_dict[appid]['name'],
+                      'logo': f'https://shared.akamai.steamstatic.com/store_item_assets/steam/apps/{appid}/capsule_sm_120.jpg'}
+                     for appid in rng.sample(app_ids, min(50, len(app_ids)))]
+            with open(search_folder / f'{category}_20250101.pkl', 'wb') as handle:
+                pickle.dump(items, handle, protocol=pickle.HIGHEST_PROTOCOL)
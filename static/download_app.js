@@ -28,9 +28,12 @@ document.addEventListener('DOMContentLoaded', () => {
   let currentDone   = 0;
 
   const SEC_PER_ITEM = 300 / 200;
+  // forward mode (and shards for mode=sharded) from the page URL
+  const query = window.location.search;
 
   function startDownload() {
-    fetch('/api/download_app_data', { method: 'POST' })
+    const url = `/api/download_app_data${query}`;
+    fetch(url, { method: 'POST' })
       .catch(err => { eta.innerText = err.message; });
   }
 
@@ -147,6 +147,9 @@ function handleMenuAction(action) {
     case 'game-data':
       window.location.href = '/download_app';
       break;
+    case 'refresh-data':
+      window.location.href = '/download_app?mode=delta';
+      break;
     case 'trending-data':
       window.location.href = '/download_trend';
       break;
@@ -1,4 +1,4 @@
-function drawPriceCharts(priceBuckets) {
+function drawPriceCharts(priceBuckets, labels) {
 
   Chart.register(ChartDataLabels);
 
@@ -8,7 +8,10 @@ function drawPriceCharts(priceBuckets) {
   document.getElementById('priceHistogramChart').height = 600;
   document.getElementById('pricePieChart').height = 600;
 
-  const orderedLabels = ["Free", "$0–5", "$5–10", "$10–20", "$20–30", "$30–50", "$50–70", "$70+"];
+  // custom bins (?bins=) pass their own labels in order
+  const orderedLabels = labels && labels.length
+    ? labels
+    : ["Free", "$0–5", "$5–10", "$10–20", "$20–30", "$30–50", "$50–70", "$70+"];
   const orderedData = orderedLabels.map(label => priceBuckets[label] || 0);
 
 
@@ -1,7 +1,11 @@
 let currentSearchResults = [];
 let currentSearchQuery   = '';
 let currentSearchType    = '';
+let currentSort          = 'appid';
+let currentOrder         = 'asc';
 let currentPage          = 1;
+let currentTotal         = 0;
+let currentTotalPages    = 0;
 const pageSize           = 100;
 
 document.addEventListener('DOMContentLoaded', () => {
@@ -11,6 +15,8 @@ document.addEventListener('DOMContentLoaded', () => {
 
   currentSearchQuery = q;
   currentSearchType  = params.get('type') || 'default';
+  currentSort        = params.get('sort') || 'appid';
+  currentOrder       = params.get('order') || 'asc';
   currentPage        = parseInt(params.get('page')) || 1;
 
   const typeField = document.getElementById('search-type');
@@ -25,9 +31,14 @@ function fetchResults() {
   errors.innerHTML = '';
   results.innerHTML = '<div class="loading">Searching…</div>';
 
+  // the server sorts and slices; only the requested page is sent back
   const params = new URLSearchParams();
-  params.append('q',    currentSearchQuery);
-  params.append('type', currentSearchType);
+  params.append('q',         currentSearchQuery);
+  params.append('type',      currentSearchType);
+  params.append('page',      currentPage);
+  params.append('page_size', pageSize);
+  params.append('sort',      currentSort);
+  params.append('order',     currentOrder);
 
   fetch(`/api/search_app?${params}`)
     .then(r => r.json())
@@ -35,18 +46,23 @@ function fetchResults() {
       results.innerHTML = '';
       if (data.error) return showError(data.error);
 
-      currentSearchResults = Array.isArray(data) ? data : [data];
+      if (Array.isArray(data.results)) {
+        currentSearchResults = data.results;
+        currentTotal         = data.total;
+        currentTotalPages    = data.pages;
+      } else {
+        // app-id lookups return a single app
+        currentSearchResults = [data];
+        currentTotal         = 1;
+        currentTotalPages    = 1;
+      }
       renderPage();
     })
     .catch(e => showError(`Search error: ${e.message}`));
 }
 
 function renderPage() {
-  const start = (currentPage - 1) * pageSize;
-  const end   = start + pageSize;
-  const pageItems = currentSearchResults.slice(start, end);
-
-  displayResults(pageItems);
+  displayResults(currentSearchResults);
   renderPaginationControls();
 }
 
@@ -56,8 +72,8 @@ function renderPaginationControls() {
     if (!container) return;
 
     container.innerHTML = '';
-    const total      = currentSearchResults.length;
-    const totalPages = Math.ceil(total / pageSize);
+    const total      = currentTotal;
+    const totalPages = currentTotalPages;
     if (totalPages <= 1) return;
 
     // Prev
@@ -67,7 +83,7 @@ function renderPaginationControls() {
     prev.addEventListener('click', () => {
       currentPage--;
       updateURL();
-      renderPage();
+      fetchResults();
     });
     container.appendChild(prev);
 
@@ -83,7 +99,7 @@ function renderPaginationControls() {
     next.addEventListener('click', () => {
       currentPage++;
       updateURL();
-      renderPage();
+      fetchResults();
     });
     container.appendChild(next);
   });
@@ -94,6 +110,8 @@ function updateURL() {
     q:    currentSearchQuery,
     type: currentSearchType
   });
+  if (currentSort !== 'appid') params.set('sort', currentSort);
+  if (currentOrder !== 'asc') params.set('order', currentOrder);
   if (currentPage > 1) params.set('page', currentPage);
   window.history.replaceState({}, '', `?${params.toString()}`);
 }
@@ -106,9 +124,9 @@ function displayResults(games) {
   }
 
   let html = `<div class="section-title">
-                Search Results (${currentSearchResults.length}) 
-                – Showing ${Math.min((currentPage-1)*pageSize+1, currentSearchResults.length)} 
-                to ${Math.min(currentPage*pageSize, currentSearchResults.length)}
+                Search Results (${currentTotal}) 
+                – Showing ${Math.min((currentPage-1)*pageSize+1, currentTotal)} 
+                to ${Math.min((currentPage-1)*pageSize+games.length, currentTotal)}
               </div>`;
 
   games.forEach(game => {
@@ -125,7 +143,7 @@ function displayResults(games) {
     const isFree          = game.is_free || false;
     const titleText       = game.name || 'Unknown Game';
     const screenshot      = game.screenshots?.[0]?.path_full || game.header_image;
-    const shortDesc       = game.short_description || game.about_the_game || '';
+    const shortDesc       = game.short_description || '';
 
     const tagsHtml = [
       ...categories.map(c => `<span class="steam-tag category-tag">${c.description}</span>`),
@@ -0,0 +1,110 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from pyscripts.fetch_engine import AppDetailsFetcher, RateLimiter
+
+THROTTLE_PAUSE = 0.3
+FORBIDDEN_PAUSE = 0.5
+
+
+class StubSteamHandler(BaseHTTPRequestHandler):
+    """
+    appdetails stand-in: each app id is answered with the statuses scripted
+    for it, in order, then 200 with a minimal record.
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        appid = int(parse_qs(urlsplit(self.path).query)['appids'][0])
+        with self.server.lock:
+            script = self.server.scripts.get(appid)
+            status = script.pop(0) if script else 200
+            self.server.requests.append((time.monotonic(), appid, status))
+
+        if status != 200:
+            self.send_response(status)
+            if status == 429:
+                # would make urllib3 retry the request itself if it respected the header
+                self.send_header('Retry-After', '1')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = json.dumps({str(appid): {'success': True, 'data': {'name': f'App {appid}'}}}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FetchEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubSteamHandler)
+        self.server.lock = threading.Lock()
+        self.server.scripts = {}
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/api/appdetails'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def fetch(self, appids, workers=1, ceiling=20.0):
+        limiter = RateLimiter(ceiling=ceiling, capacity=1, min_rate=1, throttle_pause=THROTTLE_PAUSE,
+                              forbidden_pause=FORBIDDEN_PAUSE, name='test')
+        fetcher = AppDetailsFetcher(workers=workers, limiter=limiter, url=self.url, timeout=5, name='test')
+        throttles = []
+        results = list(fetcher.fetch_all(appids, on_throttle=lambda *args: throttles.append(args)))
+        return results, throttles, limiter
+
+    def test_results_are_paced_by_the_limiter(self):
+        results, throttles, _ = self.fetch(range(1, 11), ceiling=20.0)
+
+        self.assertEqual([result.appid for result in results], list(range(1, 11)))
+        self.assertTrue(all(result.status == 200 and result.error is None for result in results))
+        self.assertEqual(results[0].payload, {'1': {'success': True, 'data': {'name': 'App 1'}}})
+        self.assertEqual(throttles, [])
+
+        # one token of burst, then 20 per second
+        sent = [at for at, _, _ in self.server.requests]
+        self.assertGreaterEqual(sent[-1] - sent[0], 9 / 20 * 0.9)
+
+    def test_throttled_apps_are_requeued_after_the_pause(self):
+        self.server.scripts = {2: [429], 4: [403]}
+        results, throttles, limiter = self.fetch([1, 2, 3, 4, 5])
+
+        # 429/403 never reach the caller; a re-queued app goes back to the front
+        self.assertEqual([result.appid for result in results], [1, 2, 3, 4, 5])
+        self.assertTrue(all(result.status == 200 for result in results))
+        self.assertEqual([(appid, status) for appid, status, _ in throttles], [(2, 429), (4, 403)])
+        self.assertEqual(throttles[0][2], THROTTLE_PAUSE)
+        self.assertEqual(throttles[1][2], FORBIDDEN_PAUSE)
+
+        # one request per throttled response: the HTTP client leaves 429 and 403 to the limiter
+        requests = [(appid, status) for _, appid, status in self.server.requests]
+        self.assertEqual(requests, [(1, 200), (2, 429), (2, 200), (3, 200), (4, 403), (4, 200), (5, 200)])
+
+        sent = {(appid, status): at for at, appid, status in self.server.requests}
+        self.assertGreaterEqual(sent[2, 200] - sent[2, 429], THROTTLE_PAUSE)
+        self.assertGreaterEqual(sent[4, 200] - sent[4, 403], FORBIDDEN_PAUSE)
+        self.assertLess(limiter.rate, limiter.ceiling)
+
+    def test_other_statuses_are_yielded_once(self):
+        self.server.scripts = {3: [404]}
+        results, throttles, _ = self.fetch(range(1, 9), workers=3, ceiling=50.0)
+
+        self.assertEqual(sorted(result.appid for result in results), list(range(1, 9)))
+        self.assertEqual({result.appid: result.status for result in results if result.status != 200}, {3: 404})
+        self.assertEqual(throttles, [])
+
+
+if __name__ == '__main__':
+    unittest.main()